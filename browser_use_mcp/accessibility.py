@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""无障碍树快照模块 - 将 Playwright 无障碍树压缩为紧凑的页面大纲
+
+相比 DOM 元素列表（className、CSS 路径、矩形坐标等），无障碍树只包含
+角色、名称和状态，信息密度更高：
+- 去掉 generic/none 等无语义的包装节点，名称与父节点重复的文本节点
+- 连续的相同兄弟节点合并为一行（×N）
+- 可交互节点分配索引，并生成 role 选择器，可直接用于 click_element 等操作；
+  无障碍树快照与 role 选择器引擎的计算结果可能不一致，调用方按 base_selector 和
+  matches 校验后，把不一致的选择器通过 skip_selectors 排除（不分配索引）
+- 文本渲染有字符数上限
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# 可交互的角色（分配元素索引）
+INTERACTIVE_ROLES = {
+    'button', 'link', 'textbox', 'searchbox', 'checkbox', 'radio', 'combobox',
+    'listbox', 'option', 'menuitem', 'menuitemcheckbox', 'menuitemradio',
+    'tab', 'switch', 'slider', 'spinbutton', 'treeitem',
+}
+
+# 无语义的包装角色（不输出，直接展开子节点）
+TRANSPARENT_ROLES = {'generic', 'none', 'presentation', 'WebArea', 'RootWebArea', 'group', 'Section'}
+
+# 输出的状态字段
+STATE_KEYS = ('checked', 'pressed', 'selected', 'expanded', 'disabled', 'focused', 'required', 'readonly')
+
+
+def role_base_selector(role: str, name: str) -> str:
+    """生成与 page.get_by_role(role, name=name, exact=True) 等价的选择器（无名称时匹配该角色的所有元素）"""
+    selector = f'internal:role={role}'
+    if name:
+        selector += f'[name={json.dumps(name, ensure_ascii=False)}s]'
+    return selector
+
+
+def _format_states(node: Dict[str, Any]) -> str:
+    states = []
+    for key in STATE_KEYS:
+        value = node.get(key)
+        if value is True:
+            states.append(key)
+        elif value not in (None, False):
+            states.append(f"{key}={value}")
+    if node.get('level'):
+        states.append(f"level={node['level']}")
+    value = node.get('value')
+    if value not in (None, '') and node.get('role') in ('textbox', 'searchbox', 'combobox', 'slider', 'spinbutton'):
+        states.append(f"value={str(value)[:40]!r}")
+    return f" ({', '.join(states)})" if states else ""
+
+
+def compact_accessibility_tree(
+    tree: Optional[Dict[str, Any]],
+    max_chars: int = 8000,
+    max_name_length: int = 80,
+    skip_selectors: Optional[Set[str]] = None,
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    压缩无障碍树
+    
+    Args:
+        tree: page.accessibility.snapshot() 的返回值
+        max_chars: 文本渲染的最大字符数
+        max_name_length: 名称的最大长度
+        skip_selectors: 不分配索引的 base_selector（与 role 选择器引擎的匹配数不一致）
+    
+    Returns:
+        (大纲文本, 可交互元素列表)，元素列表中每项包含 index、role、name、selector，
+        以及 base_selector（不带 nth）和 matches（快照中该 base_selector 应匹配的元素数）
+    """
+    if not tree:
+        return "", []
+    
+    elements: List[Dict[str, Any]] = []
+    occurrences: Dict[Tuple[str, str], int] = {}
+    role_occurrences: Dict[str, int] = {}
+    
+    def visit(node: Dict[str, Any], depth: int, parent_name: str) -> List[Tuple[int, str, Optional[int]]]:
+        """返回 (深度, 行文本, 元素索引) 列表"""
+        role = node.get('role') or ''
+        name = (node.get('name') or '').strip()
+        children = node.get('children') or []
+        
+        # 与父节点名称相同的文本节点是冗余的
+        if role == 'text' and (not name or name == parent_name):
+            return []
+        
+        interactive = role in INTERACTIVE_ROLES
+        emit = interactive or (role not in TRANSPARENT_ROLES and (name or node.get('level')))
+        
+        lines = []
+        child_depth = depth
+        if emit:
+            # 有名称时按 (角色, 名称) 计数；无名称的选择器不带名称过滤，会匹配该角色的所有节点，
+            # 因此按角色计数
+            key = (role, name)
+            nth = occurrences.get(key, 0) if name else role_occurrences.get(role, 0)
+            occurrences[key] = occurrences.get(key, 0) + 1
+            role_occurrences[role] = role_occurrences.get(role, 0) + 1
+            
+            label = name if len(name) <= max_name_length else name[:max_name_length] + '…'
+            text = role if role != 'text' else ''
+            if label:
+                text = f'{text} "{label}"' if text else f'"{label}"'
+            text += _format_states(node)
+            
+            index = None
+            base = role_base_selector(role, name)
+            if interactive and not (skip_selectors and base in skip_selectors):
+                index = len(elements)
+                elements.append({
+                    "index": index,
+                    "role": role,
+                    "name": name,
+                    "base_selector": base,
+                    "selector": f"{base} >> nth={nth}",
+                })
+            lines.append((depth, text, index))
+            child_depth = depth + 1
+        
+        child_lines = []
+        for child in children:
+            child_lines.extend(visit(child, child_depth, name or parent_name))
+        lines.extend(_collapse_repeats(child_lines))
+        return lines
+    
+    lines = visit(tree, 0, '')
+    for element in elements:
+        element["matches"] = occurrences[(element["role"], element["name"])] if element["name"] else role_occurrences[element["role"]]
+    
+    rendered = []
+    size = 0
+    for i, (depth, text, index) in enumerate(lines):
+        prefix = f"[{index}] " if index is not None else ""
+        line = f"{'  ' * min(depth, 12)}- {prefix}{text}"
+        if size + len(line) + 1 > max_chars:
+            rendered.append(f"... (还有 {len(lines) - i} 个节点未显示)")
+            break
+        rendered.append(line)
+        size += len(line) + 1
+    
+    return "\n".join(rendered), elements
+
+
+def _collapse_repeats(lines: List[Tuple[int, str, Optional[int]]]) -> List[Tuple[int, str, Optional[int]]]:
+    """合并连续重复的非交互行（相同深度和文本）"""
+    collapsed: List[Tuple[int, str, Optional[int]]] = []
+    repeat = 1
+    for line in lines:
+        if collapsed and line[2] is None and collapsed[-1][2] is None and line[:2] == _strip_count(collapsed[-1])[:2]:
+            repeat += 1
+            depth, text, _ = _strip_count(collapsed[-1])
+            collapsed[-1] = (depth, f"{text} ×{repeat}", None)
+        else:
+            repeat = 1
+            collapsed.append(line)
+    return collapsed
+
+
+def _strip_count(line: Tuple[int, str, Optional[int]]) -> Tuple[int, str, Optional[int]]:
+    depth, text, index = line
+    head, sep, tail = text.rpartition(" ×")
+    if sep and tail.isdigit():
+        return depth, head, index
+    return line
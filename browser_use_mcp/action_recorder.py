@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""操作录制模块 - 将成功的浏览器操作记录为可回放的脚本
+
+录制期间每个成功的操作都会追加为脚本中的一步：
+- 元素操作记录一组稳定的定位器（id、name、placeholder、aria-label、文本等，
+  按稳定性排序），而不是只依赖当次扫描的元素索引
+- 输入敏感数据只记录 credential_key，回放时从 .env 重新读取；
+  在密码框中直接输入的文本不会写入脚本
+- 脚本保存为 JSON（~/.browser_use_mcp/scripts/{name}.json），回放时无需 AI 逐步规划
+"""
+
+import datetime
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SCRIPT_VERSION = 1
+
+# 看起来是自动生成的 id / class（包含较长的数字或哈希片段），不适合作为定位器
+_GENERATED_ID = re.compile(r'\d{4,}|[0-9a-f]{8,}|^:r|^ember\d|^react-')
+
+
+def _css_string(value: str) -> str:
+    """CSS 属性选择器中的字符串字面量"""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ') + '"'
+
+
+def stable_locators(element: Dict[str, Any]) -> List[str]:
+    """
+    为元素映射中的元素生成候选定位器（按稳定性从高到低）
+    
+    Args:
+        element: _element_map 中的元素记录
+    
+    Returns:
+        Playwright 选择器列表，最后一项为扫描时生成的 CSS 路径
+    """
+    selector = element.get('selector') or ''
+    # 无障碍树模式下的元素已经是 role 选择器
+    if selector.startswith('internal:role='):
+        return [selector]
+    
+    tag = (element.get('tag') or '*').lower()
+    locators = []
+    # iframe 中的元素需要先进入所在框架
+    prefix = "".join(f"{p} >> internal:control=enter-frame >> " for p in element.get('frame') or [])
+    
+    element_id = element.get('id')
+    if element_id and not _GENERATED_ID.search(element_id):
+        locators.append(f'{tag}[id={_css_string(element_id)}]')
+    
+    for attr, key in (('name', 'name'), ('placeholder', 'placeholder'), ('aria-label', 'ariaLabel')):
+        value = element.get(key)
+        if value:
+            locators.append(f'{tag}[{attr}={_css_string(value)}]')
+    
+    text = (element.get('text') or '').strip()
+    clickable = tag in ('a', 'button', 'label', 'summary', 'option') or element.get('role') in ('button', 'link', 'tab', 'menuitem')
+    if clickable and text and len(text) <= 50:
+        locators.append(f'{tag}:text-is({_css_string(text)})')
+    
+    href = element.get('href')
+    if tag == 'a' and href and not href.startswith('javascript:'):
+        locators.append(f'a[href={_css_string(href)}]')
+    
+    locators = [prefix + locator for locator in locators]
+    if selector and selector not in locators:
+        locators.append(selector)
+    return locators
+
+
+def describe_element(element: Dict[str, Any]) -> str:
+    """元素的简短描述（写入脚本，便于人工阅读）"""
+    text = (element.get('text') or element.get('placeholder') or element.get('ariaLabel') or '').strip()
+    return f"<{element.get('tag')}> {text[:40]}".strip()
+
+
+class ActionRecorder:
+    """操作录制器"""
+    
+    def __init__(self, script_dir: Path):
+        """
+        初始化录制器
+        
+        Args:
+            script_dir: 脚本保存目录
+        """
+        self.script_dir = Path(script_dir)
+        self.name: Optional[str] = None
+        self.steps: List[Dict[str, Any]] = []
+        self.started_at: Optional[str] = None
+        self.paused = False
+    
+    @property
+    def active(self) -> bool:
+        return self.name is not None and not self.paused
+    
+    def _script_file(self, name: str) -> Path:
+        safe_name = re.sub(r'[^\w.-]+', '_', name).strip('._') or 'script'
+        return self.script_dir / f"{safe_name}.json"
+    
+    def start(self, name: str):
+        """开始录制（丢弃未保存的录制）"""
+        self.name = name
+        self.steps = []
+        self.started_at = datetime.datetime.now().isoformat()
+    
+    def record(self, step: Dict[str, Any]):
+        """追加一步"""
+        if self.active:
+            self.steps.append(step)
+    
+    def stop(self, save: bool = True) -> Dict[str, Any]:
+        """
+        停止录制
+        
+        Returns:
+            脚本信息（save 为 True 时包含保存路径）
+        """
+        name, steps = self.name, self.steps
+        self.name, self.steps = None, []
+        info = {"name": name, "steps_count": len(steps)}
+        if save and name:
+            script = {
+                "name": name,
+                "version": SCRIPT_VERSION,
+                "created_at": self.started_at,
+                "steps": steps,
+            }
+            path = self._script_file(name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(script, f, ensure_ascii=False, indent=2)
+            info["file"] = str(path)
+        return info
+    
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """读取脚本，不存在时返回 None"""
+        path = self._script_file(name)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def list_scripts(self) -> List[Dict[str, Any]]:
+        """列出已保存的脚本"""
+        scripts = []
+        if not self.script_dir.exists():
+            return scripts
+        for path in sorted(self.script_dir.glob("*.json")):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    script = json.load(f)
+            except (OSError, ValueError):
+                continue
+            scripts.append({
+                "name": script.get("name", path.stem),
+                "steps_count": len(script.get("steps", [])),
+                "created_at": script.get("created_at"),
+                "file": str(path),
+            })
+        return scripts
@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""browser_tools 性能基准测试
+
+在本地 HTTP 服务器上提供生成的 HTML 测试页面（大表格、长文档、频繁变化的 SPA 页面、
+多 iframe 页面），对创建会话、导航、get_state、click_element、extract_markdown 计时。
+不访问外部网络，结果可以保存为基线 JSON，优化前后离线对比。
+
+用法：
+    python benchmark_browser_tools.py                          # 运行全部基准
+    python benchmark_browser_tools.py --only get_state         # 只运行名称以 get_state 开头的基准
+    python benchmark_browser_tools.py --save-baseline          # 保存为基线（默认 benchmark_baseline.json）
+    python benchmark_browser_tools.py --compare --threshold 0.2  # 与基线对比，变慢超过 20% 时退出码为 1
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# 添加父目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from browser_use_mcp.browser_tools import PlaywrightBrowserManager
+
+DEFAULT_BASELINE = Path(__file__).with_name("benchmark_baseline.json")
+
+# 与基线对比时忽略的绝对差值（毫秒），避免极短操作的抖动被判为变慢
+NOISE_FLOOR_MS = 2.0
+
+
+# ===== 测试页面 =====
+
+def _page(title: str, body: str, head: str = "") -> str:
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>{title}</title>{head}</head><body>{body}</body></html>"
+    )
+
+
+def fixture_simple(params: Dict[str, str]) -> str:
+    """导航基准用的小页面"""
+    n = params.get("n", "0")
+    return _page(f"Simple {n}", f"<h1>Page {n}</h1><p>Navigation target.</p><a href='/simple?n={n}'>self</a>")
+
+
+def fixture_large_table(params: Dict[str, str]) -> str:
+    """大表格：每行一个链接和一个复选框，每 20 行一个按钮（可交互元素超过默认扫描上限）"""
+    rows = int(params.get("rows", "2000"))
+    statuses = ("active", "pending", "disabled", "archived")
+    lines = []
+    for i in range(rows):
+        button = f"<button type='button'>Edit {i}</button>" if i % 20 == 0 else ""
+        lines.append(
+            f"<tr><td><input type='checkbox' name='row{i}'></td>"
+            f"<td><a href='/simple?n={i}'>Row {i}</a></td>"
+            f"<td>user{i}@example.com</td><td>{statuses[i % 4]}</td>"
+            f"<td>{i * 37 % 1000}.{i % 100:02d}</td><td>{button}</td></tr>"
+        )
+    body = (
+        "<h1>Large table</h1><table border='1'><thead><tr>"
+        "<th></th><th>Name</th><th>Email</th><th>Status</th><th>Amount</th><th>Actions</th>"
+        f"</tr></thead><tbody>{''.join(lines)}</tbody></table>"
+    )
+    return _page("Large table", body)
+
+
+def fixture_long_document(params: Dict[str, str]) -> str:
+    """长文档：标题、段落、行内链接、列表、代码块和小表格"""
+    sections = int(params.get("sections", "200"))
+    parts = ["<article><h1>Long document</h1>"]
+    for i in range(sections):
+        parts.append(f"<h2>Section {i}</h2>")
+        for j in range(3):
+            parts.append(
+                f"<p>Paragraph {j} of section {i}. <strong>Lorem ipsum</strong> dolor sit amet, "
+                f"consectetur adipiscing elit, see <a href='/simple?n={i}'>reference {i}.{j}</a> "
+                "sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.</p>"
+            )
+        parts.append("<ul>" + "".join(f"<li>Item {i}.{k}</li>" for k in range(5)) + "</ul>")
+        parts.append(f"<pre><code>def section_{i}():\n    return {i}\n</code></pre>")
+        if i % 10 == 0:
+            parts.append(
+                "<table><tr><th>Key</th><th>Value</th></tr>"
+                + "".join(f"<tr><td>k{k}</td><td>{k * i}</td></tr>" for k in range(5))
+                + "</table>"
+            )
+    parts.append("</article>")
+    return _page("Long document", "".join(parts))
+
+
+def fixture_spa(params: Dict[str, str]) -> str:
+    """频繁变化的单页应用：每帧更新计数器和部分列表项，按钮追加列表项"""
+    items = int(params.get("items", "300"))
+    body = (
+        "<h1>SPA</h1><div id='clock'>0</div>"
+        "<button id='add' type='button'>Add item</button>"
+        "<div id='toolbar'>"
+        + "".join(f"<button type='button' data-toggle='{i}'>Toggle {i}</button>" for i in range(50))
+        + "</div><ul id='list'></ul>"
+    )
+    script = """
+<script>
+const list = document.getElementById('list');
+function render(i) {
+    const li = document.createElement('li');
+    li.innerHTML = '<span>Item ' + i + '</span> <a href="#item' + i + '">open</a>';
+    return li;
+}
+for (let i = 0; i < %d; i++) list.appendChild(render(i));
+let ticks = 0;
+setInterval(() => {
+    ticks++;
+    document.getElementById('clock').textContent = String(ticks);
+    for (let k = 0; k < 5; k++) {
+        const index = Math.floor(Math.random() * list.children.length);
+        list.replaceChild(render(index), list.children[index]);
+    }
+}, 16);
+document.getElementById('add').addEventListener('click', () => list.appendChild(render(list.children.length)));
+document.getElementById('toolbar').addEventListener('click', (e) => {
+    if (e.target.dataset.toggle) e.target.classList.toggle('on');
+});
+</script>""" % items
+    return _page("SPA", body + script)
+
+
+def fixture_iframes(params: Dict[str, str]) -> str:
+    """多 iframe 页面：每个 iframe 是一个表单，第一个 iframe 内再嵌套一层"""
+    frames = int(params.get("frames", "6"))
+    body = "<h1>Iframes</h1>" + "".join(
+        f"<iframe src='/form?frame={i}{'&nested=1' if i == 0 else ''}' width='600' height='300'></iframe>"
+        for i in range(frames)
+    )
+    return _page("Iframes", body)
+
+
+def fixture_form(params: Dict[str, str]) -> str:
+    """iframe 中的表单"""
+    frame = params.get("frame", "0")
+    fields = "".join(
+        f"<label>Field {i} <input name='f{i}' placeholder='Field {i}'></label><br>" for i in range(10)
+    )
+    nested = "<iframe src='/form?frame=nested' width='500' height='200'></iframe>" if params.get("nested") else ""
+    body = (
+        f"<form><h2>Form {frame}</h2>{fields}"
+        "<select name='choice'><option>a</option><option>b</option><option>c</option></select>"
+        "<textarea name='notes'></textarea><button type='button'>Submit</button></form>"
+        + nested
+    )
+    return _page(f"Form {frame}", body)
+
+
+FIXTURES: Dict[str, Callable[[Dict[str, str]], str]] = {
+    "/simple": fixture_simple,
+    "/large_table": fixture_large_table,
+    "/long_document": fixture_long_document,
+    "/spa": fixture_spa,
+    "/iframes": fixture_iframes,
+    "/form": fixture_form,
+}
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    """按路径返回生成的测试页面（按完整 URL 缓存）"""
+    
+    cache: Dict[str, bytes] = {}
+    
+    def do_GET(self):
+        parts = urllib.parse.urlsplit(self.path)
+        fixture = FIXTURES.get(parts.path)
+        if fixture is None:
+            self.send_error(404)
+            return
+        body = self.cache.get(self.path)
+        if body is None:
+            params = dict(urllib.parse.parse_qsl(parts.query))
+            body = self.cache[self.path] = fixture(params).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """在后台线程中运行的本地测试页面服务器（端口自动分配）"""
+    
+    def __init__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _FixtureHandler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ===== 基准 =====
+
+def _summarize(samples: List[float]) -> Dict[str, Any]:
+    """耗时统计（毫秒）"""
+    ordered = sorted(samples)
+    p95 = ordered[min(int(round(0.95 * (len(ordered) - 1))), len(ordered) - 1)]
+    return {
+        "iterations": len(samples),
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+        "min_ms": round(ordered[0] * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+async def _time(
+    operation: Callable[[], Awaitable[Dict[str, Any]]],
+    iterations: int,
+    warmup: int = 1,
+    after: Optional[Callable[[], Awaitable[Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    重复执行操作并计时（预热次数不计入）
+    
+    Args:
+        operation: 要计时的操作，返回 success 为 False 时中止
+        iterations: 计时次数
+        warmup: 预热次数
+        after: 每次执行后的清理操作（不计时）
+    """
+    samples = []
+    for i in range(warmup + iterations):
+        started = time.perf_counter()
+        result = await operation()
+        elapsed = time.perf_counter() - started
+        if after:
+            await after()
+        if isinstance(result, dict) and result.get("success") is False:
+            raise RuntimeError(result.get("error"))
+        if i >= warmup:
+            samples.append(elapsed)
+    return _summarize(samples)
+
+
+async def _open(manager: PlaywrightBrowserManager, url: str):
+    result = await manager.navigate(url)
+    if not result.get("success"):
+        raise RuntimeError(f"打开测试页面失败 {url}: {result.get('error')}")
+
+
+async def bench_create_session(manager, base_url: str, iterations: int, headless: bool) -> Dict[str, Any]:
+    """创建会话（启动浏览器、新建上下文和页面），每次使用独立的管理器和空的会话目录"""
+    with tempfile.TemporaryDirectory() as session_dir:
+        fresh = PlaywrightBrowserManager(session_dir=session_dir)
+        counter = iter(range(1_000_000))
+        
+        async def create():
+            return await fresh.create_session(f"bench_{next(counter)}", headless=headless)
+        
+        async def close():
+            await fresh.close_session(save=False)
+        
+        try:
+            return await _time(create, iterations, after=close)
+        finally:
+            await fresh.cleanup()
+
+
+async def bench_navigate(manager, base_url: str, iterations: int, headless: bool) -> Dict[str, Any]:
+    """导航到小页面（每次使用不同的 URL）"""
+    counter = iter(range(1_000_000))
+    
+    async def navigate():
+        return await manager.navigate(f"{base_url}/simple?n={next(counter)}")
+    
+    return await _time(navigate, iterations)
+
+
+def _bench_get_state(path: str, **options) -> Callable[..., Awaitable[Dict[str, Any]]]:
+    async def bench(manager, base_url: str, iterations: int, headless: bool) -> Dict[str, Any]:
+        await _open(manager, base_url + path)
+        
+        async def get_state():
+            return await manager.get_state(**options)
+        
+        result = await _time(get_state, iterations)
+        state = await manager.get_state(include_screenshot=False)
+        result["elements"] = state.get("elements_count")
+        return result
+    
+    bench.__doc__ = f"get_state {options}（{path}）"
+    return bench
+
+
+async def bench_click_element(manager, base_url: str, iterations: int, headless: bool) -> Dict[str, Any]:
+    """在频繁变化的 SPA 页面上点击按钮（包含 click_element 的固定等待）"""
+    await _open(manager, base_url + "/spa")
+    state = await manager.get_state(include_screenshot=False)
+    index = next((el["index"] for el in state["elements"] if el["text"] == "Add item"), None)
+    if index is None:
+        raise RuntimeError("找不到 Add item 按钮")
+    
+    async def click():
+        return await manager.click_element(index)
+    
+    return await _time(click, iterations)
+
+
+def _bench_extract_markdown(path: str) -> Callable[..., Awaitable[Dict[str, Any]]]:
+    async def bench(manager, base_url: str, iterations: int, headless: bool) -> Dict[str, Any]:
+        await _open(manager, base_url + path)
+        
+        async def extract():
+            return await manager.extract_markdown()
+        
+        result = await _time(extract, iterations)
+        extracted = await manager.extract_markdown()
+        result["chars"] = len(extracted.get("markdown") or "")
+        return result
+    
+    bench.__doc__ = f"extract_markdown（{path}）"
+    return bench
+
+
+BENCHMARKS: Dict[str, Callable[..., Awaitable[Dict[str, Any]]]] = {
+    "create_session": bench_create_session,
+    "navigate": bench_navigate,
+    "get_state.large_table": _bench_get_state("/large_table", include_screenshot=False),
+    "get_state.long_document": _bench_get_state("/long_document", include_screenshot=False),
+    "get_state.spa": _bench_get_state("/spa", include_screenshot=False),
+    "get_state.iframes": _bench_get_state("/iframes", include_screenshot=False),
+    "get_state.screenshot": _bench_get_state("/long_document", include_screenshot=True, force_screenshot=True),
+    "get_state.accessibility": _bench_get_state("/large_table", include_screenshot=False, mode="accessibility"),
+    "click_element.spa": bench_click_element,
+    "extract_markdown.long_document": _bench_extract_markdown("/long_document"),
+    "extract_markdown.large_table": _bench_extract_markdown("/large_table"),
+}
+
+
+def _environment(headless: bool, iterations: int) -> Dict[str, Any]:
+    try:
+        from importlib.metadata import version
+        playwright_version = version("playwright")
+    except Exception:
+        playwright_version = None
+    return {
+        "created_at": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "playwright": playwright_version,
+        "headless": headless,
+        "iterations": iterations,
+    }
+
+
+async def run_benchmarks(names: List[str], iterations: int, headless: bool) -> Dict[str, Any]:
+    """运行指定的基准，返回环境信息、每个基准的耗时统计和管理器内部的 span 指标"""
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as session_dir, FixtureServer() as server:
+        manager = PlaywrightBrowserManager(session_dir=session_dir)
+        created = await manager.create_session("benchmark", headless=headless)
+        if not created.get("success"):
+            raise RuntimeError(f"创建会话失败: {created.get('error')}")
+        try:
+            for name in names:
+                print(f"  {name} ...", end="", flush=True)
+                try:
+                    results[name] = await BENCHMARKS[name](manager, server.base_url, iterations, headless)
+                    print(f" {results[name]['median_ms']} ms")
+                except Exception as e:
+                    results[name] = {"error": str(e)}
+                    print(f" ❌ {e}")
+            spans = manager.get_metrics()
+        finally:
+            await manager.cleanup()
+    
+    return {
+        "environment": _environment(headless, iterations),
+        "results": results,
+        "spans": spans.get("actions", {}),
+        "counters": spans.get("counters", {}),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """打印与基线的对比，返回变慢超过阈值的基准名称"""
+    regressions = []
+    print(f"\n{'基准':<34}{'基线 (ms)':>12}{'当前 (ms)':>12}{'变化':>10}")
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if "median_ms" not in result or not base or "median_ms" not in base:
+            print(f"{name:<34}{'-':>12}{result.get('median_ms', '-'):>12}{'':>10}")
+            continue
+        delta = result["median_ms"] - base["median_ms"]
+        ratio = delta / base["median_ms"] if base["median_ms"] else 0.0
+        flag = ""
+        if ratio > threshold and delta > NOISE_FLOOR_MS:
+            regressions.append(name)
+            flag = " ⚠️"
+        elif ratio < -threshold and -delta > NOISE_FLOOR_MS:
+            flag = " ✅"
+        print(f"{name:<34}{base['median_ms']:>12}{result['median_ms']:>12}{ratio:>+10.1%}{flag}")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="browser_tools 性能基准测试")
+    parser.add_argument("--iterations", type=int, default=10, help="每个基准的计时次数（另有 1 次预热）")
+    parser.add_argument("--only", nargs="*", help="只运行名称以这些前缀开头的基准")
+    parser.add_argument("--headed", action="store_true", help="使用有界面浏览器（默认无头）")
+    parser.add_argument("--output", type=Path, help="将结果写入 JSON 文件")
+    parser.add_argument(
+        "--save-baseline", nargs="?", type=Path, const=DEFAULT_BASELINE,
+        help=f"将结果保存为基线（默认 {DEFAULT_BASELINE.name}）",
+    )
+    parser.add_argument(
+        "--compare", nargs="?", type=Path, const=DEFAULT_BASELINE,
+        help=f"与基线对比（默认 {DEFAULT_BASELINE.name}）",
+    )
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定变慢的中位数增幅（默认 0.2 即 20%%）")
+    parser.add_argument("--list", action="store_true", help="列出所有基准")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    
+    if args.list:
+        for name, bench in BENCHMARKS.items():
+            print(f"{name:<34}{(bench.__doc__ or '').strip().splitlines()[0]}")
+        return 0
+    
+    names = [
+        name for name in BENCHMARKS
+        if not args.only or any(name.startswith(prefix) for prefix in args.only)
+    ]
+    if not names:
+        print(f"❌ 没有匹配的基准: {args.only}")
+        return 2
+    
+    print("=" * 60)
+    print(f"browser_tools 性能基准（{len(names)} 项，每项 {args.iterations} 次）")
+    print("=" * 60)
+    try:
+        report = asyncio.run(run_benchmarks(names, max(args.iterations, 1), headless=not args.headed))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 2
+    
+    for path in filter(None, (args.output, args.save_baseline)):
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n📄 结果已保存: {path}")
+    
+    if args.compare:
+        if not args.compare.exists():
+            print(f"\n❌ 基线文件不存在: {args.compare}（先使用 --save-baseline 生成）")
+            return 2
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n⚠️ 变慢超过 {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print("\n✅ 没有超过阈值的性能退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,10 +25,25 @@ import json
 import os
 import base64
 import re
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import logging
 import datetime
+import time
+
+from .accessibility import compact_accessibility_tree
+from .action_recorder import ActionRecorder, describe_element, stable_locators
+from .cookie_jar import describe_cookie, filter_cookies, normalize_cookie, paginate
+from .download_manager import DownloadManager
+from .element_map import ElementMap, ElementRecord
+from .metrics import MetricsRecorder, traced
+from .network_capture import NetworkRecorder
+from .screencast import Screencast
+from .serp import SEARCH_ENGINES, SerpCache, rank_results, search_url
+from .session_store import SessionStore
+from .tab_manager import TabManager
+from .visual_diff import compare_png, png_size
 
 logger = logging.getLogger(__name__)
 
@@ -106,39 +121,865 @@ def reload_credentials() -> Dict[str, str]:
     return load_credentials()
 
 
+def _confined_path(base: Path, name: str) -> Path:
+    """
+    将调用方提供的相对路径解析到 base 目录下
+    
+    Raises:
+        ValueError: 路径为绝对路径，或通过 .. 等方式超出 base 目录
+    """
+    base = base.resolve()
+    if Path(name).expanduser().is_absolute():
+        raise ValueError(f"只接受相对于 {base} 的路径: {name}")
+    path = (base / name).resolve()
+    if path != base and base not in path.parents:
+        raise ValueError(f"路径超出 {base}: {name}")
+    return path
+
+
+def max_sessions_from_env() -> int:
+    """
+    读取环境变量 BROWSER_USE_MCP_MAX_SESSIONS（最大并发会话数，默认 4）
+    
+    Raises:
+        ValueError: 不是正整数
+    """
+    value = os.environ.get("BROWSER_USE_MCP_MAX_SESSIONS", "4")
+    try:
+        max_sessions = int(value)
+    except ValueError:
+        max_sessions = 0
+    if max_sessions < 1:
+        raise ValueError(f"环境变量 BROWSER_USE_MCP_MAX_SESSIONS 的值无效: {value!r}（应为正整数）")
+    return max_sessions
+
+
+# Chromium 启动参数
+_CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+]
+
+
+# HTML 到 Markdown 的转换函数（页面端 JS），依赖外层作用域中的 extractLinks 变量
+_HTML_TO_MARKDOWN_JS = '''
+    function htmlToMarkdown(element) {
+        let result = '';
+        
+        for (const node of element.childNodes) {
+            if (node.nodeType === Node.TEXT_NODE) {
+                result += node.textContent;
+            } else if (node.nodeType === Node.ELEMENT_NODE) {
+                const tag = node.tagName.toLowerCase();
+                
+                switch (tag) {
+                    case 'h1':
+                        result += '\\n# ' + node.innerText + '\\n';
+                        break;
+                    case 'h2':
+                        result += '\\n## ' + node.innerText + '\\n';
+                        break;
+                    case 'h3':
+                        result += '\\n### ' + node.innerText + '\\n';
+                        break;
+                    case 'h4':
+                        result += '\\n#### ' + node.innerText + '\\n';
+                        break;
+                    case 'p':
+                        result += '\\n' + htmlToMarkdown(node) + '\\n';
+                        break;
+                    case 'a':
+                        if (extractLinks && node.href) {
+                            result += '[' + node.innerText + '](' + node.href + ')';
+                        } else {
+                            result += node.innerText;
+                        }
+                        break;
+                    case 'strong':
+                    case 'b':
+                        result += '**' + node.innerText + '**';
+                        break;
+                    case 'em':
+                    case 'i':
+                        result += '*' + node.innerText + '*';
+                        break;
+                    case 'code':
+                        result += '`' + node.innerText + '`';
+                        break;
+                    case 'pre':
+                        result += '\\n```\\n' + node.innerText + '\\n```\\n';
+                        break;
+                    case 'ul':
+                    case 'ol':
+                        result += '\\n' + htmlToMarkdown(node) + '\\n';
+                        break;
+                    case 'li':
+                        result += '- ' + htmlToMarkdown(node) + '\\n';
+                        break;
+                    case 'br':
+                        result += '\\n';
+                        break;
+                    case 'script':
+                    case 'style':
+                    case 'noscript':
+                        break;
+                    default:
+                        result += htmlToMarkdown(node);
+                }
+            }
+        }
+        
+        return result;
+    }
+'''
+
+# 按文档顺序将页面切分为 Markdown 块的生成器（页面端 JS），用于分块提取
+_MARKDOWN_BLOCKS_JS = '''
+    const BLOCK_TAGS = new Set(['h1', 'h2', 'h3', 'h4', 'p', 'pre', 'ul', 'ol', 'br']);
+    const CONTAINER_TAGS = new Set([
+        'div', 'section', 'article', 'main', 'header', 'footer', 'nav', 'aside',
+        'form', 'table', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th', 'figure',
+        'details', 'blockquote', 'dl', 'dd', 'dt',
+    ]);
+    const SKIP_TAGS = new Set(['script', 'style', 'noscript']);
+    
+    function* markdownBlocks(element) {
+        let buffer = '';
+        for (const node of element.childNodes) {
+            if (node.nodeType === Node.TEXT_NODE) {
+                buffer += node.textContent;
+                continue;
+            }
+            if (node.nodeType !== Node.ELEMENT_NODE) continue;
+            
+            const tag = node.tagName.toLowerCase();
+            if (SKIP_TAGS.has(tag)) continue;
+            
+            if (BLOCK_TAGS.has(tag) || CONTAINER_TAGS.has(tag)) {
+                if (buffer.trim()) yield buffer.trim();
+                buffer = '';
+                if (CONTAINER_TAGS.has(tag)) {
+                    yield* markdownBlocks(node);
+                } else {
+                    const text = htmlToMarkdown({childNodes: [node]}).trim();
+                    if (text) yield text;
+                }
+            } else {
+                buffer += htmlToMarkdown({childNodes: [node]});
+            }
+        }
+        if (buffer.trim()) yield buffer.trim();
+    }
+'''
+
+# 从第 startBlock 块的 startOffset 处开始，提取不超过 chunkSize 个字符的 Markdown（页面端 JS），依赖 markdownBlocks、extractLinks 和 markdownCache。
+# 块生成器在调用之间保留，后续分块从上次停下的位置继续；只保留游标之后的块，已读过的块即丢弃。
+# 内容版本在 DOM 变化或 extractLinks 不同时更新，游标中的版本不一致时返回 stale，不从重建后的块中读取
+_MARKDOWN_CHUNK_JS = '''(args) => {
+    if (!markdownCache) {
+        const cache = {dirty: true, doc: Math.random().toString(36).slice(2, 8), generation: 0};
+        new MutationObserver(() => { cache.dirty = true; })
+            .observe(document, {subtree: true, childList: true, characterData: true, attributeFilter: ['href']});
+        markdownCache = cache;
+    }
+    const cache = markdownCache;
+    const restart = () => {
+        cache.blocks = [];
+        cache.produced = 0;
+        cache.source = markdownBlocks(document.body);
+        cache.exhausted = false;
+    };
+    if (cache.dirty || cache.extractLinks !== args.extractLinks) {
+        cache.extractLinks = args.extractLinks;
+        cache.version = cache.doc + '-' + (++cache.generation);
+        cache.dirty = false;
+        restart();
+    }
+    if (args.version !== null && args.version !== cache.version) {
+        return {stale: true, version: cache.version};
+    }
+    
+    // cache.blocks 保存第 [produced - blocks.length, produced) 块
+    const base = () => cache.produced - cache.blocks.length;
+    if (args.startBlock < base()) restart();
+    cache.blocks.splice(0, Math.min(Math.max(args.startBlock - base(), 0), cache.blocks.length));
+    
+    const blockAt = (index) => {
+        while (cache.produced <= index && !cache.exhausted) {
+            extractLinks = cache.extractLinks;
+            const step = cache.source.next();
+            if (step.done) {
+                cache.exhausted = true;
+            } else {
+                cache.produced++;
+                if (cache.produced > args.startBlock) cache.blocks.push(step.value);
+            }
+        }
+        const i = index - base();
+        return i >= 0 && i < cache.blocks.length ? cache.blocks[i] : null;
+    };
+    
+    const parts = [];
+    let size = 0;
+    let next = null;
+    
+    for (let index = args.startBlock; ; index++) {
+        const block = blockAt(index);
+        if (block === null) break;
+        if (size >= args.chunkSize) {
+            next = [index, 0];
+            break;
+        }
+        
+        const offset = index === args.startBlock ? args.startOffset : 0;
+        const piece = block.substring(offset, offset + args.chunkSize - size);
+        parts.push(piece);
+        size += piece.length;
+        
+        if (offset + piece.length < block.length) {
+            next = [index, offset + piece.length];
+            break;
+        }
+    }
+    
+    return {markdown: parts.join('\\n\\n'), next: next, version: cache.version};
+}'''
+
+# 页面端文本索引（TreeWalker 构建，MutationObserver 标记失效后按需重建）及查询函数
+_TEXT_SEARCH_JS = '''(args) => {
+    if (!window.__mcpTextIndex) {
+        const SKIP_TAGS = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE']);
+        const index = {entries: null, dirty: true, builds: 0};
+        
+        index.build = () => {
+            const entries = [];
+            const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT, {
+                acceptNode(node) {
+                    const parent = node.parentElement;
+                    if (!parent || SKIP_TAGS.has(parent.tagName)) return NodeFilter.FILTER_REJECT;
+                    return node.textContent.trim() ? NodeFilter.FILTER_ACCEPT : NodeFilter.FILTER_SKIP;
+                }
+            });
+            while (walker.nextNode()) {
+                const text = walker.currentNode.textContent;
+                entries.push({node: walker.currentNode, text: text, lower: text.toLowerCase()});
+            }
+            index.entries = entries;
+            index.dirty = false;
+            index.builds++;
+        };
+        
+        index.observer = new MutationObserver(() => { index.dirty = true; });
+        index.observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+        window.__mcpTextIndex = index;
+    }
+    
+    const index = window.__mcpTextIndex;
+    const rebuilt = index.dirty || !index.entries;
+    if (rebuilt) index.build();
+    
+    // 近似子串匹配（Sellers 算法）：返回 query 与 text 任意子串的最小编辑距离及结束位置
+    function fuzzyFind(query, text) {
+        const m = query.length;
+        let prev = new Array(m + 1);
+        for (let i = 0; i <= m; i++) prev[i] = i;
+        let best = m, bestEnd = 0;
+        for (let j = 1; j <= text.length; j++) {
+            const cur = new Array(m + 1);
+            cur[0] = 0;
+            const ch = text[j - 1];
+            for (let i = 1; i <= m; i++) {
+                cur[i] = Math.min(prev[i] + 1, cur[i - 1] + 1, prev[i - 1] + (query[i - 1] === ch ? 0 : 1));
+            }
+            if (cur[m] < best) {
+                best = cur[m];
+                bestEnd = j;
+            }
+            prev = cur;
+        }
+        return {distance: best, start: Math.max(bestEnd - m, 0), end: bestEnd};
+    }
+    
+    function nearestElementIndex(el, rect) {
+        const elements = window.__mcpElements || [];
+        if (!elements.length) return null;
+        if (!window.__mcpElementLookup) {
+            window.__mcpElementLookup = new Map(elements.map((node, i) => [node, i]));
+        }
+        const lookup = window.__mcpElementLookup;
+        for (let node = el; node; node = node.parentElement) {
+            if (lookup.has(node)) return lookup.get(node);
+        }
+        const cx = rect.x + rect.width / 2;
+        const cy = rect.y + rect.height / 2;
+        let best = null, bestDistance = Infinity;
+        elements.forEach((node, i) => {
+            if (!node.isConnected) return;
+            const r = node.getBoundingClientRect();
+            const d = Math.hypot(r.x + r.width / 2 - cx, r.y + r.height / 2 - cy);
+            if (d < bestDistance) {
+                bestDistance = d;
+                best = i;
+            }
+        });
+        return best;
+    }
+    
+    const query = args.mode === 'exact' ? args.text : args.text.toLowerCase();
+    // 空查询会在每个位置匹配（indexOf('', from) 在末尾之后仍返回长度），直接返回
+    if (!query.length) return {matches: [], total: 0, rebuilt: rebuilt, builds: index.builds};
+    const maxDistance = Math.max(1, Math.floor(query.length / 4));
+    const found = [];
+    
+    for (const entry of index.entries) {
+        if (!entry.node.isConnected) continue;
+        if (args.mode === 'fuzzy') {
+            if (entry.text.length > 2000) continue;
+            const hit = fuzzyFind(query, entry.lower);
+            if (hit.distance <= maxDistance) found.push({entry, start: hit.start, end: hit.end, distance: hit.distance});
+        } else {
+            const haystack = args.mode === 'exact' ? entry.text : entry.lower;
+            let from = 0, pos;
+            while ((pos = haystack.indexOf(query, from)) !== -1) {
+                found.push({entry, start: pos, end: pos + query.length, distance: 0});
+                from = pos + query.length;
+            }
+        }
+    }
+    
+    found.sort((a, b) => a.distance - b.distance);
+    const total = found.length;
+    const matches = found.slice(0, args.limit).map((match, i) => {
+        const range = document.createRange();
+        range.setStart(match.entry.node, match.start);
+        range.setEnd(match.entry.node, Math.min(match.end, match.entry.node.length));
+        const r = range.getBoundingClientRect();
+        const parent = match.entry.node.parentElement;
+        const rect = {x: r.x, y: r.y, width: r.width, height: r.height};
+        const snippetStart = Math.max(match.start - 30, 0);
+        return {
+            match: i,
+            text: match.entry.text.substring(snippetStart, match.end + 30).trim(),
+            distance: match.distance,
+            tag: parent.tagName.toLowerCase(),
+            rect: rect,
+            visible: r.width > 0 && r.bottom > 0 && r.right > 0 && r.top < window.innerHeight && r.left < window.innerWidth,
+            elementIndex: nearestElementIndex(parent, rect),
+        };
+    });
+    
+    if (args.scrollTo !== null && args.scrollTo < matches.length) {
+        found[args.scrollTo].entry.node.parentElement.scrollIntoView({behavior: 'smooth', block: 'center'});
+    }
+    
+    return {matches: matches, total: total, rebuilt: rebuilt, builds: index.builds};
+}'''
+
+# 为元素生成选择器：有 id 时用 id，否则用最多 6 层的 nth-of-type 路径（止于 shadow root 边界）
+_ELEMENT_SELECTOR_JS = '''(el) => {
+    if (el.id) return '#' + CSS.escape(el.id);
+    
+    let path = [];
+    while (el && el.nodeType === Node.ELEMENT_NODE) {
+        let selector = el.tagName.toLowerCase();
+        if (el.id) {
+            selector = '#' + CSS.escape(el.id);
+            path.unshift(selector);
+            break;
+        }
+        
+        let sibling = el;
+        let nth = 1;
+        while (sibling = sibling.previousElementSibling) {
+            if (sibling.tagName === el.tagName) nth++;
+        }
+        
+        if (nth > 1) selector += ':nth-of-type(' + nth + ')';
+        path.unshift(selector);
+        el = el.parentElement;
+        
+        if (path.length > 5) break;
+    }
+    
+    return path.join(' > ');
+}'''
+
+# 扫描一个框架中的可交互元素（含开放的 shadow root），元素数不超过 maxElements
+_ELEMENT_SCAN_JS = '''(options) => {
+    const generateSelector = ''' + _ELEMENT_SELECTOR_JS + ''';
+    const interactiveSelectors = [
+        'a[href]',
+        'button',
+        'input',
+        'textarea',
+        'select',
+        '[role="button"]',
+        '[role="link"]',
+        '[role="textbox"]',
+        '[role="checkbox"]',
+        '[role="radio"]',
+        '[role="combobox"]',
+        '[role="menuitem"]',
+        '[role="tab"]',
+        '[onclick]',
+        '[tabindex]:not([tabindex="-1"])',
+    ];
+    
+    const elements = [];
+    const nodes = [];
+    const seen = new Set();
+    let truncated = false;
+    let shadowRoots = 0;
+    
+    function scanRoot(root, hostPath) {
+        for (const selector of interactiveSelectors) {
+            for (const node of root.querySelectorAll(selector)) {
+                if (elements.length >= options.maxElements) {
+                    truncated = true;
+                    return;
+                }
+                
+                // 跳过隐藏元素
+                const style = window.getComputedStyle(node);
+                if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0') {
+                    continue;
+                }
+                
+                // 跳过已处理的元素
+                if (seen.has(node)) continue;
+                seen.add(node);
+                
+                const rect = node.getBoundingClientRect();
+                if (rect.width === 0 || rect.height === 0) continue;
+                
+                // 按固定字段顺序返回数组，顺序与 element_map.ROW_FIELDS 一致
+                elements.push([
+                    node.tagName.toLowerCase(),
+                    (node.innerText || node.value || '').substring(0, 100).trim(),
+                    node.type || null,
+                    node.name || null,
+                    node.placeholder || null,
+                    node.href || null,
+                    node.getAttribute('role') || null,
+                    node.getAttribute('aria-label') || null,
+                    node.id || null,
+                    // shadow root 中的元素：宿主元素路径 >> 元素在 shadow root 内的路径
+                    hostPath.concat([generateSelector(node)]).join(' >> '),
+                    hostPath.length > 0,
+                ]);
+                nodes.push(node);
+            }
+        }
+        
+        if (!options.shadowDom) return;
+        for (const host of root.querySelectorAll('*')) {
+            if (!host.shadowRoot) continue;
+            shadowRoots++;
+            scanRoot(host.shadowRoot, hostPath.concat([generateSelector(host)]));
+            if (truncated) return;
+        }
+    }
+    
+    scanRoot(document, []);
+    
+    // 保留主框架的元素节点，供文本搜索等页面端功能查找元素索引
+    if (options.exposeNodes) {
+        window.__mcpElements = nodes;
+        window.__mcpElementLookup = null;
+    }
+    
+    return {elements: elements, truncated: truncated, shadowRoots: shadowRoots};
+}'''
+
+# 坐标处的元素（穿过开放的 shadow root），以及它或其祖先在主框架元素映射中的索引
+_ELEMENT_AT_JS = '''(point) => {
+    let el = document.elementFromPoint(point.x, point.y);
+    while (el && el.shadowRoot) {
+        const inner = el.shadowRoot.elementFromPoint(point.x, point.y);
+        if (!inner || inner === el) break;
+        el = inner;
+    }
+    if (!el) return null;
+    
+    let index = null;
+    const elements = window.__mcpElements || [];
+    if (elements.length) {
+        if (!window.__mcpElementLookup) {
+            window.__mcpElementLookup = new Map(elements.map((node, i) => [node, i]));
+        }
+        const lookup = window.__mcpElementLookup;
+        for (let node = el; node; node = node.parentElement || (node.getRootNode().host || null)) {
+            if (lookup.has(node)) {
+                index = lookup.get(node);
+                break;
+            }
+        }
+    }
+    
+    const rect = el.getBoundingClientRect();
+    const link = el.closest('a[href]');
+    const control = el.closest('a[href], button, input, textarea, select, label, summary, [role], [onclick], [tabindex]');
+    return {
+        tag: el.tagName.toLowerCase(),
+        id: el.id || null,
+        text: (el.innerText || el.value || '').trim().substring(0, 100),
+        role: el.getAttribute('role'),
+        aria_label: el.getAttribute('aria-label'),
+        href: link ? link.href : null,
+        selector: window.__mcp.selectorFor(el),
+        index: index,
+        interactive: control ? control.tagName.toLowerCase() : null,
+        cursor: window.getComputedStyle(el).cursor,
+        rect: {x: Math.round(rect.x), y: Math.round(rect.y), width: Math.round(rect.width), height: Math.round(rect.height)},
+    };
+}'''
+
+# 页面版本（文档实例、DOM 变化次数、滚动位置、视口），版本不变时可复用上一次的截图
+_PAGE_VERSION_JS = '''() => {
+    if (!window.__mcpPageVersion) {
+        const version = {doc: Math.random().toString(36).slice(2), mutations: 0};
+        new MutationObserver((records) => { version.mutations += records.length; })
+            .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+        window.__mcpPageVersion = version;
+    }
+    const v = window.__mcpPageVersion;
+    return [location.href, v.doc, v.mutations, window.scrollX, window.scrollY,
+            window.innerWidth, window.innerHeight, window.devicePixelRatio].join('|');
+}'''
+
+# 页面端等待条件（辅助库中的具名谓词），参数由 wait_for 传入
+_WAIT_PREDICATES_JS = '''{
+    text: (arg) => !!document.body && document.body.innerText.includes(arg.text),
+    count: (arg) => document.querySelectorAll(arg.selector).length >= arg.count,
+    ready: () => document.readyState === 'complete',
+    not_busy: () => !document.querySelector('[aria-busy="true"]'),
+}'''
+
+# 等待谓词成立：DOM 变化、readystatechange / load 时重新检查（检查间隔不少于 50ms，避免大量变化时反复计算），
+# 另有低频轮询兜底（如只改变 CSS 可见性、不触发 DOM 变化的状态），超时返回 met=false
+_WAIT_FOR_JS = '''(args) => new Promise((resolve) => {
+    const POLL_INTERVAL = 500;
+    const predicate = window.__mcp.predicates[args.predicate];
+    const started = performance.now();
+    let checks = 0, lastCheck = 0, pending = null, observer = null, timer = null, poll = null, done = false;
+    
+    const check = () => {
+        checks++;
+        lastCheck = performance.now();
+        try {
+            return !!predicate(args.arg);
+        } catch (e) {
+            return false;
+        }
+    };
+    const finish = (met) => {
+        if (done) return;
+        done = true;
+        if (observer) observer.disconnect();
+        document.removeEventListener('readystatechange', schedule);
+        window.removeEventListener('load', schedule);
+        clearTimeout(timer);
+        clearTimeout(pending);
+        clearInterval(poll);
+        resolve({met: met, elapsed: performance.now() - started, checks: checks});
+    };
+    function schedule() {
+        if (pending !== null || done) return;
+        const delay = Math.max(0, 50 - (performance.now() - lastCheck));
+        pending = setTimeout(() => {
+            pending = null;
+            if (check()) finish(true);
+        }, delay);
+    }
+    
+    if (check()) return finish(true);
+    
+    observer = new MutationObserver(schedule);
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    document.addEventListener('readystatechange', schedule);
+    window.addEventListener('load', schedule);
+    poll = setInterval(schedule, POLL_INTERVAL);
+    timer = setTimeout(() => finish(check()), args.timeout);
+})'''
+
+# 按搜索引擎的选择器配置提取结果页中的 (标题, URL, 摘要)，按文档顺序排列
+_SERP_EXTRACT_JS = '''(selectors) => {
+    const results = [];
+    const seen = new Set();
+    for (const container of document.querySelectorAll(selectors.result)) {
+        const link = container.matches(selectors.link) ? container : container.querySelector(selectors.link);
+        if (!link || !link.href || seen.has(link.href)) continue;
+        const titleNode = (selectors.title && container.querySelector(selectors.title)) || link;
+        const title = (titleNode.innerText || '').trim();
+        if (!title) continue;
+        seen.add(link.href);
+        const snippetNode = selectors.snippet ? container.querySelector(selectors.snippet) : null;
+        results.push({
+            title: title.substring(0, 200),
+            url: link.href,
+            snippet: snippetNode ? snippetNode.innerText.replace(/\\s+/g, ' ').trim().substring(0, 300) : '',
+        });
+    }
+    return results;
+}'''
+
+# 批量填写表单字段：一次调用中按 CSS 选择器找到所有字段，用原生 value setter 赋值并触发 input / change 事件
+# （React 等框架监听的是原生 setter 触发的事件）；返回每个字段的状态，找不到的字段由调用方改用 Playwright 填写
+_FILL_FIELDS_JS = '''(fields) => fields.map((field) => {
+    let el;
+    try {
+        el = document.querySelector(field.selector);
+    } catch (e) {
+        return {status: 'invalid_selector'};
+    }
+    if (!el) return {status: 'not_found'};
+    if (el.disabled || el.readOnly) return {status: 'not_editable'};
+    
+    const tag = el.tagName;
+    const type = (el.type || '').toLowerCase();
+    if (tag === 'INPUT' && (type === 'checkbox' || type === 'radio')) {
+        const checked = !['', 'false', '0', 'off', 'no'].includes(String(field.value).toLowerCase());
+        if (el.checked !== checked) el.click();
+        return {status: 'ok', type: type};
+    }
+    if (tag === 'SELECT') {
+        const options = Array.from(el.options);
+        const option = options.find(o => o.value === field.value) || options.find(o => o.text.trim() === field.value);
+        if (!option) return {status: 'no_option', type: 'select'};
+        el.value = option.value;
+    } else if ((tag === 'INPUT' && type !== 'file') || tag === 'TEXTAREA') {
+        const proto = tag === 'INPUT' ? HTMLInputElement.prototype : HTMLTextAreaElement.prototype;
+        const setValue = Object.getOwnPropertyDescriptor(proto, 'value').set;
+        el.focus();
+        setValue.call(el, field.append ? el.value + field.value : field.value);
+    } else if (el.isContentEditable) {
+        el.focus();
+        el.textContent = field.append ? el.textContent + field.value : field.value;
+    } else {
+        return {status: 'unsupported', type: type || tag.toLowerCase()};
+    }
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    return {status: 'ok', type: type || tag.toLowerCase()};
+})'''
+
+
+# 页面端辅助库版本（修改上面任一页面端 JS 时递增，页面中旧版本的库会被替换）
+PAGE_HELPERS_VERSION = 9
+
+# 页面端辅助库的安装函数：通过 add_init_script 在每个文档（含 iframe）中安装一次 window.__mcp，
+# 之后每次调用只传递函数名和参数，参数不再拼接到 JS 源码中
+_PAGE_HELPERS_JS = '''() => {
+    const VERSION = ''' + str(PAGE_HELPERS_VERSION) + ''';
+    if (window.__mcp && window.__mcp.version === VERSION) return;
+    let extractLinks = true;
+    let markdownCache = null;
+    ''' + _HTML_TO_MARKDOWN_JS + _MARKDOWN_BLOCKS_JS + '''
+    window.__mcp = {
+        version: VERSION,
+        scan: ''' + _ELEMENT_SCAN_JS + ''',
+        selectorFor: ''' + _ELEMENT_SELECTOR_JS + ''',
+        findText: ''' + _TEXT_SEARCH_JS + ''',
+        pageVersion: ''' + _PAGE_VERSION_JS + ''',
+        predicates: ''' + _WAIT_PREDICATES_JS + ''',
+        waitFor: ''' + _WAIT_FOR_JS + ''',
+        serp: ''' + _SERP_EXTRACT_JS + ''',
+        fillFields: ''' + _FILL_FIELDS_JS + ''',
+        elementAt: ''' + _ELEMENT_AT_JS + ''',
+        markdown: (links) => {
+            extractLinks = links;
+            return htmlToMarkdown(document.body);
+        },
+        markdownChunk: ''' + _MARKDOWN_CHUNK_JS + ''',
+        innerText: (limit) => {
+            const text = document.body ? document.body.innerText : '';
+            return limit ? text.substring(0, limit) : text;
+        },
+        clearElements: () => {
+            window.__mcpElements = null;
+            window.__mcpElementLookup = null;
+        },
+    };
+}'''
+
+# 调用辅助库中的函数；库未安装或版本不符（如 init script 之前已加载的文档）时返回标记，由调用方注入后重试
+_PAGE_HELPER_CALL_JS = '''([version, name, arg]) => {
+    const mcp = window.__mcp;
+    if (!mcp || mcp.version !== version) return {__mcpMissing: true};
+    return mcp[name](arg);
+}'''
+
+# 下拉框选项（在下拉框元素上执行）
+_SELECT_OPTIONS_JS = '''(select) => {
+    if (select.tagName !== 'SELECT') return [];
+    return Array.from(select.options).map(opt => ({
+        value: opt.value,
+        text: opt.text,
+        selected: opt.selected,
+    }));
+}'''
+
+# 读写当前页面源的 localStorage / sessionStorage：键名支持通配符（* 和 ?），
+# 筛选和分页在页面端完成，只返回当前页的条目
+_WEB_STORAGE_JS = '''(args) => {
+    const store = args.area === 'session' ? window.sessionStorage : window.localStorage;
+    const pattern = args.pattern || '';
+    let match = () => true;
+    if (/[*?]/.test(pattern)) {
+        const source = pattern.replace(/[.+^${}()|[\\]\\\\]/g, '\\\\$&').replace(/\\*/g, '.*').replace(/\\?/g, '.');
+        const regex = new RegExp('^' + source + '$');
+        match = (key) => regex.test(key);
+    } else if (pattern) {
+        match = (key) => key === pattern;
+    }
+    const keys = [];
+    for (let i = 0; i < store.length; i++) {
+        const key = store.key(i);
+        if (key !== null) keys.push(key);
+    }
+    const result = {origin: location.origin, area: args.area, size: keys.length};
+    
+    if (args.op === 'get') {
+        const matched = keys.filter(match).sort();
+        result.total = matched.length;
+        result.entries = matched.slice(args.offset, args.offset + args.limit).map((key) => {
+            const value = store.getItem(key) || '';
+            const entry = {key: key, value: value.substring(0, args.maxValueLength), length: value.length};
+            if (value.length > args.maxValueLength) entry.truncated = true;
+            return entry;
+        });
+    } else if (args.op === 'set') {
+        result.set = [];
+        for (const [key, value] of Object.entries(args.items || {})) {
+            try {
+                store.setItem(key, typeof value === 'string' ? value : JSON.stringify(value));
+                result.set.push(key);
+            } catch (e) {
+                result.error = key + ': ' + e.name;
+                break;
+            }
+        }
+    } else if (args.op === 'delete') {
+        const explicit = args.keys || [];
+        result.deleted = keys.filter((key) => explicit.length ? explicit.includes(key) : match(key));
+        result.deleted.forEach((key) => store.removeItem(key));
+    } else if (args.op === 'clear') {
+        result.deleted = keys;
+        store.clear();
+    }
+    return result;
+}'''
+
+# 内存中最多保留的上下文检查点数
+MAX_CHECKPOINTS = 20
+
+# wait_for 支持的条件；text / count / predicate 在页面端由 DOM 变化、加载状态事件和低频轮询驱动检查
+WAIT_CONDITIONS = ("visible", "hidden", "text", "url", "network_idle", "count", "predicate")
+WAIT_PREDICATES = ("ready", "not_busy")
+
+
 class PlaywrightBrowserManager:
     """基于 Playwright 的浏览器管理器
     
     直接使用 Playwright 操作浏览器，完全在 WSL 中执行。
     """
     
-    def __init__(self, session_dir: Optional[str] = None):
+    def __init__(
+        self,
+        session_dir: Optional[str] = None,
+        compress_sessions: Optional[bool] = None,
+        browser_provider: Optional[Callable[[bool], Awaitable[Tuple[Any, str]]]] = None,
+    ):
         """
         初始化浏览器管理器
         
         Args:
             session_dir: 会话数据存储目录，默认为 ~/.browser_use_mcp/sessions
+            compress_sessions: 是否使用 gzip 压缩保存会话状态，
+                默认读取环境变量 BROWSER_USE_MCP_COMPRESS_SESSIONS
+            browser_provider: 共享浏览器的提供函数（参数为 headless）。指定后会话只创建
+                独立的浏览器上下文，关闭会话时不关闭浏览器；不指定则每个会话独占一个浏览器
         """
         self.session_dir = Path(session_dir) if session_dir else Path.home() / ".browser_use_mcp" / "sessions"
         self.session_dir.mkdir(parents=True, exist_ok=True)
         
+        if compress_sessions is None:
+            compress_sessions = os.environ.get("BROWSER_USE_MCP_COMPRESS_SESSIONS", "").lower() in ("1", "true", "yes")
+        self._session_store = SessionStore(self.session_dir, compress=compress_sessions)
+        
+        self._browser_provider = browser_provider
         self._playwright = None
         self._browser = None
         self._context = None
         self._page = None
         self._current_session_id: Optional[str] = None
+        self._headless: Optional[bool] = None
+        
+        # 元素索引映射及扫描预算（框架数、元素数、是否扫描 shadow root）
+        self._element_map = ElementMap()
+        self._scan_options: Dict[str, Any] = {"max_elements": 2000, "max_frames": 10, "shadow_dom": True}
+        self._last_scan: Optional[Dict[str, Any]] = None
+        
+        # 并行抓取任务（crawl_id -> 任务状态）
+        self._crawl_jobs: Dict[str, dict] = {}
+        
+        # 网络响应记录器（按需开启）
+        self._network_recorder: Optional[NetworkRecorder] = None
+        
+        # 下载管理器（创建会话时开启）
+        self._downloads: Optional[DownloadManager] = None
+        
+        # 操作录制器
+        self._recorder = ActionRecorder(self.session_dir.parent / "scripts")
         
-        # 元素索引映射
-        self._element_map: Dict[int, dict] = {}
+        # CDP 画面流（按需开启）
+        self._screencast: Optional[Screencast] = None
         
-    def _get_storage_state_file(self, session_id: str) -> Path:
-        """获取存储状态文件路径"""
-        return self.session_dir / f"{session_id}_storage_state.json"
+        # 搜索结果缓存（同一查询在 TTL 内直接返回）
+        self._serp_cache = SerpCache()
+        
+        # 标签页管理（数量上限、空闲超时，创建会话时开启）
+        self._tabs: Optional[TabManager] = None
+        self._tab_policy: Dict[str, Any] = {"max_tabs": 8, "idle_timeout": 600}
+        
+        # 内存中的上下文检查点（名称 -> 存储状态和标签页 URL）
+        self._checkpoints: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        
+        # 操作耗时指标与 Playwright tracing 状态
+        self._metrics = MetricsRecorder()
+        self._tracing_active = False
+        
+        # get_state 截图缓存（页面版本不变时复用）
+        self._screenshot_cache: Optional[Dict[str, Any]] = None
+        self._screenshots_skipped = 0
     
     def _get_sensitive_data(self) -> Dict[str, str]:
         """获取敏感数据（从 .env 文件加载）"""
         return load_credentials()
     
+    async def _new_worker_page(self):
+        """打开后台任务（抓取、导出、搜索翻页）使用的页面，不计入标签页数量上限，也不会因空闲被关闭"""
+        if self._tabs:
+            return await self._tabs.new_internal_page()
+        return await self._context.new_page()
+    
+    async def _new_context(self, storage_state: Optional[Dict[str, Any]] = None):
+        """在当前浏览器中创建上下文（安装页面端辅助库），storage_state 为要恢复的 cookies 和 localStorage"""
+        context_options = {
+            'viewport': {'width': 1280, 'height': 720},
+            'accept_downloads': True,
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        }
+        if storage_state is not None:
+            context_options['storage_state'] = storage_state
+        
+        context = await self._browser.new_context(**context_options)
+        await context.add_init_script(script=f"({_PAGE_HELPERS_JS})()")
+        return context
+    
+    @traced("create_session")
     async def create_session(
         self,
         session_id: str,
@@ -154,49 +995,60 @@ class PlaywrightBrowserManager:
             headless: 是否无头模式
             
         Returns:
-            会话信息字典
+            会话信息字典（time_to_page_ms 为得到可用页面的耗时，startup 表示
+            浏览器来源：cold 冷启动、prewarmed 预热、pooled 复用共享浏览器）
         """
-        from playwright.async_api import async_playwright
+        started = time.perf_counter()
         
         # 关闭现有会话
-        if self._browser:
+        if self._browser or self._context:
             await self.close_session(save=True)
         
-        storage_state_file = self._get_storage_state_file(session_id)
-        
         # 检查是否有保存的会话状态
-        restored = storage_state_file.exists()
+        storage_state = self._session_store.load(session_id)
+        restored = storage_state is not None
         
         try:
-            # 启动 Playwright
-            self._playwright = await async_playwright().start()
-            
-            # 启动浏览器
-            self._browser = await self._playwright.chromium.launch(
-                headless=headless,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                ]
-            )
-            
-            # 创建浏览器上下文
-            context_options = {
-                'viewport': {'width': 1280, 'height': 720},
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            }
+            if self._browser_provider:
+                # 使用共享的浏览器，本会话只占用一个独立的上下文
+                with self._metrics.span("create_session.launch"):
+                    self._browser, startup = await self._browser_provider(headless)
+            else:
+                startup = "cold"
+                
+                # 延迟导入，服务器启动和列出工具时不加载 Playwright
+                with self._metrics.span("create_session.import"):
+                    from playwright.async_api import async_playwright
+                
+                # 启动 Playwright
+                with self._metrics.span("create_session.playwright_start"):
+                    self._playwright = await async_playwright().start()
+                
+                # 启动浏览器
+                with self._metrics.span("create_session.launch"):
+                    self._browser = await self._playwright.chromium.launch(
+                        headless=headless,
+                        args=_CHROMIUM_ARGS,
+                    )
             
-            if restored:
-                context_options['storage_state'] = str(storage_state_file)
+            # 创建浏览器上下文和页面
+            with self._metrics.span("create_session.new_context"):
+                self._context = await self._new_context(storage_state)
+                self._page = await self._context.new_page()
             
-            self._context = await self._browser.new_context(**context_options)
+            # 每个会话独立的下载目录（会话 ID 中的路径分隔符、.. 等替换掉，与脚本名的处理一致）
+            safe_id = re.sub(r'[^\w.-]+', '_', session_id).strip('._') or 'session'
+            self._downloads = DownloadManager(self.session_dir.parent / "downloads" / safe_id)
+            self._downloads.attach(self._context)
             
-            # 创建页面
-            self._page = await self._context.new_page()
+            self._tabs = TabManager(**self._tab_policy)
+            self._tabs.attach(self._context, lambda: self._page)
             
             self._current_session_id = session_id
+            self._headless = headless
+            
+            # 按浏览器来源分别统计得到可用页面的耗时
+            time_to_page = self._metrics.record_span(f"create_session.first_page.{startup}", started)
             
             now = datetime.datetime.now().isoformat()
             
@@ -207,6 +1059,8 @@ class PlaywrightBrowserManager:
                 "restored": restored,
                 "created_at": now,
                 "headless": headless,
+                "startup": startup,
+                "time_to_page_ms": round(time_to_page * 1000, 1),
             }
             
         except Exception as e:
@@ -217,8 +1071,177 @@ class PlaywrightBrowserManager:
                 "traceback": traceback.format_exc(),
             }
     
-    async def save_session(self, session_id: Optional[str] = None) -> Dict[str, Any]:
-        """保存当前会话状态"""
+    @traced("create_checkpoint")
+    async def create_checkpoint(self, name: str) -> Dict[str, Any]:
+        """
+        在内存中保存当前上下文的检查点（cookies、localStorage 和所有标签页的 URL）
+        
+        同名检查点会被覆盖，最多保留 MAX_CHECKPOINTS 个（超出时丢弃最早的）。
+        
+        Args:
+            name: 检查点名称
+        
+        Returns:
+            检查点信息
+        """
+        try:
+            await self._ensure_page()
+            
+            with self._metrics.span("checkpoint.storage_state"):
+                storage_state = await self._context.storage_state()
+            pages = self._context.pages
+            checkpoint = {
+                "name": name,
+                "session_id": self._current_session_id,
+                "storage_state": storage_state,
+                "tabs": [page.url for page in pages],
+                "active_tab": pages.index(self._page) if self._page in pages else 0,
+                "created_at": datetime.datetime.now().isoformat(),
+            }
+            self._checkpoints.pop(name, None)
+            self._checkpoints[name] = checkpoint
+            while len(self._checkpoints) > MAX_CHECKPOINTS:
+                self._checkpoints.popitem(last=False)
+            
+            return {
+                "success": True,
+                **self._checkpoint_info(checkpoint),
+                "message": f"已保存检查点 '{name}'（{len(checkpoint['tabs'])} 个标签页）",
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    @staticmethod
+    def _checkpoint_info(checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+        """检查点摘要（不包含 cookie 值）"""
+        storage_state = checkpoint["storage_state"]
+        return {
+            "name": checkpoint["name"],
+            "session_id": checkpoint["session_id"],
+            "tabs": checkpoint["tabs"],
+            "active_tab": checkpoint["active_tab"],
+            "cookies": len(storage_state.get("cookies", [])),
+            "origins": len(storage_state.get("origins", [])),
+            "created_at": checkpoint["created_at"],
+        }
+    
+    def list_checkpoints(self) -> Dict[str, Any]:
+        """列出内存中的检查点"""
+        checkpoints = [self._checkpoint_info(checkpoint) for checkpoint in self._checkpoints.values()]
+        return {"success": True, "checkpoints": checkpoints, "count": len(checkpoints)}
+    
+    @traced("restore_checkpoint")
+    async def restore_checkpoint(self, name: str) -> Dict[str, Any]:
+        """
+        恢复检查点：在运行中的浏览器里新建上下文（不重启 Chromium），
+        载入检查点的 cookies 和 localStorage，并重新打开当时的标签页
+        
+        Args:
+            name: 检查点名称
+        
+        Returns:
+            恢复结果（elapsed_ms 为恢复耗时）
+        """
+        try:
+            await self._ensure_page()
+            
+            checkpoint = self._checkpoints.get(name)
+            if not checkpoint:
+                return {
+                    "success": False,
+                    "error": f"检查点 '{name}' 不存在",
+                    "available": list(self._checkpoints.keys()),
+                }
+            if self._tracing_active:
+                return {"success": False, "error": "Playwright tracing 正在运行，请先停止 tracing 再恢复检查点"}
+            
+            started = time.perf_counter()
+            
+            # 依赖旧上下文的抓取任务和画面流无法迁移
+            for job in self._crawl_jobs.values():
+                if job["task"] and not job["task"].done():
+                    job["task"].cancel()
+            self._crawl_jobs = {}
+            if self._screencast:
+                await self._screencast.stop()
+                self._screencast = None
+            
+            with self._metrics.span("checkpoint.new_context"):
+                context = await self._new_context(checkpoint["storage_state"])
+            
+            # 下载、网络记录和标签页管理切换到新上下文
+            old_context = self._context
+            for helper in (self._downloads, self._network_recorder):
+                if helper:
+                    helper.detach()
+            if self._tabs:
+                self._tabs.detach()
+            
+            self._context = context
+            
+            # 标签页按原顺序创建，再并行加载
+            with self._metrics.span("checkpoint.open_tabs", tabs=len(checkpoint["tabs"])):
+                pages = [await context.new_page() for _ in checkpoint["tabs"]]
+                loads = await asyncio.gather(
+                    *(page.goto(url, wait_until='domcontentloaded', timeout=30000)
+                      for page, url in zip(pages, checkpoint["tabs"], strict=True) if url and url != "about:blank"),
+                    return_exceptions=True,
+                )
+                if not pages:
+                    pages = [await context.new_page()]
+            errors = [str(result).splitlines()[0] for result in loads if isinstance(result, Exception)]
+            
+            self._page = pages[min(checkpoint["active_tab"], len(pages) - 1)]
+            await self._page.bring_to_front()
+            
+            for helper in (self._downloads, self._network_recorder):
+                if helper:
+                    helper.attach(context)
+            self._tabs = TabManager(**self._tab_policy)
+            self._tabs.attach(context, lambda: self._page)
+            
+            self._element_map = ElementMap()
+            self._screenshot_cache = None
+            
+            with self._metrics.span("checkpoint.close_old_context"):
+                try:
+                    await old_context.close()
+                except Exception as e:
+                    logger.debug(f"关闭旧上下文失败: {e}")
+            
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            return {
+                "success": True,
+                "name": name,
+                "tabs": [page.url for page in pages],
+                "active_tab": pages.index(self._page),
+                "load_errors": errors,
+                "elapsed_ms": elapsed_ms,
+                "message": f"已恢复检查点 '{name}'（{len(pages)} 个标签页，耗时 {elapsed_ms} ms）",
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def delete_checkpoint(self, name: str) -> Dict[str, Any]:
+        """删除检查点"""
+        if self._checkpoints.pop(name, None) is None:
+            return {"success": False, "error": f"检查点 '{name}' 不存在"}
+        return {"success": True, "message": f"已删除检查点 '{name}'"}
+    
+    @traced("save_session")
+    async def save_session(self, session_id: Optional[str] = None, compress: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        保存当前会话状态
+        
+        只有 cookies 或 localStorage 发生变化时才会写盘（原子写入）。
+        
+        Args:
+            session_id: 会话标识符（可选，默认为当前会话）
+            compress: 是否使用 gzip 压缩（可选，默认使用管理器设置）
+        
+        Returns:
+            保存结果
+        """
         session_id = session_id or self._current_session_id
         
         if not session_id:
@@ -228,18 +1251,22 @@ class PlaywrightBrowserManager:
             return {"success": False, "error": "浏览器上下文未初始化"}
         
         try:
-            storage_state_file = self._get_storage_state_file(session_id)
-            await self._context.storage_state(path=str(storage_state_file))
+            storage_state = await self._context.storage_state()
+            saved = self._session_store.save(session_id, storage_state, compress=compress)
             
             return {
                 "success": True,
                 "session_id": session_id,
-                "storage_state_file": str(storage_state_file),
-                "message": f"会话 '{session_id}' 已保存",
+                "storage_state_file": saved["file"],
+                "written": saved["written"],
+                "changed": saved["changed"],
+                "size_bytes": saved["size_bytes"],
+                "message": f"会话 '{session_id}' 已保存" if saved["written"] else f"会话 '{session_id}' 无变化，跳过写入",
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @traced("close_session")
     async def close_session(self, save: bool = True) -> Dict[str, Any]:
         """关闭当前会话"""
         result = {"success": True, "message": "会话已关闭"}
@@ -248,6 +1275,28 @@ class PlaywrightBrowserManager:
             save_result = await self.save_session()
             result["saved"] = save_result.get("success", False)
         
+        # 停止进行中的抓取任务
+        for job in self._crawl_jobs.values():
+            if job["task"] and not job["task"].done():
+                job["task"].cancel()
+        self._crawl_jobs = {}
+        
+        if self._network_recorder:
+            self._network_recorder.detach()
+            self._network_recorder = None
+        
+        if self._downloads:
+            self._downloads.detach()
+            self._downloads = None
+        
+        if self._screencast:
+            await self._screencast.stop()
+            self._screencast = None
+        
+        if self._tabs:
+            self._tabs.detach()
+            self._tabs = None
+        
         try:
             if self._page:
                 await self._page.close()
@@ -258,7 +1307,9 @@ class PlaywrightBrowserManager:
                 self._context = None
             
             if self._browser:
-                await self._browser.close()
+                # 共享的浏览器由提供方负责关闭
+                if not self._browser_provider:
+                    await self._browser.close()
                 self._browser = None
             
             if self._playwright:
@@ -268,15 +1319,26 @@ class PlaywrightBrowserManager:
             logger.error(f"关闭会话时出错: {e}")
         
         self._current_session_id = None
-        self._element_map = {}
+        self._headless = None
+        self._element_map = ElementMap()
+        self._tracing_active = False
+        self._screenshot_cache = None
         
         return result
     
+    @property
+    def is_active(self) -> bool:
+        """是否有打开的浏览器上下文（会话关闭后为 False）"""
+        return self._context is not None
+    
     async def _ensure_page(self):
         """确保页面已创建"""
         if not self._page:
             raise RuntimeError("没有活动的浏览器会话，请先创建会话")
+        if self._tabs:
+            self._tabs.touch(self._page)
     
+    @traced("navigate")
     async def navigate(self, url: str, new_tab: bool = False) -> Dict[str, Any]:
         """
         导航到指定 URL
@@ -294,10 +1356,14 @@ class PlaywrightBrowserManager:
             if new_tab:
                 self._page = await self._context.new_page()
             
-            await self._page.goto(url, wait_until='domcontentloaded', timeout=30000)
+            with self._metrics.span("navigate.goto"):
+                await self._page.goto(url, wait_until='domcontentloaded', timeout=30000)
             
             # 等待页面稳定
-            await asyncio.sleep(1)
+            with self._metrics.span("navigate.settle_sleep"):
+                await asyncio.sleep(1)
+            
+            self._record_step("navigate", url=url, new_tab=new_tab)
             
             return {
                 "success": True,
@@ -308,12 +1374,15 @@ class PlaywrightBrowserManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @traced("go_back")
     async def go_back(self) -> Dict[str, Any]:
         """后退到上一页"""
         try:
             await self._ensure_page()
             await self._page.go_back()
             
+            self._record_step("go_back")
+            
             return {
                 "success": True,
                 "message": "已后退到上一页",
@@ -321,173 +1390,294 @@ class PlaywrightBrowserManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    async def _build_element_map(self) -> List[dict]:
-        """构建可交互元素映射"""
-        await self._ensure_page()
-        
-        # 获取所有可交互元素
-        elements = await self._page.evaluate('''() => {
-            const interactiveSelectors = [
-                'a[href]',
-                'button',
-                'input',
-                'textarea',
-                'select',
-                '[role="button"]',
-                '[role="link"]',
-                '[role="textbox"]',
-                '[role="checkbox"]',
-                '[role="radio"]',
-                '[role="combobox"]',
-                '[role="menuitem"]',
-                '[role="tab"]',
-                '[onclick]',
-                '[tabindex]:not([tabindex="-1"])',
-            ];
-            
-            const elements = [];
-            const seen = new Set();
-            
-            for (const selector of interactiveSelectors) {
-                const nodes = document.querySelectorAll(selector);
-                for (const node of nodes) {
-                    // 跳过隐藏元素
-                    const style = window.getComputedStyle(node);
-                    if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0') {
-                        continue;
-                    }
-                    
-                    // 跳过已处理的元素
-                    if (seen.has(node)) continue;
-                    seen.add(node);
-                    
-                    const rect = node.getBoundingClientRect();
-                    if (rect.width === 0 || rect.height === 0) continue;
-                    
-                    const element = {
-                        tag: node.tagName.toLowerCase(),
-                        text: (node.innerText || node.value || '').substring(0, 100).trim(),
-                        type: node.type || null,
-                        name: node.name || null,
-                        placeholder: node.placeholder || null,
-                        href: node.href || null,
-                        role: node.getAttribute('role') || null,
-                        ariaLabel: node.getAttribute('aria-label') || null,
-                        id: node.id || null,
-                        className: node.className || null,
-                        rect: {
-                            x: rect.x,
-                            y: rect.y,
-                            width: rect.width,
-                            height: rect.height,
-                        },
-                        // 生成唯一选择器
-                        selector: generateSelector(node),
-                    };
-                    
-                    elements.push(element);
-                }
-            }
-            
-            function generateSelector(el) {
-                if (el.id) return '#' + CSS.escape(el.id);
-                
-                let path = [];
-                while (el && el.nodeType === Node.ELEMENT_NODE) {
-                    let selector = el.tagName.toLowerCase();
-                    if (el.id) {
-                        selector = '#' + CSS.escape(el.id);
-                        path.unshift(selector);
-                        break;
-                    }
-                    
-                    let sibling = el;
-                    let nth = 1;
-                    while (sibling = sibling.previousElementSibling) {
-                        if (sibling.tagName === el.tagName) nth++;
-                    }
-                    
-                    if (nth > 1) selector += ':nth-of-type(' + nth + ')';
-                    path.unshift(selector);
-                    el = el.parentElement;
-                    
-                    if (path.length > 5) break;
-                }
-                
-                return path.join(' > ');
-            }
-            
-            return elements;
-        }''')
-        
-        # 构建索引映射
-        self._element_map = {}
-        result = []
-        
-        for i, el in enumerate(elements):
-            self._element_map[i] = el
-            result.append({
-                "index": i,
-                "tag": el['tag'],
-                "text": el['text'],
-                "type": el.get('type'),
-                "name": el.get('name'),
-                "placeholder": el.get('placeholder'),
-                "href": el.get('href'),
-                "role": el.get('role'),
-                "aria_label": el.get('ariaLabel'),
-            })
+    def _record_step(self, action: str, index: Optional[int] = None, **fields):
+        """录制期间记录一步成功的操作（元素操作记录稳定定位器而非索引）"""
+        if not self._recorder.active:
+            return
+        step = {"action": action, "url": self._page.url if self._page else None}
+        if index is not None:
+            element = self._element_map.get(index)
+            if element:
+                step["locators"] = stable_locators(element)
+                step["element"] = describe_element(element)
+        step.update(fields)
+        self._recorder.record(step)
+    
+    async def _page_helper(self, target, name: str, arg: Any = None) -> Any:
+        """
+        调用页面端辅助库 window.__mcp 中的函数
         
+        Args:
+            target: Page 或 Frame
+            name: 函数名
+            arg: 参数（序列化后传入，不拼接到代码中）
+        """
+        result = await target.evaluate(_PAGE_HELPER_CALL_JS, [PAGE_HELPERS_VERSION, name, arg])
+        if isinstance(result, dict) and result.get("__mcpMissing"):
+            # init script 只对之后创建的文档生效，已加载的文档按需注入一次
+            self._metrics.increment("page_helper_injections")
+            await target.evaluate(_PAGE_HELPERS_JS)
+            result = await target.evaluate(_PAGE_HELPER_CALL_JS, [PAGE_HELPERS_VERSION, name, arg])
         return result
     
-    async def get_state(self, include_screenshot: bool = True) -> Dict[str, Any]:
+    async def _build_element_map(
+        self,
+        max_elements: Optional[int] = None,
+        max_frames: Optional[int] = None,
+        shadow_dom: Optional[bool] = None,
+    ) -> List[ElementRecord]:
         """
-        获取当前浏览器状态，包括可交互元素列表
+        构建可交互元素映射
+        
+        依次扫描主框架和子框架（iframe），每个框架内同时扫描开放的 shadow root。
+        框架和 shadow root 中的元素选择器带有框架路径（>> internal:control=enter-frame >>）
+        和宿主元素路径（>>），点击、输入等操作可以直接到达这些元素。
         
         Args:
-            include_screenshot: 是否包含截图
-            
-        Returns:
-            浏览器状态
+            max_elements: 元素总数上限（None 表示沿用上次的设置）
+            max_frames: 扫描的框架数上限（含主框架）
+            shadow_dom: 是否扫描开放的 shadow root
         """
-        try:
-            await self._ensure_page()
-            
+        await self._ensure_page()
+        
+        options = self._scan_options
+        if max_elements is not None:
+            options["max_elements"] = max(int(max_elements), 1)
+        if max_frames is not None:
+            options["max_frames"] = max(int(max_frames), 1)
+        if shadow_dom is not None:
+            options["shadow_dom"] = bool(shadow_dom)
+        
+        self._metrics.increment("element_map_rebuilds")
+        
+        main_frame = self._page.main_frame
+        queue: List[Tuple[Any, Tuple[str, ...]]] = [(main_frame, ())]
+        elements: List[ElementRecord] = []
+        frames_stats: List[Dict[str, Any]] = []
+        budget_exhausted = False
+        
+        # 获取所有可交互元素（按框架分别计时）
+        with self._metrics.span("element_map.scan"):
+            while queue:
+                frame, frame_path = queue.pop(0)
+                remaining = options["max_elements"] - len(elements)
+                if remaining <= 0:
+                    budget_exhausted = True
+                    break
+                
+                stats = {"frame": " > ".join(frame_path) or "main", "url": frame.url}
+                started = time.perf_counter()
+                try:
+                    with self._metrics.span("element_map.scan.frame", url=frame.url):
+                        scanned = await self._page_helper(frame, "scan", {
+                            "maxElements": remaining,
+                            "shadowDom": options["shadow_dom"],
+                            "exposeNodes": frame is main_frame,
+                        })
+                except Exception as e:
+                    # 框架在扫描期间被移除或导航
+                    stats.update({"elements": 0, "error": str(e)})
+                    frames_stats.append(stats)
+                    continue
+                
+                prefix = "".join(f"{p} >> internal:control=enter-frame >> " for p in frame_path)
+                for row in scanned["elements"]:
+                    record = ElementRecord.from_row(len(elements), row, frame_path or None)
+                    if frame_path:
+                        record.selector = prefix + record.selector
+                    elements.append(record)
+                
+                stats.update({
+                    "elements": len(scanned["elements"]),
+                    "shadow_roots": scanned["shadowRoots"],
+                    "ms": round((time.perf_counter() - started) * 1000, 1),
+                })
+                if scanned["truncated"]:
+                    budget_exhausted = True
+                frames_stats.append(stats)
+                
+                for child in frame.child_frames:
+                    if len(frames_stats) + len(queue) >= options["max_frames"]:
+                        budget_exhausted = True
+                        break
+                    try:
+                        handle = await child.frame_element()
+                        # 父框架刚扫描过，辅助库已安装
+                        iframe_selector = await handle.evaluate('(el) => window.__mcp.selectorFor(el)')
+                    except Exception as e:
+                        logger.debug(f"无法定位子框架 {child.url}: {e}")
+                        continue
+                    queue.append((child, frame_path + (iframe_selector,)))
+        
+        self._metrics.increment("element_map_elements", len(elements))
+        self._last_scan = {
+            "frames": frames_stats,
+            "budget_exhausted": budget_exhausted,
+            **options,
+        }
+        
+        # 构建索引映射（详细描述由 record.describe() 按需生成）
+        self._element_map = ElementMap(elements)
+        return self._element_map.records()
+    
+    async def _build_accessibility_snapshot(self, max_chars: int = 8000) -> Tuple[str, List[dict]]:
+        """
+        基于无障碍树构建紧凑的页面大纲，并用 role 选择器重建元素映射
+        
+        快照的节点顺序和名称计算不保证与 role 选择器引擎一致，分配索引前按选择器校验：
+        引擎实际匹配的元素数与快照中的数量不同时，这些节点不分配索引，避免 nth 指向其他元素。
+        
+        Returns:
+            (大纲文本, 可交互元素列表)
+        """
+        with self._metrics.span("accessibility.snapshot"):
+            tree = await self._page.accessibility.snapshot(interesting_only=True)
+        with self._metrics.span("accessibility.compact"):
+            outline, nodes = compact_accessibility_tree(tree, max_chars=max_chars)
+        
+        with self._metrics.span("accessibility.verify"):
+            expected = {node["base_selector"]: node["matches"] for node in nodes}
+            counts = await asyncio.gather(*(self._page.locator(base).count() for base in expected))
+            mismatched = {
+                base for (base, matches), count in zip(expected.items(), counts, strict=True)
+                if count != matches
+            }
+        if mismatched:
+            self._metrics.increment("accessibility_unresolved", len(mismatched))
+            outline, nodes = compact_accessibility_tree(tree, max_chars=max_chars, skip_selectors=mismatched)
+        
+        self._metrics.increment("element_map_rebuilds")
+        self._metrics.increment("element_map_elements", len(nodes))
+        
+        # 文本搜索关联的是 DOM 扫描的元素索引，切换到无障碍树后不再适用
+        await self._page_helper(self._page, "clearElements")
+        
+        self._element_map = ElementMap([
+            ElementRecord(node["index"], node["role"], node["name"], role=node["role"], selector=node["selector"])
+            for node in nodes
+        ])
+        result = []
+        for node in nodes:
+            result.append({
+                "index": node["index"],
+                "role": node["role"],
+                "name": node["name"],
+            })
+        
+        return outline, result
+    
+    async def _state_screenshot(self, force: bool = False) -> Dict[str, Any]:
+        """
+        get_state 的截图：页面版本与上次截图时相同则不再截图和编码，
+        返回 screenshot_unchanged（调用方沿用上一次返回的截图）
+        """
+        with self._metrics.span("get_state.page_version"):
+            version = f"{id(self._page)}|" + await self._page_helper(self._page, "pageVersion")
+        
+        cache = self._screenshot_cache
+        if not force and cache and cache["version"] == version:
+            self._screenshots_skipped += 1
+            self._metrics.increment("screenshots_skipped")
+            return {
+                "screenshot_unchanged": True,
+                "screenshots_skipped": self._screenshots_skipped,
+            }
+        
+        with self._metrics.span("get_state.screenshot"):
+            screenshot_bytes = await self._page.screenshot(type='png')
+        with self._metrics.span("get_state.screenshot_encode", bytes=len(screenshot_bytes)):
+            screenshot_base64 = base64.b64encode(screenshot_bytes).decode('utf-8')
+        
+        self._screenshot_cache = {"version": version}
+        return {
+            "screenshot_unchanged": False,
+            "screenshot_base64": screenshot_base64,
+            "screenshots_skipped": self._screenshots_skipped,
+        }
+    
+    @traced("get_state")
+    async def get_state(
+        self,
+        include_screenshot: bool = True,
+        mode: str = "dom",
+        max_chars: int = 8000,
+        force_screenshot: bool = False,
+        max_elements: Optional[int] = None,
+        max_frames: Optional[int] = None,
+        shadow_dom: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        获取当前浏览器状态，包括可交互元素列表
+        
+        Args:
+            include_screenshot: 是否包含截图（页面版本未变化时复用上次的截图）
+            mode: 快照模式，dom 为 DOM 元素扫描，accessibility 为无障碍树大纲
+                （角色、名称、状态，体积更小，元素索引同样可用于点击/输入）
+            max_chars: accessibility 模式下大纲文本的最大字符数
+            force_screenshot: 忽略页面版本，强制重新截图（canvas/视频/CSS 动画
+                等不触发 DOM 变化的更新需要强制截图）
+            max_elements: dom 模式下扫描的元素总数上限（默认 2000，设置后对后续扫描生效）
+            max_frames: dom 模式下扫描的框架数上限（含主框架，默认 10）
+            shadow_dom: dom 模式下是否扫描开放的 shadow root（默认 true）
+            
+        Returns:
+            浏览器状态
+        """
+        try:
+            if mode not in ("dom", "accessibility"):
+                return {"success": False, "error": f"不支持的快照模式: {mode}"}
+            
+            await self._ensure_page()
+            
             # 获取基本信息
             url = self._page.url
             title = await self._page.title()
             
-            # 获取所有标签页
-            tabs = []
-            for i, page in enumerate(self._context.pages):
-                tabs.append({
-                    "id": i,
-                    "url": page.url,
-                    "title": await page.title(),
-                })
-            
-            # 构建元素映射
-            elements = await self._build_element_map()
-            
-            result = {
-                "success": True,
-                "url": url,
-                "title": title,
-                "tabs": tabs,
-                "elements": elements,
-                "elements_count": len(elements),
-            }
+            # 获取所有标签页（并行读取标题）
+            with self._metrics.span("get_state.tabs"):
+                pages = self._context.pages
+                titles = await asyncio.gather(*(page.title() for page in pages))
+                tabs = [
+                    {"id": i, "url": page.url, "title": title}
+                    for i, (page, title) in enumerate(zip(pages, titles, strict=True))
+                ]
             
-            # 获取页面文本内容（简化版）
-            dom_text = await self._page.evaluate('''() => {
-                return document.body.innerText.substring(0, 5000);
-            }''')
-            result["dom_text"] = dom_text
+            if mode == "accessibility":
+                # 大纲中已包含页面文本，不再单独提取 dom_text
+                outline, elements = await self._build_accessibility_snapshot(max_chars)
+                result = {
+                    "success": True,
+                    "mode": mode,
+                    "url": url,
+                    "title": title,
+                    "tabs": tabs,
+                    "elements": elements,
+                    "elements_count": len(elements),
+                    "accessibility_outline": outline,
+                }
+            else:
+                # 构建元素映射（映射中为紧凑的 ElementRecord，返回给调用方时转换为可序列化的字典）
+                elements = await self._build_element_map(max_elements, max_frames, shadow_dom)
+                
+                result = {
+                    "success": True,
+                    "mode": mode,
+                    "url": url,
+                    "title": title,
+                    "tabs": tabs,
+                    "elements": [record.describe() for record in elements],
+                    "elements_count": len(elements),
+                    "scan": self._last_scan,
+                }
+                
+                # 获取页面文本内容（简化版）
+                with self._metrics.span("get_state.dom_text"):
+                    dom_text = await self._page_helper(self._page, "innerText", 5000)
+                result["dom_text"] = dom_text
             
             # 截图
             if include_screenshot:
-                screenshot_bytes = await self._page.screenshot(type='png')
-                result["screenshot_base64"] = base64.b64encode(screenshot_bytes).decode('utf-8')
+                result.update(await self._state_screenshot(force_screenshot))
             
             return result
             
@@ -495,6 +1685,7 @@ class PlaywrightBrowserManager:
             import traceback
             return {"success": False, "error": str(e), "traceback": traceback.format_exc()}
     
+    @traced("click_element")
     async def click_element(self, index: int) -> Dict[str, Any]:
         """
         点击指定索引的元素
@@ -517,10 +1708,14 @@ class PlaywrightBrowserManager:
             element = self._element_map[index]
             selector = element['selector']
             
-            await self._page.click(selector, timeout=5000)
+            with self._metrics.span("click_element.click"):
+                await self._page.click(selector, timeout=5000)
             
             # 等待页面响应
-            await asyncio.sleep(0.5)
+            with self._metrics.span("click_element.settle_sleep"):
+                await asyncio.sleep(0.5)
+            
+            self._record_step("click", index)
             
             return {
                 "success": True,
@@ -530,6 +1725,7 @@ class PlaywrightBrowserManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @traced("input_text")
     async def input_text(self, index: int, text: str, clear_first: bool = True) -> Dict[str, Any]:
         """
         在指定索引的输入框中输入文本
@@ -542,6 +1738,20 @@ class PlaywrightBrowserManager:
         Returns:
             输入结果
         """
+        result = await self._fill_element(index, text, clear_first)
+        
+        if result.get("success"):
+            # 密码框中的明文不写入录制脚本
+            element = self._element_map.get(index)
+            if element and (element.get('type') or '').lower() == 'password':
+                self._record_step("input", index, value=None, redacted=True, clear_first=clear_first)
+            else:
+                self._record_step("input", index, value=text, clear_first=clear_first)
+        
+        return result
+    
+    async def _fill_element(self, index: int, text: str, clear_first: bool = True) -> Dict[str, Any]:
+        """在指定索引的输入框中填入文本（不录制）"""
         try:
             await self._ensure_page()
             
@@ -551,12 +1761,7 @@ class PlaywrightBrowserManager:
                     return {"success": False, "error": f"元素索引 {index} 不存在"}
             
             element = self._element_map[index]
-            selector = element['selector']
-            
-            if clear_first:
-                await self._page.fill(selector, text, timeout=5000)
-            else:
-                await self._page.type(selector, text, timeout=5000)
+            await self._fill_locator(self._page.locator(element['selector']).first, text, clear_first)
             
             return {
                 "success": True,
@@ -567,6 +1772,156 @@ class PlaywrightBrowserManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    async def _fill_locator(self, locator, text: str, clear_first: bool = True, timeout: float = 5):
+        """
+        通过 Playwright 填写输入框
+        
+        clear_first 为 False 时把光标移到末尾后一次性插入文本（只触发一次 input 事件），
+        不再逐字符发送按键。
+        """
+        if clear_first:
+            await locator.fill(text, timeout=timeout * 1000)
+            return
+        await locator.focus(timeout=timeout * 1000)
+        await locator.evaluate('''(el) => {
+            try {
+                if (el.value != null) el.setSelectionRange(el.value.length, el.value.length);
+            } catch (e) {
+                // email / number 等类型不支持 setSelectionRange，光标保持原位
+            }
+        }''')
+        # 定位器可能属于其他标签页，使用它所在页面的键盘
+        await locator.page.keyboard.insert_text(text)
+    
+    @traced("fill_form")
+    async def fill_form(self, fields: List[Dict[str, Any]], clear_first: bool = True) -> Dict[str, Any]:
+        """
+        批量填写表单
+        
+        普通 CSS 选择器定位的字段在一次页面调用中全部定位并赋值（原生 setter + input/change 事件），
+        iframe、shadow DOM、role 选择器或页面端找不到的字段再逐个用 Playwright fill 填写。
+        
+        Args:
+            fields: 字段列表，每项包含 index（元素索引）或 selector（选择器），
+                以及 value（文本；复选框/单选框为是否选中，下拉框为选项值或文本）或 credential_key（凭证键名），
+                可选 clear_first 覆盖全局设置
+            clear_first: 是否先清空输入框（False 时追加到现有内容之后）
+        
+        Returns:
+            每个字段的填写结果（凭证值不会出现在结果中）
+        """
+        try:
+            await self._ensure_page()
+            
+            if not fields:
+                return {"success": False, "error": "字段列表为空"}
+            
+            if any(field.get("index") is not None and field["index"] not in self._element_map for field in fields):
+                await self._build_element_map()
+            
+            sensitive_data = None
+            results: List[Dict[str, Any]] = []
+            targets: List[Optional[Dict[str, Any]]] = []
+            for i, field in enumerate(fields):
+                index = field.get("index")
+                result = {"field": i, "target": f"元素 {index}" if index is not None else field.get("selector")}
+                results.append(result)
+                targets.append(None)
+                
+                if index is not None:
+                    if index not in self._element_map:
+                        result.update({"success": False, "error": f"元素索引 {index} 不存在"})
+                        continue
+                    selector = self._element_map[index]["selector"]
+                elif field.get("selector"):
+                    selector = field["selector"]
+                else:
+                    result.update({"success": False, "error": "需要提供 index 或 selector"})
+                    continue
+                
+                credential_key = field.get("credential_key")
+                if credential_key:
+                    if sensitive_data is None:
+                        sensitive_data = self._get_sensitive_data()
+                    if credential_key not in sensitive_data:
+                        result.update({"success": False, "error": f"凭证 '{credential_key}' 未配置"})
+                        continue
+                    value = sensitive_data[credential_key]
+                    result["credential_key"] = credential_key
+                elif "value" in field:
+                    value = field["value"]
+                    value = "" if value is None else value if isinstance(value, str) else json.dumps(value)
+                else:
+                    result.update({"success": False, "error": "需要提供 value 或 credential_key"})
+                    continue
+                
+                targets[i] = {
+                    "selector": selector,
+                    "value": value,
+                    "append": not field.get("clear_first", clear_first),
+                }
+            
+            # 普通 CSS 选择器：一次页面调用定位并填写
+            batch = [
+                i for i, target in enumerate(targets)
+                if target and ">>" not in target["selector"] and not target["selector"].startswith("internal:")
+            ]
+            fallback = [i for i, target in enumerate(targets) if target and i not in batch]
+            if batch:
+                with self._metrics.span("fill_form.batch", fields=len(batch)):
+                    statuses = await self._page_helper(self._page, "fillFields", [targets[i] for i in batch])
+                for i, status in zip(batch, statuses, strict=True):
+                    if status["status"] == "ok":
+                        results[i].update({"success": True, "method": "dom", "type": status.get("type")})
+                    elif status["status"] in ("not_found", "invalid_selector"):
+                        fallback.append(i)
+                    else:
+                        error = {
+                            "not_editable": "元素已禁用或只读",
+                            "no_option": "下拉框中没有该选项",
+                            "unsupported": f"不支持填写该类型的元素: {status.get('type')}",
+                        }.get(status["status"], status["status"])
+                        results[i].update({"success": False, "error": error})
+            
+            # 其余字段逐个用 Playwright 填写（依赖键盘焦点，不能并发）
+            for i in sorted(fallback):
+                target = targets[i]
+                try:
+                    await self._fill_locator(self._page.locator(target["selector"]).first, target["value"], not target["append"])
+                    results[i].update({"success": True, "method": "fill"})
+                except Exception as e:
+                    results[i].update({"success": False, "error": str(e).splitlines()[0]})
+            
+            for i, result in enumerate(results):
+                if not result["success"]:
+                    continue
+                field = fields[i]
+                index = field.get("index")
+                locator_fields = {} if index is not None else {"locators": [targets[i]["selector"]]}
+                clear = not targets[i]["append"]
+                if field.get("credential_key"):
+                    self._record_step("input_sensitive", index, credential_key=field["credential_key"], clear_first=clear, **locator_fields)
+                else:
+                    element = self._element_map.get(index) if index is not None else None
+                    is_password = result.get("type") == "password" or (element and (element.get('type') or '').lower() == 'password')
+                    if is_password:
+                        self._record_step("input", index, value=None, redacted=True, clear_first=clear, **locator_fields)
+                    else:
+                        self._record_step("input", index, value=targets[i]["value"], clear_first=clear, **locator_fields)
+            
+            succeeded = sum(1 for result in results if result["success"])
+            return {
+                "success": succeeded == len(results),
+                "fields": results,
+                "filled": succeeded,
+                "failed": len(results) - succeeded,
+                "error": None if succeeded == len(results) else f"{len(results) - succeeded} 个字段填写失败",
+                "message": f"已填写 {succeeded}/{len(results)} 个字段",
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    @traced("input_sensitive")
     async def input_sensitive(self, index: int, credential_key: str, clear_first: bool = True) -> Dict[str, Any]:
         """
         安全地在输入框中填入敏感数据
@@ -592,14 +1947,17 @@ class PlaywrightBrowserManager:
             }
         
         text = sensitive_data[credential_key]
-        result = await self.input_text(index, text, clear_first)
+        result = await self._fill_element(index, text, clear_first)
         
         if result.get("success"):
             result["message"] = f"已安全填入 {credential_key}（值已隐藏）"
             result.pop("text_length", None)
+            # 脚本中只记录凭证键名
+            self._record_step("input_sensitive", index, credential_key=credential_key, clear_first=clear_first)
         
         return result
     
+    @traced("send_keys")
     async def send_keys(self, keys: str) -> Dict[str, Any]:
         """
         发送键盘按键
@@ -615,6 +1973,8 @@ class PlaywrightBrowserManager:
             
             await self._page.keyboard.press(keys)
             
+            self._record_step("send_keys", keys=keys)
+            
             return {
                 "success": True,
                 "keys": keys,
@@ -623,6 +1983,7 @@ class PlaywrightBrowserManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @traced("scroll")
     async def scroll(self, direction: str = "down", index: Optional[int] = None) -> Dict[str, Any]:
         """
         滚动页面或元素
@@ -642,12 +2003,12 @@ class PlaywrightBrowserManager:
             if index is not None and index in self._element_map:
                 element = self._element_map[index]
                 selector = element['selector']
-                await self._page.evaluate(f'''(delta) => {{
-                    const el = document.querySelector("{selector}");
-                    if (el) el.scrollBy(0, delta);
-                }}''', delta)
+                # 通过定位器执行，iframe / shadow DOM / role 选择器同样适用
+                await self._page.locator(selector).first.evaluate('(el, delta) => el.scrollBy(0, delta)', delta)
             else:
-                await self._page.evaluate(f'window.scrollBy(0, {delta})')
+                await self._page.evaluate('(delta) => window.scrollBy(0, delta)', delta)
+            
+            self._record_step("scroll", index if index is not None and index in self._element_map else None, direction=direction)
             
             target = f"元素 {index}" if index else "页面"
             return {
@@ -659,6 +2020,7 @@ class PlaywrightBrowserManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @traced("switch_tab")
     async def switch_tab(self, tab_index: int) -> Dict[str, Any]:
         """
         切换到指定标签页
@@ -680,7 +2042,9 @@ class PlaywrightBrowserManager:
             await self._page.bring_to_front()
             
             # 重新构建元素映射
-            self._element_map = {}
+            self._element_map = ElementMap()
+            
+            self._record_step("switch_tab", tab_index=tab_index)
             
             return {
                 "success": True,
@@ -690,6 +2054,7 @@ class PlaywrightBrowserManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @traced("close_tab")
     async def close_tab(self, tab_index: Optional[int] = None) -> Dict[str, Any]:
         """
         关闭标签页
@@ -722,16 +2087,56 @@ class PlaywrightBrowserManager:
                 else:
                     self._page = await self._context.new_page()
             
-            self._element_map = {}
+            self._element_map = ElementMap()
+            
+            self._record_step("close_tab", tab_index=tab_index)
             
             return {
                 "success": True,
                 "tab_index": tab_index,
-                "message": f"已关闭标签页" + (f" {tab_index}" if tab_index is not None else ""),
+                "message": "已关闭标签页" + (f" {tab_index}" if tab_index is not None else ""),
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @traced("tab_summary")
+    async def tab_summary(
+        self,
+        include_metrics: bool = True,
+        max_tabs: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        cleanup: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        标签页汇总（每个标签页的空闲时长和内存指标），可同时调整自动关闭策略
+        
+        Args:
+            include_metrics: 是否通过 CDP 读取每个标签页的内存指标
+            max_tabs: 新的最大标签页数（可选）
+            idle_timeout: 新的后台标签页空闲超时（秒，0 表示不按空闲时间关闭，可选）
+            cleanup: 是否立即按策略关闭多余和空闲的标签页
+        
+        Returns:
+            标签页列表、策略和最近自动关闭的标签页
+        """
+        try:
+            await self._ensure_page()
+            
+            if max_tabs is not None:
+                self._tabs.max_tabs = self._tab_policy["max_tabs"] = max(int(max_tabs), 2)
+            if idle_timeout is not None:
+                self._tabs.idle_timeout = self._tab_policy["idle_timeout"] = max(float(idle_timeout), 0)
+            
+            closed = await self._tabs.enforce() if cleanup or max_tabs is not None or idle_timeout is not None else []
+            
+            with self._metrics.span("tab_summary.collect", metrics=include_metrics):
+                summary = await self._tabs.summary(include_metrics)
+            
+            return {"success": True, **summary, "closed_now": closed}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    @traced("take_screenshot")
     async def take_screenshot(self, filename: Optional[str] = None) -> Dict[str, Any]:
         """
         截取当前页面截图并保存
@@ -765,6 +2170,95 @@ class PlaywrightBrowserManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    async def start_screencast(
+        self,
+        quality: int = 60,
+        max_width: int = 1280,
+        max_height: int = 720,
+        max_fps: float = 5,
+    ) -> Dict[str, Any]:
+        """
+        在当前标签页开启 CDP 画面流，之后可用 get_screencast_frame 直接读取最新帧
+        
+        Args:
+            quality: JPEG 质量（1-100）
+            max_width: 帧的最大宽度
+            max_height: 帧的最大高度
+            max_fps: 最大帧率
+        
+        Returns:
+            开启结果
+        """
+        try:
+            await self._ensure_page()
+            
+            if self._screencast:
+                await self._screencast.stop()
+            
+            self._screencast = Screencast(quality, max_width, max_height, max_fps)
+            await self._screencast.start(self._page)
+            
+            return {
+                "success": True,
+                **self._screencast.stats(),
+                "message": "已开启画面流",
+            }
+        except Exception as e:
+            self._screencast = None
+            return {"success": False, "error": str(e)}
+    
+    async def stop_screencast(self) -> Dict[str, Any]:
+        """停止画面流并释放最新帧"""
+        if not self._screencast:
+            return {"success": False, "error": "画面流未开启"}
+        
+        await self._screencast.stop()
+        stats = self._screencast.stats()
+        self._screencast = None
+        
+        return {
+            "success": True,
+            "stats": stats,
+            "message": f"已停止画面流（共收到 {stats['frames_received']} 帧）",
+        }
+    
+    @traced("get_screencast_frame")
+    async def get_screencast_frame(self, since: Optional[int] = None, wait: float = 0) -> Dict[str, Any]:
+        """
+        读取画面流的最新帧（不触发截图）
+        
+        Args:
+            since: 只返回序号大于 since 的帧，用于判断画面是否变化（可选）
+            wait: 没有新帧时最多等待的秒数
+        
+        Returns:
+            帧信息（base64 JPEG、序号、尺寸、帧龄），since 之后没有新帧时 changed 为 False
+        """
+        try:
+            await self._ensure_page()
+            
+            if not self._screencast:
+                return {"success": False, "error": "画面流未开启，请先调用 start_screencast"}
+            
+            # 切换了标签页时，画面流跟随到当前标签页
+            if self._screencast.page is not self._page:
+                await self._screencast.start(self._page)
+            
+            frame = await self._screencast.latest(since, min(max(float(wait), 0), 30))
+            if frame is None:
+                return {
+                    "success": True,
+                    "changed": False,
+                    "since": since,
+                    "message": "画面没有变化" if since is not None else "尚未收到画面帧",
+                }
+            
+            self._metrics.increment("screencast_frames_served")
+            return {"success": True, "changed": True, **frame}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    @traced("extract_content")
     async def extract_content(self) -> Dict[str, Any]:
         """
         提取当前页面的文本内容
@@ -775,7 +2269,7 @@ class PlaywrightBrowserManager:
         try:
             await self._ensure_page()
             
-            text = await self._page.evaluate('() => document.body.innerText')
+            text = await self._page_helper(self._page, "innerText")
             
             return {
                 "success": True,
@@ -785,42 +2279,114 @@ class PlaywrightBrowserManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    async def search(self, query: str, engine: str = "google") -> Dict[str, Any]:
+    @traced("search")
+    async def search(
+        self,
+        query: str,
+        engine: str = "google",
+        pages: int = 1,
+        max_results: int = 20,
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
         """
-        使用搜索引擎搜索
+        使用搜索引擎搜索，并从结果页中提取排序后的结果
+        
+        第一页在当前标签页打开，其余页在临时标签页中并行获取。
+        命中缓存时当前标签页同样打开第一页（与未命中时的页面状态一致），
+        但不再获取其余页、不再解析结果。
         
         Args:
             query: 搜索关键词
             engine: 搜索引擎
+            pages: 获取的结果页数（最多 5 页）
+            max_results: 返回的最大结果数
+            use_cache: 是否使用缓存的结果（同一查询在缓存有效期内不再打开结果页）
             
         Returns:
-            搜索结果
+            搜索结果（rank、title、url、snippet）
         """
-        import urllib.parse
-        
-        search_engines = {
-            'duckduckgo': f'https://duckduckgo.com/?q={urllib.parse.quote_plus(query)}',
-            'google': f'https://www.google.com/search?q={urllib.parse.quote_plus(query)}&udm=14',
-            'bing': f'https://www.bing.com/search?q={urllib.parse.quote_plus(query)}',
-        }
-        
-        if engine.lower() not in search_engines:
+        engine = engine.lower()
+        if engine not in SEARCH_ENGINES:
             return {
                 "success": False,
                 "error": f"不支持的搜索引擎: {engine}",
-                "supported_engines": list(search_engines.keys()),
+                "supported_engines": list(SEARCH_ENGINES.keys()),
             }
         
-        url = search_engines[engine.lower()]
+        pages = min(max(int(pages), 1), 5)
+        max_results = max(int(max_results), 1)
+        
+        if use_cache:
+            cached = self._serp_cache.get(engine, query, pages)
+            if cached:
+                self._metrics.increment("serp_cache_hits")
+                result = await self.navigate(cached["url"])
+                if not result.get("success"):
+                    return result
+                return {
+                    **result,
+                    **cached,
+                    "results": cached["results"][:max_results],
+                    "cached": True,
+                    "message": f"已在 {engine} 搜索: {query}（缓存，{cached['cache_age']} 秒前）",
+                }
+        
+        url = search_url(engine, query)
         result = await self.navigate(url)
+        if not result.get("success"):
+            return result
         
-        if result.get("success"):
-            result["query"] = query
-            result["engine"] = engine
-            result["message"] = f"已在 {engine} 搜索: {query}"
+        selectors = SEARCH_ENGINES[engine]["selectors"]
         
-        return result
+        async def fetch_page(page_index: int) -> List[Dict[str, Any]]:
+            page = await self._new_worker_page()
+            try:
+                await page.goto(search_url(engine, query, page_index), wait_until='domcontentloaded', timeout=30000)
+                return await self._page_helper(page, "serp", selectors)
+            except Exception as e:
+                logger.debug(f"获取第 {page_index + 1} 页搜索结果失败: {e}")
+                return []
+            finally:
+                await page.close()
+        
+        try:
+            with self._metrics.span("search.extract", engine=engine, pages=pages):
+                first = await self._page_helper(self._page, "serp", selectors)
+                rest = await asyncio.gather(*(fetch_page(i) for i in range(1, pages)))
+        except Exception as e:
+            return {"success": False, "error": f"提取搜索结果失败: {e}", "url": url}
+        
+        ranked = rank_results([first, *rest], max_results=pages * SEARCH_ENGINES[engine]["page_size"])
+        summary = {
+            "query": query,
+            "engine": engine,
+            "url": url,
+            "pages": pages,
+            "total": len(ranked),
+            "results": ranked,
+        }
+        # 没有结果时（如验证码页面）不缓存
+        if ranked:
+            self._serp_cache.put(engine, query, pages, summary)
+        
+        return {
+            **result,
+            **summary,
+            "results": ranked[:max_results],
+            "cached": False,
+            "message": f"已在 {engine} 搜索: {query}（{len(ranked)} 条结果）",
+        }
+    
+    async def _page_to_markdown(self, page, extract_links: bool = True) -> str:
+        """将指定页面转换为 Markdown 文本"""
+        # 简单的 HTML 到 Markdown 转换
+        content = await self._page_helper(page, "markdown", extract_links)
+        
+        # 清理多余的空行
+        content = re.sub(r'\n{3,}', '\n\n', content)
+        return content.strip()
     
+    @traced("extract_markdown")
     async def extract_markdown(self, extract_links: bool = True) -> Dict[str, Any]:
         """
         提取当前页面内容为 Markdown 格式
@@ -834,83 +2400,7 @@ class PlaywrightBrowserManager:
         try:
             await self._ensure_page()
             
-            # 简单的 HTML 到 Markdown 转换
-            content = await self._page.evaluate('''(extractLinks) => {
-                function htmlToMarkdown(element) {
-                    let result = '';
-                    
-                    for (const node of element.childNodes) {
-                        if (node.nodeType === Node.TEXT_NODE) {
-                            result += node.textContent;
-                        } else if (node.nodeType === Node.ELEMENT_NODE) {
-                            const tag = node.tagName.toLowerCase();
-                            
-                            switch (tag) {
-                                case 'h1':
-                                    result += '\\n# ' + node.innerText + '\\n';
-                                    break;
-                                case 'h2':
-                                    result += '\\n## ' + node.innerText + '\\n';
-                                    break;
-                                case 'h3':
-                                    result += '\\n### ' + node.innerText + '\\n';
-                                    break;
-                                case 'h4':
-                                    result += '\\n#### ' + node.innerText + '\\n';
-                                    break;
-                                case 'p':
-                                    result += '\\n' + htmlToMarkdown(node) + '\\n';
-                                    break;
-                                case 'a':
-                                    if (extractLinks && node.href) {
-                                        result += '[' + node.innerText + '](' + node.href + ')';
-                                    } else {
-                                        result += node.innerText;
-                                    }
-                                    break;
-                                case 'strong':
-                                case 'b':
-                                    result += '**' + node.innerText + '**';
-                                    break;
-                                case 'em':
-                                case 'i':
-                                    result += '*' + node.innerText + '*';
-                                    break;
-                                case 'code':
-                                    result += '`' + node.innerText + '`';
-                                    break;
-                                case 'pre':
-                                    result += '\\n```\\n' + node.innerText + '\\n```\\n';
-                                    break;
-                                case 'ul':
-                                case 'ol':
-                                    result += '\\n' + htmlToMarkdown(node) + '\\n';
-                                    break;
-                                case 'li':
-                                    result += '- ' + htmlToMarkdown(node) + '\\n';
-                                    break;
-                                case 'br':
-                                    result += '\\n';
-                                    break;
-                                case 'script':
-                                case 'style':
-                                case 'noscript':
-                                    break;
-                                default:
-                                    result += htmlToMarkdown(node);
-                            }
-                        }
-                    }
-                    
-                    return result;
-                }
-                
-                return htmlToMarkdown(document.body);
-            }''', extract_links)
-            
-            # 清理多余的空行
-            content = re.sub(r'\n{3,}', '\n\n', content)
-            content = content.strip()
+            content = await self._page_to_markdown(self._page, extract_links)
             
             return {
                 "success": True,
@@ -920,164 +2410,1383 @@ class PlaywrightBrowserManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    async def upload_file(self, index: int, file_path: str) -> Dict[str, Any]:
+    @staticmethod
+    def _parse_markdown_cursor(cursor: Optional[str]) -> Tuple[Optional[str], int, int]:
+        """解析分块游标，格式为 '内容版本:块序号:块内偏移'，空值表示从头开始（不校验版本）"""
+        if cursor is None or str(cursor).strip() == "":
+            return None, 0, 0
+        version, block, offset = str(cursor).strip().split(":")
+        block_index, char_offset = int(block), int(offset)
+        if not version or block_index < 0 or char_offset < 0:
+            raise ValueError(f"无效的游标: {cursor}")
+        return version, block_index, char_offset
+    
+    @traced("extract_markdown_chunk")
+    async def extract_markdown_chunk(
+        self,
+        cursor: Optional[str] = None,
+        chunk_size: int = 5000,
+        extract_links: bool = True,
+    ) -> Dict[str, Any]:
         """
-        上传文件到文件输入框
+        分块提取当前页面内容为 Markdown 格式
+        
+        页面端按文档顺序遍历 DOM 生成 Markdown 块，从游标处开始累积到 chunk_size
+        个字符即停止，页面端和服务端都不会构建整页的 Markdown 字符串。
+        块生成器在页面中保留，DOM 不变时后续分块从上次停下的位置继续，不再从头遍历；
+        已读过的块即丢弃，页面端只保留当前块附近的内容。
+        游标格式为 '内容版本:块序号:块内偏移'。DOM 变化后游标失效，返回 stale=true，
+        需要不带游标重新开始，不会从变化后的内容中跳过或重复读取。
         
         Args:
-            index: 文件输入框元素索引
-            file_path: 要上传的文件路径
-            
+            cursor: 上一次返回的 next_cursor（可选，不指定则从头开始）
+            chunk_size: 每块的最大字符数（500 - 50000）
+            extract_links: 是否保留链接
+        
         Returns:
-            上传结果
+            当前块的 Markdown 内容及下一块的游标
         """
         try:
             await self._ensure_page()
             
-            # 检查文件是否存在
-            if not Path(file_path).exists():
-                return {"success": False, "error": f"文件不存在: {file_path}"}
+            try:
+                version, start_block, start_offset = self._parse_markdown_cursor(cursor)
+            except ValueError:
+                return {"success": False, "error": f"无效的游标: {cursor}"}
             
-            if index not in self._element_map:
-                await self._build_element_map()
-                if index not in self._element_map:
-                    return {"success": False, "error": f"元素索引 {index} 不存在"}
+            chunk_size = min(max(int(chunk_size), 500), 50000)
             
-            element = self._element_map[index]
-            selector = element['selector']
+            chunk = await self._page_helper(self._page, "markdownChunk", {
+                "extractLinks": extract_links,
+                "version": version,
+                "startBlock": start_block,
+                "startOffset": start_offset,
+                "chunkSize": chunk_size,
+            })
+            if chunk.get("stale"):
+                return {
+                    "success": False,
+                    "stale": True,
+                    "cursor": cursor,
+                    "error": "页面内容已变化，游标已失效，请不带游标重新开始分块提取",
+                }
             
-            await self._page.set_input_files(selector, file_path)
+            content = re.sub(r'\n{3,}', '\n\n', chunk["markdown"])
+            next_cursor = f"{chunk['version']}:{chunk['next'][0]}:{chunk['next'][1]}" if chunk.get("next") else None
             
             return {
                 "success": True,
-                "index": index,
-                "file_path": file_path,
-                "message": f"已上传文件: {file_path}",
+                "markdown": content,
+                "length": len(content),
+                "cursor": f"{chunk['version']}:{start_block}:{start_offset}",
+                "next_cursor": next_cursor,
+                "done": next_cursor is None,
+                "chunk_size": chunk_size,
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    async def click_coordinate(self, x: int, y: int) -> Dict[str, Any]:
+    async def _run_page_pool(
+        self,
+        queue: asyncio.Queue,
+        concurrency: int,
+        handle: Callable[[Any, Any], Awaitable[None]],
+        fail: Callable[[Any, str], None],
+    ):
         """
-        点击指定坐标位置
+        用有限大小的后台页面池处理队列中的任务（start_crawl 和 export_pages 共用）
+        
+        每个 worker 打开一个页面，循环从队列取任务交给 handle(page, item)；处理期间可以继续向队列添加任务。
+        handle 抛出的异常通过 fail(item, error) 记为失败，页面崩溃时重新打开。
+        所有 worker 都无法打开页面时，剩余任务全部记为失败，返回时队列一定已清空。
         
         Args:
-            x: X 坐标
-            y: Y 坐标
-            
-        Returns:
-            点击结果
+            queue: 任务队列
+            concurrency: worker 数
+            handle: 处理一个任务
+            fail: 记录失败的任务
         """
+        alive = concurrency
+        
+        def drain(error: str):
+            while not queue.empty():
+                fail(queue.get_nowait(), error)
+                queue.task_done()
+        
+        async def worker():
+            nonlocal alive
+            page = None
+            try:
+                page = await self._new_worker_page()
+                while True:
+                    item = await queue.get()
+                    try:
+                        await handle(page, item)
+                    except Exception as e:
+                        fail(item, str(e))
+                    finally:
+                        queue.task_done()
+                    if page.is_closed():
+                        page = await self._new_worker_page()
+            except Exception as e:
+                logger.debug(f"页面池 worker 退出: {e}")
+                alive -= 1
+                if alive == 0:
+                    drain(f"无法打开页面: {e}")
+            finally:
+                if page is not None and not page.is_closed():
+                    try:
+                        await page.close()
+                    except Exception as e:
+                        logger.debug(f"关闭 worker 页面失败: {e}")
+        
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
         try:
-            await self._ensure_page()
-            
-            await self._page.mouse.click(x, y)
-            
-            return {
-                "success": True,
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    
+    @traced("start_crawl")
+    async def start_crawl(
+        self,
+        urls: List[str],
+        max_concurrency: int = 4,
+        timeout: int = 30,
+        max_depth: int = 0,
+        same_origin: bool = True,
+        max_pages: int = 50,
+        max_chars: int = 3000,
+        extract_links: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        在当前浏览器上下文中并行抓取多个 URL 并提取 Markdown
+        
+        使用有限大小的页面池在当前上下文中打开页面（共享 cookies 和登录状态），
+        每个 URL 单独计时，结果在后台持续产出，通过 next_crawl_batch 分批获取。
+        
+        Args:
+            urls: 起始 URL 列表
+            max_concurrency: 最大并发页面数（1 - 10）
+            timeout: 单个 URL 的超时时间（秒）
+            max_depth: 链接跟随深度，0 表示只抓取给定的 URL
+            same_origin: 跟随链接时是否只抓取与起始 URL 同源的页面
+            max_pages: 最多抓取的页面总数
+            max_chars: 每个页面保留的最大 Markdown 字符数
+            extract_links: 是否在 Markdown 中保留链接
+        
+        Returns:
+            抓取任务信息
+        """
+        import urllib.parse
+        import uuid
+        
+        try:
+            await self._ensure_page()
+            
+            if not urls:
+                return {"success": False, "error": "URL 列表为空"}
+            
+            max_concurrency = min(max(int(max_concurrency), 1), 10)
+            max_pages = max(int(max_pages), 1)
+            origins = {urllib.parse.urlsplit(url)[:2] for url in urls}
+            
+            crawl_id = uuid.uuid4().hex[:8]
+            queue: asyncio.Queue = asyncio.Queue()
+            seen = set()
+            job = {
+                "crawl_id": crawl_id,
+                "results": [],
+                "delivered": 0,
+                "queued": 0,
+                "done": False,
+                "updated": asyncio.Event(),
+                "task": None,
+            }
+            
+            def enqueue(url: str, depth: int):
+                url = urllib.parse.urldefrag(url)[0]
+                if url in seen or job["queued"] >= max_pages:
+                    return
+                if not url.startswith(("http://", "https://")):
+                    return
+                if depth > 0 and same_origin and urllib.parse.urlsplit(url)[:2] not in origins:
+                    return
+                seen.add(url)
+                job["queued"] += 1
+                queue.put_nowait((url, depth))
+            
+            for url in urls:
+                enqueue(url, 0)
+            
+            async def fetch(page, url: str, depth: int) -> Dict[str, Any]:
+                started = asyncio.get_running_loop().time()
+                await page.goto(url, wait_until='domcontentloaded', timeout=timeout * 1000)
+                markdown = await self._page_to_markdown(page, extract_links)
+                result = {
+                    "success": True,
+                    "url": url,
+                    "final_url": page.url,
+                    "title": await page.title(),
+                    "depth": depth,
+                    "markdown": markdown[:max_chars],
+                    "length": len(markdown),
+                    "truncated": len(markdown) > max_chars,
+                }
+                if depth < max_depth:
+                    links = await page.evaluate('() => Array.from(document.links, a => a.href)')
+                    for link in links:
+                        enqueue(link, depth + 1)
+                result["elapsed"] = round(asyncio.get_running_loop().time() - started, 3)
+                return result
+            
+            def add_result(result: Dict[str, Any]):
+                job["results"].append(result)
+                job["updated"].set()
+            
+            async def handle(page, item: Tuple[str, int]):
+                url, depth = item
+                try:
+                    result = await asyncio.wait_for(fetch(page, url, depth), timeout=timeout + 5)
+                except asyncio.TimeoutError:
+                    result = {"success": False, "url": url, "depth": depth, "error": f"超时（{timeout} 秒）"}
+                add_result(result)
+            
+            def fail(item: Tuple[str, int], error: str):
+                url, depth = item
+                add_result({"success": False, "url": url, "depth": depth, "error": error})
+            
+            async def run():
+                try:
+                    await self._run_page_pool(queue, max_concurrency, handle, fail)
+                finally:
+                    job["done"] = True
+                    job["updated"].set()
+            
+            job["task"] = asyncio.create_task(run())
+            self._crawl_jobs[crawl_id] = job
+            
+            return {
+                "success": True,
+                "crawl_id": crawl_id,
+                "queued": job["queued"],
+                "max_concurrency": max_concurrency,
+                "message": f"抓取任务 {crawl_id} 已启动，共 {job['queued']} 个 URL",
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    @traced("next_crawl_batch")
+    async def next_crawl_batch(
+        self,
+        crawl_id: str,
+        batch_size: int = 10,
+        wait_timeout: int = 60,
+        session_lock: Optional[asyncio.Lock] = None,
+    ) -> Dict[str, Any]:
+        """
+        获取抓取任务的下一批结果
+        
+        等待直到积累 batch_size 个新结果、任务结束或超过 wait_timeout 秒。
+        等待不使用当前页面，调用方传入所持有的会话锁时，等待期间释放该锁，
+        同一会话上的其他调用不会被阻塞。
+        
+        Args:
+            crawl_id: 抓取任务 ID
+            batch_size: 本批最多返回的结果数
+            wait_timeout: 最长等待时间（秒）
+            session_lock: 调用方持有的会话锁（可选）
+        
+        Returns:
+            本批结果及任务进度
+        """
+        job = self._crawl_jobs.get(crawl_id)
+        if not job:
+            return {"success": False, "error": f"抓取任务 {crawl_id} 不存在"}
+        
+        batch_size = max(int(batch_size), 1)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(wait_timeout, 0)
+        
+        while not job["done"] and len(job["results"]) - job["delivered"] < batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            job["updated"].clear()
+            released = session_lock is not None and session_lock.locked()
+            if released:
+                session_lock.release()
+            try:
+                await asyncio.wait_for(job["updated"].wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            finally:
+                if released:
+                    await session_lock.acquire()
+        
+        start = job["delivered"]
+        batch = job["results"][start:start + batch_size]
+        job["delivered"] = start + len(batch)
+        finished = job["done"] and job["delivered"] >= len(job["results"])
+        
+        if finished:
+            self._crawl_jobs.pop(crawl_id, None)
+        
+        return {
+            "success": True,
+            "crawl_id": crawl_id,
+            "results": batch,
+            "delivered": job["delivered"],
+            "completed": len(job["results"]),
+            "queued": job["queued"],
+            "done": finished,
+        }
+    
+    @traced("export_pages")
+    async def export_pages(
+        self,
+        urls: List[str],
+        formats: Optional[List[str]] = None,
+        output_dir: Optional[str] = None,
+        max_concurrency: int = 4,
+        timeout: int = 60,
+        extract_links: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        批量将多个 URL 渲染为 PDF 和/或 Markdown 文件
+        
+        使用有限大小的页面池在当前上下文中打开页面（共享 cookies 和登录状态），
+        输出文件写入目标目录，并生成 manifest.json 清单。
+        
+        Args:
+            urls: URL 列表
+            formats: 输出格式，可选 'pdf'、'markdown'，默认只输出 Markdown
+            output_dir: 输出目录（相对于 ~/.browser_use_mcp/exports，不能超出该目录），默认为 export_<时间戳>
+            max_concurrency: 最大并发页面数（1 - 10）
+            timeout: 单个 URL 的超时时间（秒）
+            extract_links: Markdown 中是否保留链接
+        
+        Returns:
+            导出清单
+        """
+        import urllib.parse
+        
+        try:
+            await self._ensure_page()
+            
+            if not urls:
+                return {"success": False, "error": "URL 列表为空"}
+            
+            formats = formats or ["markdown"]
+            unknown = set(formats) - {"pdf", "markdown"}
+            if unknown:
+                return {"success": False, "error": f"不支持的输出格式: {', '.join(sorted(unknown))}"}
+            if "pdf" in formats and not self._headless:
+                return {"success": False, "error": "Chromium 只有无头模式才能生成 PDF，请使用 headless=true 创建会话"}
+            
+            if not output_dir:
+                output_dir = "export_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            try:
+                target_dir = _confined_path(self.session_dir.parent / "exports", output_dir)
+            except ValueError as e:
+                return {"success": False, "error": str(e)}
+            target_dir.mkdir(parents=True, exist_ok=True)
+            
+            max_concurrency = min(max(int(max_concurrency), 1), 10)
+            queue: asyncio.Queue = asyncio.Queue()
+            for i, url in enumerate(urls):
+                queue.put_nowait((i, url))
+            manifest: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+            
+            def base_name(i: int, url: str) -> str:
+                parts = urllib.parse.urlsplit(url)
+                slug = re.sub(r'[^A-Za-z0-9._-]+', '_', f"{parts.netloc}{parts.path}").strip('_')
+                return f"{i + 1:03d}_{slug[:80] or 'page'}"
+            
+            async def render(page, i: int, url: str) -> Dict[str, Any]:
+                started = time.perf_counter()
+                await page.goto(url, wait_until='load', timeout=timeout * 1000)
+                entry = {
+                    "success": True,
+                    "url": url,
+                    "final_url": page.url,
+                    "title": await page.title(),
+                    "files": {},
+                }
+                name = base_name(i, url)
+                if "markdown" in formats:
+                    markdown = await self._page_to_markdown(page, extract_links)
+                    path = target_dir / f"{name}.md"
+                    path.write_text(f"# {entry['title']}\n\n来源: {page.url}\n\n{markdown}\n", encoding='utf-8')
+                    entry["files"]["markdown"] = str(path)
+                if "pdf" in formats:
+                    path = target_dir / f"{name}.pdf"
+                    await page.pdf(path=str(path), format='A4', print_background=True)
+                    entry["files"]["pdf"] = str(path)
+                entry["bytes"] = sum(Path(f).stat().st_size for f in entry["files"].values())
+                entry["elapsed"] = round(time.perf_counter() - started, 3)
+                return entry
+            
+            async def handle(page, item: Tuple[int, str]):
+                i, url = item
+                try:
+                    with self._metrics.span("export_pages.page"):
+                        manifest[i] = await asyncio.wait_for(render(page, i, url), timeout=timeout + 30)
+                except asyncio.TimeoutError:
+                    manifest[i] = {"success": False, "url": url, "error": f"超时（{timeout} 秒）"}
+            
+            def fail(item: Tuple[int, str], error: str):
+                i, url = item
+                manifest[i] = {"success": False, "url": url, "error": error}
+            
+            started = time.perf_counter()
+            await self._run_page_pool(queue, min(max_concurrency, len(urls)), handle, fail)
+            
+            succeeded = sum(1 for entry in manifest if entry["success"])
+            summary = {
+                "output_dir": str(target_dir),
+                "formats": formats,
+                "total": len(urls),
+                "succeeded": succeeded,
+                "failed": len(urls) - succeeded,
+                "elapsed": round(time.perf_counter() - started, 3),
+                "created_at": datetime.datetime.now().isoformat(),
+                "pages": manifest,
+            }
+            manifest_file = target_dir / "manifest.json"
+            with open(manifest_file, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+            
+            return {"success": True, "manifest_file": str(manifest_file), **summary}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def start_network_capture(
+        self,
+        url_pattern: Optional[str] = None,
+        content_types: Optional[List[str]] = None,
+        max_entries: int = 500,
+        max_total_body_mb: int = 20,
+    ) -> Dict[str, Any]:
+        """
+        开始记录当前浏览器上下文的网络响应
+        
+        Args:
+            url_pattern: 只记录匹配该模式的 URL（通配符如 '*/api/*' 或子串，可选）
+            content_types: 保存响应体的内容类型，默认只保存 JSON
+            max_entries: 索引保留的最大响应数
+            max_total_body_mb: 响应体存储的总大小上限（MB）
+        
+        Returns:
+            开启结果
+        """
+        try:
+            await self._ensure_page()
+            
+            if self._network_recorder:
+                self._network_recorder.detach()
+            
+            self._network_recorder = NetworkRecorder(
+                url_pattern=url_pattern,
+                content_types=content_types,
+                max_entries=max_entries,
+                max_total_body_bytes=max_total_body_mb * 1024 * 1024,
+            )
+            self._network_recorder.attach(self._context)
+            
+            return {
+                "success": True,
+                "url_pattern": url_pattern,
+                "content_types": self._network_recorder.content_types,
+                "message": "已开始记录网络响应",
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def stop_network_capture(self) -> Dict[str, Any]:
+        """停止记录网络响应并释放已记录的数据"""
+        if not self._network_recorder:
+            return {"success": False, "error": "网络记录未开启"}
+        
+        stats = self._network_recorder.stats()
+        self._network_recorder.detach()
+        self._network_recorder = None
+        
+        return {
+            "success": True,
+            "stats": stats,
+            "message": f"已停止记录网络响应（共记录 {stats['entries']} 条）",
+        }
+    
+    async def list_network_responses(
+        self,
+        url_pattern: Optional[str] = None,
+        content_type: Optional[str] = None,
+        limit: int = 50,
+    ) -> Dict[str, Any]:
+        """
+        列出已记录的网络响应
+        
+        Args:
+            url_pattern: URL 过滤模式（可选）
+            content_type: 内容类型过滤，如 'json'（可选）
+            limit: 最多返回的条数
+        
+        Returns:
+            响应索引列表（最新的在前）
+        """
+        if not self._network_recorder:
+            return {"success": False, "error": "网络记录未开启，请先调用 start_network_capture"}
+        
+        responses = self._network_recorder.list_entries(url_pattern, content_type, limit)
+        
+        return {
+            "success": True,
+            "responses": responses,
+            "count": len(responses),
+            "stats": self._network_recorder.stats(),
+        }
+    
+    async def get_network_response_body(self, response_id: int, max_chars: int = 20000) -> Dict[str, Any]:
+        """
+        获取已记录响应的响应体
+        
+        Args:
+            response_id: 响应 ID（从 list_network_responses 获取）
+            max_chars: 返回的最大字符数
+        
+        Returns:
+            响应体文本（JSON 响应会被格式化）
+        """
+        if not self._network_recorder:
+            return {"success": False, "error": "网络记录未开启，请先调用 start_network_capture"}
+        
+        entry = self._network_recorder.get_entry(response_id)
+        if not entry:
+            return {"success": False, "error": f"响应 {response_id} 不存在或已被淘汰"}
+        
+        body = self._network_recorder.get_body(response_id)
+        if body is None:
+            return {"success": False, "error": f"响应 {response_id} 的响应体未保存（内容类型不匹配、过大或已被淘汰）"}
+        
+        text = body.decode('utf-8', errors='replace')
+        if 'json' in entry["content_type"].lower():
+            try:
+                text = json.dumps(json.loads(text), ensure_ascii=False, indent=2)
+            except ValueError:
+                pass
+        
+        return {
+            "success": True,
+            "response": entry,
+            "body": text[:max_chars],
+            "length": len(text),
+            "truncated": len(text) > max_chars,
+        }
+    
+    def list_downloads(self, status: Optional[str] = None) -> Dict[str, Any]:
+        """
+        列出本会话的下载
+        
+        Args:
+            status: 按状态筛选：in_progress / completed / duplicate / failed（可选）
+        
+        Returns:
+            下载列表和统计（下载目录、各状态数量、字节数）
+        """
+        if not self._downloads:
+            return {"success": False, "error": "浏览器会话未启动，请先调用 create_session"}
+        
+        downloads = self._downloads.list_entries(status)
+        return {
+            "success": True,
+            "downloads": downloads,
+            "count": len(downloads),
+            "stats": self._downloads.stats(),
+        }
+    
+    @traced("wait_for_downloads")
+    async def wait_for_downloads(self, count: int = 1, timeout: float = 60) -> Dict[str, Any]:
+        """
+        等待 count 个下载结束
+        
+        下载在后台并行进行，可以先连续触发多个下载，再调用本方法一次性等待。
+        每个结束的下载只会被返回一次。
+        
+        Args:
+            count: 需要等待结束的下载数
+            timeout: 超时时间（秒）
+        
+        Returns:
+            本次结束的下载列表（含保存路径、字节数、SHA-256、是否重复）
+        """
+        if not self._downloads:
+            return {"success": False, "error": "浏览器会话未启动，请先调用 create_session"}
+        
+        waited = await self._downloads.wait(max(int(count), 1), timeout)
+        downloads = waited["downloads"]
+        return {
+            "success": not waited["timed_out"],
+            "error": f"等待超时，{timeout} 秒内只有 {len(downloads)}/{count} 个下载结束" if waited["timed_out"] else None,
+            "downloads": downloads,
+            "count": len(downloads),
+            "stats": self._downloads.stats(),
+        }
+    
+    @traced("upload_file")
+    async def upload_file(self, index: int, file_path: str) -> Dict[str, Any]:
+        """
+        上传文件到文件输入框
+        
+        Args:
+            index: 文件输入框元素索引
+            file_path: 要上传的文件路径
+            
+        Returns:
+            上传结果
+        """
+        try:
+            await self._ensure_page()
+            
+            # 检查文件是否存在
+            if not Path(file_path).exists():
+                return {"success": False, "error": f"文件不存在: {file_path}"}
+            
+            if index not in self._element_map:
+                await self._build_element_map()
+                if index not in self._element_map:
+                    return {"success": False, "error": f"元素索引 {index} 不存在"}
+            
+            element = self._element_map[index]
+            selector = element['selector']
+            
+            await self._page.set_input_files(selector, file_path)
+            
+            self._record_step("upload_file", index, file_path=str(Path(file_path).resolve()))
+            
+            return {
+                "success": True,
+                "index": index,
+                "file_path": file_path,
+                "message": f"已上传文件: {file_path}",
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    @traced("click_coordinate")
+    async def click_coordinate(
+        self,
+        x: int,
+        y: int,
+        verify: bool = False,
+        radius: int = 40,
+        settle: float = 0.3,
+        include_clip: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        点击指定坐标位置
+        
+        Args:
+            x: X 坐标
+            y: Y 坐标
+            verify: 是否验证点击效果：点击前后各截取坐标周围的一小块区域进行比较，
+                并报告坐标处的元素（elementFromPoint），不需要再获取完整截图
+            radius: 验证时截取区域的半径（CSS 像素，4 - 100）
+            settle: 点击后等待页面响应的秒数（验证时）
+            include_clip: 验证时是否返回点击后的区域截图（base64 PNG）
+            
+        Returns:
+            点击结果；验证时 verification 包含画面是否变化、变化比例和区域、坐标处的元素、URL 和标签页变化
+        """
+        try:
+            await self._ensure_page()
+            
+            if not verify:
+                await self._page.mouse.click(x, y)
+                self._record_step("click_coordinate", x=x, y=y)
+                return {
+                    "success": True,
+                    "x": x,
+                    "y": y,
+                    "message": f"已点击坐标 ({x}, {y})",
+                }
+            
+            started = time.perf_counter()
+            page = self._page
+            viewport = page.viewport_size or await page.evaluate("() => ({width: window.innerWidth, height: window.innerHeight})")
+            if not (0 <= x < viewport["width"] and 0 <= y < viewport["height"]):
+                return {"success": False, "error": f"坐标 ({x}, {y}) 超出视口 {viewport['width']}x{viewport['height']}"}
+            
+            radius = min(max(int(radius), 4), 100)
+            left, top = max(x - radius, 0), max(y - radius, 0)
+            clip = {
+                "x": left,
+                "y": top,
+                "width": min(x + radius, viewport["width"]) - left,
+                "height": min(y + radius, viewport["height"]) - top,
+            }
+            
+            async def element_at() -> Optional[Dict[str, Any]]:
+                try:
+                    return await self._page_helper(page, "elementAt", {"x": x, "y": y})
+                except Exception as e:
+                    # 点击触发了导航，执行上下文已销毁
+                    logger.debug(f"获取坐标处元素失败: {e}")
+                    return None
+            
+            url_before = page.url
+            tabs_before = len(self._context.pages)
+            before, element = await asyncio.gather(page.screenshot(type="png", clip=clip, scale="css"), element_at())
+            
+            await page.mouse.click(x, y)
+            self._record_step("click_coordinate", x=x, y=y)
+            await asyncio.sleep(max(float(settle), 0))
+            
+            after, element_after = await asyncio.gather(page.screenshot(type="png", clip=clip, scale="css"), element_at())
+            
+            verification: Dict[str, Any] = {"clip": clip, "element": element}
+            try:
+                # 纯 Python 解码较慢，放到线程中执行，不阻塞事件循环
+                diff = await asyncio.to_thread(compare_png, before, after)
+                bbox = diff.pop("bbox")
+                if bbox:
+                    # 截图像素与 CSS 像素不一致时（如缩放），换算回页面 CSS 坐标
+                    scale = clip["width"] / png_size(before)[0]
+                    bbox = {key: round(value * scale) for key, value in bbox.items()}
+                    bbox["x"] += clip["x"]
+                    bbox["y"] += clip["y"]
+                diff["changed_bbox"] = bbox
+            except ValueError as e:
+                logger.debug(f"截图解码失败，按字节比较: {e}")
+                diff = {"changed": before != after, "changed_ratio": None, "changed_bbox": None}
+            verification.update(diff)
+            
+            if element_after and element and element_after.get("selector") != element.get("selector"):
+                verification["element_after"] = element_after
+            verification["url_changed"] = page.url != url_before
+            if verification["url_changed"]:
+                verification["url"] = page.url
+            verification["new_tabs"] = max(len(self._context.pages) - tabs_before, 0)
+            verification["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+            
+            responded = verification["changed"] or verification["url_changed"] or verification["new_tabs"]
+            result = {
+                "success": True,
                 "x": x,
                 "y": y,
-                "message": f"已点击坐标 ({x}, {y})",
+                "verification": verification,
+                "message": f"已点击坐标 ({x}, {y})，" + ("页面有响应" if responded else "点击区域没有变化"),
+            }
+            if include_clip:
+                result["clip_base64"] = base64.b64encode(after).decode("ascii")
+            return result
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def _search_text(
+        self,
+        text: str,
+        mode: str = "exact",
+        limit: int = 20,
+        scroll_to: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """在页面端文本索引中搜索文本，可选滚动到第 scroll_to 个匹配"""
+        if mode not in ("exact", "ignore_case", "fuzzy"):
+            raise ValueError(f"不支持的匹配模式: {mode}")
+        if not text or not text.strip():
+            raise ValueError("查找的文本不能为空")
+        
+        # 匹配结果需要关联元素索引，元素映射为空时先扫描一次
+        if not self._element_map:
+            await self._build_element_map()
+        
+        with self._metrics.span("text_search.query", mode=mode):
+            found = await self._page_helper(self._page, "findText", {
+                "text": text,
+                "mode": mode,
+                "limit": max(int(limit), 1),
+                "scrollTo": scroll_to,
+            })
+        if found["rebuilt"]:
+            self._metrics.increment("text_index_rebuilds")
+        return found
+    
+    @traced("find_text")
+    async def find_text(self, text: str, mode: str = "exact", limit: int = 20) -> Dict[str, Any]:
+        """
+        在页面中查找文本的所有匹配
+        
+        使用页面端文本索引（DOM 变化后才重建），每个匹配包含位置和最近的可交互元素索引，
+        可直接用于 click_element。
+        
+        Args:
+            text: 要查找的文本
+            mode: 匹配模式，'exact'（精确）、'ignore_case'（忽略大小写）或 'fuzzy'（模糊）
+            limit: 最多返回的匹配数
+        
+        Returns:
+            匹配列表
+        """
+        try:
+            await self._ensure_page()
+            
+            found = await self._search_text(text, mode, limit)
+            
+            return {
+                "success": True,
+                "text": text,
+                "mode": mode,
+                "matches": found["matches"],
+                "count": found["total"],
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    @traced("scroll_to_text")
+    async def scroll_to_text(self, text: str, mode: str = "exact", occurrence: int = 0) -> Dict[str, Any]:
+        """
+        滚动到包含指定文本的位置
+        
+        Args:
+            text: 要滚动到的文本
+            mode: 匹配模式，'exact'、'ignore_case' 或 'fuzzy'
+            occurrence: 滚动到第几个匹配（从 0 开始）
+            
+        Returns:
+            滚动结果
+        """
+        try:
+            await self._ensure_page()
+            
+            # 查找包含文本的元素并滚动到视图
+            found = await self._search_text(text, mode, limit=occurrence + 1, scroll_to=occurrence)
+            
+            if found["total"] > occurrence:
+                match = found["matches"][occurrence]
+                self._record_step("scroll_to_text", text=text, mode=mode, occurrence=occurrence)
+                return {
+                    "success": True,
+                    "text": text,
+                    "match": match,
+                    "count": found["total"],
+                    "message": f"已滚动到文本: {text}",
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": f"未找到文本: {text}" if not found["total"] else f"文本 '{text}' 只有 {found['total']} 处匹配",
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    @traced("wait")
+    async def wait(self, seconds: int = 3) -> Dict[str, Any]:
+        """
+        等待指定秒数
+        
+        Args:
+            seconds: 等待秒数（最大 30 秒）
+            
+        Returns:
+            等待结果
+        """
+        actual_seconds = min(max(seconds, 0), 30)
+        await asyncio.sleep(actual_seconds)
+        
+        self._record_step("wait", seconds=actual_seconds)
+        
+        return {
+            "success": True,
+            "seconds": actual_seconds,
+            "message": f"已等待 {actual_seconds} 秒",
+        }
+    
+    async def _wait_for_condition(
+        self,
+        condition: str,
+        value: Optional[str],
+        selector: Optional[str],
+        count: int,
+        timeout: float,
+    ) -> Dict[str, Any]:
+        """等待条件成立，返回 met（是否成立）和 checks（页面端检查次数，仅页面端条件）"""
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+        
+        timeout_ms = timeout * 1000
+        try:
+            if condition in ("visible", "hidden"):
+                await self._page.locator(selector).first.wait_for(state=condition, timeout=timeout_ms)
+            elif condition == "url":
+                # 含通配符时按 glob 匹配，否则按子串匹配
+                pattern = value if any(ch in value for ch in "*?") else (lambda url: value in url)
+                await self._page.wait_for_url(pattern, wait_until="commit", timeout=timeout_ms)
+            elif condition == "network_idle":
+                await self._page.wait_for_load_state("networkidle", timeout=timeout_ms)
+            else:
+                if condition == "text":
+                    predicate, arg = "text", {"text": value}
+                elif condition == "count":
+                    predicate, arg = "count", {"selector": selector, "count": count}
+                else:
+                    predicate, arg = value, None
+                return await self._wait_page_predicate(predicate, arg, timeout)
+        except PlaywrightTimeoutError:
+            return {"met": False}
+        return {"met": True}
+    
+    async def _wait_page_predicate(self, predicate: str, arg: Any, timeout: float) -> Dict[str, Any]:
+        """在页面端等待谓词成立；等待期间发生导航时在新文档中继续等待"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        checks = 0
+        while True:
+            remaining = deadline - loop.time()
+            try:
+                result = await self._page_helper(self._page, "waitFor", {
+                    "predicate": predicate,
+                    "arg": arg,
+                    "timeout": max(remaining, 0) * 1000,
+                })
+            except Exception as e:
+                # 执行上下文随导航销毁，等待新文档加载后重试
+                if remaining <= 0 or "context was destroyed" not in str(e).lower():
+                    raise
+                await self._page.wait_for_load_state("domcontentloaded", timeout=remaining * 1000)
+                continue
+            checks += result["checks"]
+            return {"met": result["met"], "checks": checks}
+    
+    @traced("wait_for")
+    async def wait_for(
+        self,
+        condition: str,
+        value: Optional[str] = None,
+        index: Optional[int] = None,
+        count: int = 1,
+        timeout: float = 10,
+    ) -> Dict[str, Any]:
+        """
+        等待条件成立（条件成立后立即返回，而不是固定等待）
+        
+        Args:
+            condition: 条件类型
+                - visible / hidden: 元素可见 / 隐藏，value 为选择器或用 index 指定元素
+                - text: 页面中出现文本 value
+                - url: URL 匹配 value（含 * 时按通配符，否则按子串）
+                - network_idle: 网络空闲
+                - count: 匹配 CSS 选择器 value 的元素数至少为 count
+                - predicate: 页面端辅助库中的具名谓词 value（ready / not_busy）
+            value: 条件参数
+            index: 元素索引（visible / hidden 时代替选择器）
+            count: count 条件的最少元素数
+            timeout: 超时时间（秒，最大 60 秒）
+        
+        Returns:
+            是否成立及耗时
+        """
+        try:
+            await self._ensure_page()
+            
+            if condition not in WAIT_CONDITIONS:
+                return {"success": False, "error": f"不支持的等待条件: {condition}，可选: {', '.join(WAIT_CONDITIONS)}"}
+            
+            selector = value
+            if condition in ("visible", "hidden") and index is not None:
+                if index not in self._element_map:
+                    return {"success": False, "error": f"元素索引 {index} 不存在"}
+                selector = self._element_map[index]["selector"]
+            if condition in ("visible", "hidden", "text", "url", "count") and not selector:
+                return {"success": False, "error": f"条件 {condition} 需要提供 value" + ("或 index" if condition in ("visible", "hidden") else "")}
+            if condition == "predicate" and value not in WAIT_PREDICATES:
+                return {"success": False, "error": f"不支持的谓词: {value}，可选: {', '.join(WAIT_PREDICATES)}"}
+            
+            timeout = min(max(float(timeout), 0), 60)
+            started = time.perf_counter()
+            waited = await self._wait_for_condition(condition, value, selector, max(int(count), 1), timeout)
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            
+            if not waited["met"]:
+                return {
+                    "success": False,
+                    "timed_out": True,
+                    "condition": condition,
+                    "elapsed_ms": elapsed_ms,
+                    "error": f"等待 {condition} 超时（{timeout} 秒）",
+                }
+            
+            self._record_step(
+                "wait_for", index if index is not None and condition in ("visible", "hidden") else None,
+                condition=condition, value=value, selector=selector if index is None else None,
+                count=count, timeout=timeout,
+            )
+            
+            return {
+                "success": True,
+                "condition": condition,
+                "elapsed_ms": elapsed_ms,
+                "checks": waited.get("checks"),
+                "message": f"条件 {condition} 已满足（耗时 {elapsed_ms} ms）",
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def start_recording(self, name: str) -> Dict[str, Any]:
+        """
+        开始录制操作脚本
+        
+        录制期间每个成功的导航、点击、输入、按键、滚动等操作都会记录为一步。
+        
+        Args:
+            name: 脚本名称
+        
+        Returns:
+            开始结果
+        """
+        if not name:
+            return {"success": False, "error": "脚本名称不能为空"}
+        replaced = self._recorder.name
+        self._recorder.start(name)
+        return {
+            "success": True,
+            "name": name,
+            "message": f"开始录制脚本 '{name}'" + (f"（已丢弃未保存的录制 '{replaced}'）" if replaced else ""),
+        }
+    
+    def stop_recording(self, save: bool = True) -> Dict[str, Any]:
+        """
+        停止录制
+        
+        Args:
+            save: 是否保存脚本
+        
+        Returns:
+            脚本信息（名称、步数、保存路径）
+        """
+        if self._recorder.name is None:
+            return {"success": False, "error": "当前没有进行中的录制"}
+        info = self._recorder.stop(save)
+        return {"success": True, **info}
+    
+    def list_scripts(self) -> Dict[str, Any]:
+        """列出已保存的脚本"""
+        scripts = self._recorder.list_scripts()
+        return {
+            "success": True,
+            "scripts": scripts,
+            "count": len(scripts),
+            "recording": self._recorder.name,
+        }
+    
+    async def _resolve_locator(self, locators: List[str], timeout: float):
+        """
+        等待候选定位器之一匹配到元素（按顺序优先唯一匹配）
+        
+        Returns:
+            (Playwright Locator, 使用的定位器)
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            fallback = None
+            for selector in locators:
+                locator = self._page.locator(selector)
+                count = await locator.count()
+                if count == 1:
+                    return locator, selector
+                if count > 1 and fallback is None:
+                    fallback = (locator.first, selector)
+            if fallback:
+                return fallback
+            if loop.time() >= deadline:
+                raise RuntimeError(f"未找到元素，已尝试定位器: {locators}")
+            await asyncio.sleep(0.1)
+    
+    async def _replay_step(self, step: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """回放一步，返回附加信息"""
+        action = step["action"]
+        timeout_ms = timeout * 1000
+        
+        if action == "navigate":
+            if step.get("new_tab"):
+                self._page = await self._context.new_page()
+            await self._page.goto(step["url"], wait_until='domcontentloaded', timeout=30000)
+            return {}
+        if action == "go_back":
+            await self._page.go_back(wait_until='domcontentloaded')
+            return {}
+        if action == "send_keys":
+            await self._page.keyboard.press(step["keys"])
+            return {}
+        if action == "switch_tab":
+            pages = self._context.pages
+            if step["tab_index"] >= len(pages):
+                raise RuntimeError(f"标签页索引 {step['tab_index']} 不存在")
+            self._page = pages[step["tab_index"]]
+            await self._page.bring_to_front()
+            return {}
+        if action == "close_tab":
+            result = await self.close_tab(step.get("tab_index"))
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+            return {}
+        if action == "click_coordinate":
+            await self._page.mouse.click(step["x"], step["y"])
+            await self._page.wait_for_load_state('domcontentloaded', timeout=timeout_ms)
+            return {}
+        if action == "scroll_to_text":
+            found = await self._search_text(step["text"], step.get("mode", "exact"), limit=step["occurrence"] + 1, scroll_to=step["occurrence"])
+            if found["total"] <= step["occurrence"]:
+                raise RuntimeError(f"未找到文本: {step['text']}")
+            return {}
+        if action == "wait":
+            # 固定等待改为等待网络空闲，最长不超过录制时的秒数
+            try:
+                await self._page.wait_for_load_state('networkidle', timeout=step["seconds"] * 1000)
+            except Exception:
+                pass
+            return {}
+        if action == "wait_for":
+            selector = (step.get("locators") or [step.get("selector")])[0]
+            waited = await self._wait_for_condition(
+                step["condition"], step.get("value"), selector, step.get("count", 1), max(step.get("timeout", 10), timeout),
+            )
+            if not waited["met"]:
+                raise RuntimeError(f"等待条件 {step['condition']} 超时")
+            return {}
+        if action == "scroll" and not step.get("locators"):
+            delta = 500 if step.get("direction") == "down" else -500
+            await self._page.mouse.wheel(0, delta)
+            return {}
+        
+        locator, selector = await self._resolve_locator(step.get("locators") or [], timeout)
+        info = {"locator": selector}
+        
+        if action == "click":
+            await locator.click(timeout=timeout_ms)
+            # 点击可能触发导航，等待新文档可交互
+            await self._page.wait_for_load_state('domcontentloaded', timeout=timeout_ms)
+        elif action in ("input", "input_sensitive"):
+            if action == "input_sensitive":
+                value = self._get_sensitive_data().get(step["credential_key"])
+                if value is None:
+                    raise RuntimeError(f"凭证 '{step['credential_key']}' 未配置")
+            elif step.get("redacted"):
+                raise RuntimeError("录制时在密码框中输入了明文，脚本未保存该值，请改用 input_sensitive 录制")
+            else:
+                value = step["value"]
+            await self._fill_locator(locator, value, step.get("clear_first", True), timeout)
+        elif action == "scroll":
+            delta = 500 if step.get("direction") == "down" else -500
+            await locator.evaluate('(el, delta) => el.scrollBy(0, delta)', delta)
+        elif action == "upload_file":
+            await locator.set_input_files(step["file_path"], timeout=timeout_ms)
+        else:
+            raise RuntimeError(f"不支持的操作: {action}")
+        return info
+    
+    @traced("replay_script")
+    async def replay_script(self, name: str, timeout: float = 10, stop_on_error: bool = True) -> Dict[str, Any]:
+        """
+        回放已保存的脚本
+        
+        每步先等待元素就绪（按顺序尝试候选定位器），再执行操作；
+        录制时的固定等待改为等待网络空闲，不需要 AI 逐步规划。
+        
+        Args:
+            name: 脚本名称
+            timeout: 每步等待元素的超时时间（秒）
+            stop_on_error: 某步失败时是否停止回放
+        
+        Returns:
+            每步的执行结果和总耗时
+        """
+        try:
+            await self._ensure_page()
+            
+            script = self._recorder.load(name)
+            if script is None:
+                return {"success": False, "error": f"脚本 '{name}' 不存在"}
+            
+            steps = script.get("steps", [])
+            results = []
+            started = time.perf_counter()
+            
+            # 回放的操作不进入正在进行的录制
+            self._recorder.paused = True
+            try:
+                for i, step in enumerate(steps):
+                    step_started = time.perf_counter()
+                    result = {"step": i, "action": step["action"], "element": step.get("element")}
+                    try:
+                        with self._metrics.span(f"replay_script.{step['action']}"):
+                            result.update(await self._replay_step(step, timeout))
+                        result["success"] = True
+                    except Exception as e:
+                        result["success"] = False
+                        result["error"] = str(e)
+                    result["elapsed"] = round(time.perf_counter() - step_started, 3)
+                    results.append(result)
+                    if not result["success"] and stop_on_error:
+                        break
+            finally:
+                self._recorder.paused = False
+                # 页面已变化，旧的元素索引不再有效
+                self._element_map = ElementMap()
+            
+            failed = [r for r in results if not r["success"]]
+            return {
+                "success": not failed and len(results) == len(steps),
+                "error": failed[0]["error"] if failed else None,
+                "name": name,
+                "steps_total": len(steps),
+                "steps_run": len(results),
+                "steps_failed": len(failed),
+                "results": results,
+                "elapsed": round(time.perf_counter() - started, 3),
+                "url": self._page.url,
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    async def scroll_to_text(self, text: str) -> Dict[str, Any]:
+    @traced("get_cookies")
+    async def get_cookies(
+        self,
+        domain: Optional[str] = None,
+        name: Optional[str] = None,
+        session: Optional[bool] = None,
+        expires_within: Optional[float] = None,
+        offset: int = 0,
+        limit: int = 50,
+        max_value_length: Optional[int] = None,
+    ) -> Dict[str, Any]:
         """
-        滚动到包含指定文本的位置
+        获取上下文中的 cookies（可筛选、分页）
         
         Args:
-            text: 要滚动到的文本
-            
+            domain: 只返回该域名及其子域名的 cookies
+            name: cookie 名称或通配符模式（如 'session_*'）
+            session: True 只返回会话 cookies，False 只返回持久 cookies
+            expires_within: 只返回在该秒数内过期的持久 cookies
+            offset: 分页起始位置
+            limit: 每页条数（最多 200）
+            max_value_length: 值的最大长度，超出部分截断（None 为不截断）
+        
         Returns:
-            滚动结果
+            当前页的 cookies 和分页信息（total 为符合条件的总数）
         """
         try:
             await self._ensure_page()
             
-            # 查找包含文本的元素并滚动到视图
-            found = await self._page.evaluate(f'''(text) => {{
-                const walker = document.createTreeWalker(
-                    document.body,
-                    NodeFilter.SHOW_TEXT,
-                    null,
-                    false
-                );
-                
-                while (walker.nextNode()) {{
-                    if (walker.currentNode.textContent.includes(text)) {{
-                        walker.currentNode.parentElement.scrollIntoView({{
-                            behavior: 'smooth',
-                            block: 'center'
-                        }});
-                        return true;
-                    }}
-                }}
-                return false;
-            }}''', text)
-            
-            if found:
-                return {
-                    "success": True,
-                    "text": text,
-                    "message": f"已滚动到文本: {text}",
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"未找到文本: {text}",
-                }
+            cookies = await self._context.cookies()
+            matched = filter_cookies(
+                cookies, domain=domain, name=name, session=session, expires_within=expires_within,
+            )
+            page, pagination = paginate(matched, offset, limit)
+            
+            return {
+                "success": True,
+                "cookies": [describe_cookie(cookie, max_value_length) for cookie in page],
+                "count": len(page),
+                "jar_size": len(cookies),
+                **pagination,
+            }
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    async def wait(self, seconds: int = 3) -> Dict[str, Any]:
+    @traced("set_cookies")
+    async def set_cookies(self, cookies: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        等待指定秒数
+        批量设置 cookies
         
         Args:
-            seconds: 等待秒数（最大 30 秒）
-            
+            cookies: cookie 列表，每项包含 name、value，以及 url 或 domain（都未指定时使用当前页面 URL），
+                可选 path、expires（Unix 时间戳）或 expires_in（秒）、http_only、secure、same_site
+        
         Returns:
-            等待结果
+            设置结果
         """
-        actual_seconds = min(max(seconds, 0), 30)
-        await asyncio.sleep(actual_seconds)
-        
-        return {
-            "success": True,
-            "seconds": actual_seconds,
-            "message": f"已等待 {actual_seconds} 秒",
-        }
+        try:
+            await self._ensure_page()
+            
+            if not cookies:
+                return {"success": False, "error": "cookies 不能为空"}
+            try:
+                normalized = [normalize_cookie(cookie, self._page.url) for cookie in cookies]
+            except (ValueError, TypeError, AttributeError) as e:
+                return {"success": False, "error": f"cookie 格式错误: {e}"}
+            
+            await self._context.add_cookies(normalized)
+            
+            return {
+                "success": True,
+                "set": [cookie["name"] for cookie in normalized],
+                "count": len(normalized),
+                "message": f"已设置 {len(normalized)} 个 cookies",
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
     
-    async def get_cookies(self) -> Dict[str, Any]:
+    @traced("delete_cookies")
+    async def delete_cookies(
+        self,
+        domain: Optional[str] = None,
+        name: Optional[str] = None,
+        path: Optional[str] = None,
+        session: Optional[bool] = None,
+        expires_within: Optional[float] = None,
+    ) -> Dict[str, Any]:
         """
-        获取当前页面的 cookies
+        按条件批量删除 cookies（至少指定一个条件，清除全部请使用 clear_cookies）
+        
+        Args:
+            domain: 该域名及其子域名的 cookies
+            name: cookie 名称或通配符模式
+            path: cookie 路径
+            session: True 只删除会话 cookies，False 只删除持久 cookies
+            expires_within: 只删除在该秒数内过期的持久 cookies
         
         Returns:
-            cookies 列表
+            删除的 cookies（名称、域名、路径）
         """
         try:
             await self._ensure_page()
             
+            if not any(value is not None for value in (domain, name, path, session, expires_within)):
+                return {"success": False, "error": "请至少指定一个筛选条件，清除全部 cookies 请使用 clear_cookies"}
+            
             cookies = await self._context.cookies()
+            matched = filter_cookies(
+                cookies, domain=domain, name=name, path=path, session=session, expires_within=expires_within,
+            )
+            deleted = [
+                {"name": cookie["name"], "domain": cookie["domain"], "path": cookie["path"]}
+                for cookie in matched
+            ]
             
-            cookies_list = []
-            for cookie in cookies:
-                cookies_list.append({
-                    "name": cookie.get("name"),
-                    "value": cookie.get("value"),
-                    "domain": cookie.get("domain"),
-                    "path": cookie.get("path"),
-                })
+            if matched:
+                try:
+                    # Playwright 1.43+ 支持按名称、域名和路径精确清除
+                    for cookie in deleted:
+                        await self._context.clear_cookies(**cookie)
+                except TypeError:
+                    # 旧版本只能清除全部，再写回未删除的 cookies
+                    kept = [cookie for cookie in cookies if all(cookie is not m for m in matched)]
+                    await self._context.clear_cookies()
+                    if kept:
+                        await self._context.add_cookies(kept)
             
             return {
                 "success": True,
-                "cookies": cookies_list,
-                "count": len(cookies_list),
+                "deleted": deleted,
+                "count": len(deleted),
+                "remaining": len(cookies) - len(deleted),
+                "message": f"已删除 {len(deleted)} 个 cookies",
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @traced("clear_cookies")
     async def clear_cookies(self) -> Dict[str, Any]:
         """
         清除所有 cookies
@@ -1097,6 +3806,74 @@ class PlaywrightBrowserManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @traced("web_storage")
+    async def web_storage(
+        self,
+        action: str = "get",
+        area: str = "local",
+        key: Optional[str] = None,
+        items: Optional[Dict[str, Any]] = None,
+        keys: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: int = 50,
+        max_value_length: int = 500,
+    ) -> Dict[str, Any]:
+        """
+        查看或修改当前页面源的 localStorage / sessionStorage
+        
+        Args:
+            action: get 查看，set 批量设置，delete 按键名删除，clear 清空
+            area: local（localStorage）或 session（sessionStorage）
+            key: 键名或通配符模式（* 和 ?），用于 get 和 delete
+            items: set 时要写入的键值（非字符串的值按 JSON 序列化）
+            keys: delete 时要删除的键名列表（指定时忽略 key）
+            offset: get 的分页起始位置
+            limit: get 的每页条数（最多 200）
+            max_value_length: get 时值的最大长度，超出部分截断
+        
+        Returns:
+            操作结果（origin 为存储所属的源，size 为操作前的条目数）
+        """
+        try:
+            await self._ensure_page()
+            
+            if action not in ("get", "set", "delete", "clear"):
+                return {"success": False, "error": f"不支持的操作: {action}，可选 get / set / delete / clear"}
+            if area not in ("local", "session"):
+                return {"success": False, "error": f"不支持的存储: {area}，可选 local / session"}
+            if action == "set" and not items:
+                return {"success": False, "error": "set 操作需要 items"}
+            if action == "delete" and not key and not keys:
+                return {"success": False, "error": "delete 操作需要 key 或 keys，清空请使用 clear"}
+            
+            _, pagination = paginate([], offset, limit)
+            result = await self._page.evaluate(_WEB_STORAGE_JS, {
+                "op": action,
+                "area": area,
+                "pattern": key,
+                "items": items,
+                "keys": keys,
+                "offset": pagination["offset"],
+                "limit": pagination["limit"],
+                "maxValueLength": max(int(max_value_length), 0),
+            })
+            
+            if action == "get":
+                end = pagination["offset"] + len(result["entries"])
+                result.update(
+                    offset=pagination["offset"],
+                    limit=pagination["limit"],
+                    next_offset=end if end < result["total"] else None,
+                )
+            if result.get("error"):
+                # 写入部分条目后超出配额
+                return {"success": False, **result}
+            return {"success": True, **result}
+        except Exception as e:
+            # about:blank 等不透明源无法访问存储（SecurityError）
+            return {"success": False, "error": str(e)}
+    
+    @traced("get_dropdown_options")
     async def get_dropdown_options(self, index: int) -> Dict[str, Any]:
         """
         获取下拉框的选项列表
@@ -1118,16 +3895,7 @@ class PlaywrightBrowserManager:
             element = self._element_map[index]
             selector = element['selector']
             
-            options = await self._page.evaluate(f'''() => {{
-                const select = document.querySelector("{selector}");
-                if (!select || select.tagName !== 'SELECT') return [];
-                
-                return Array.from(select.options).map(opt => ({{
-                    value: opt.value,
-                    text: opt.text,
-                    selected: opt.selected,
-                }}));
-            }}''')
+            options = await self._page.locator(selector).first.evaluate(_SELECT_OPTIONS_JS)
             
             return {
                 "success": True,
@@ -1138,19 +3906,8 @@ class PlaywrightBrowserManager:
             return {"success": False, "error": str(e)}
     
     async def list_sessions(self) -> Dict[str, Any]:
-        """列出所有保存的会话"""
-        sessions = []
-        
-        for state_file in self.session_dir.glob("*_storage_state.json"):
-            session_id = state_file.stem.replace("_storage_state", "")
-            stat = state_file.stat()
-            
-            sessions.append({
-                "session_id": session_id,
-                "storage_state_file": str(state_file),
-                "size_bytes": stat.st_size,
-                "modified_at": stat.st_mtime,
-            })
+        """列出所有保存的会话（读取会话索引，不逐个读取会话文件）"""
+        sessions = self._session_store.list()
         
         return {
             "success": True,
@@ -1161,13 +3918,7 @@ class PlaywrightBrowserManager:
     
     async def delete_session(self, session_id: str) -> Dict[str, Any]:
         """删除保存的会话"""
-        storage_state_file = self._get_storage_state_file(session_id)
-        
-        deleted_items = []
-        
-        if storage_state_file.exists():
-            storage_state_file.unlink()
-            deleted_items.append(str(storage_state_file))
+        deleted_items = self._session_store.delete(session_id)
         
         if deleted_items:
             return {
@@ -1182,6 +3933,113 @@ class PlaywrightBrowserManager:
                 "error": f"会话 '{session_id}' 不存在",
             }
     
+    def get_metrics(self, action: Optional[str] = None, reset: bool = False) -> Dict[str, Any]:
+        """
+        获取操作耗时指标
+        
+        Args:
+            action: 只返回指定操作及其子步骤的指标（可选）
+            reset: 返回后是否清空统计
+        
+        Returns:
+            每种操作的调用次数、p50/p95 耗时、返回字符数以及计数器
+        """
+        summary = self._metrics.summary(action)
+        if reset:
+            self._metrics.reset()
+        
+        return {
+            "success": True,
+            **summary,
+            "tracing_active": self._tracing_active,
+        }
+    
+    def export_metrics_trace(self, filename: Optional[str] = None) -> Dict[str, Any]:
+        """
+        导出 span 记录为 Chrome Trace Event 格式（chrome://tracing 或 Perfetto 可打开）
+        
+        Args:
+            filename: 文件名（可选，默认自动生成；相对于 ~/.browser_use_mcp/traces，不能超出该目录）
+        
+        Returns:
+            导出结果
+        """
+        try:
+            if not filename:
+                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"browser_spans_{timestamp}.json"
+            
+            filepath = _confined_path(self.session_dir.parent / "traces", filename)
+            count = self._metrics.export_trace(filepath)
+            
+            return {
+                "success": True,
+                "filepath": str(filepath),
+                "events": count,
+                "message": f"已导出 {count} 个 span",
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def start_tracing(self, screenshots: bool = True, snapshots: bool = True) -> Dict[str, Any]:
+        """
+        开启 Playwright tracing（用于离线分析，会带来额外开销）
+        
+        Args:
+            screenshots: 是否记录截图
+            snapshots: 是否记录 DOM 快照
+        
+        Returns:
+            开启结果
+        """
+        try:
+            await self._ensure_page()
+            
+            if self._tracing_active:
+                return {"success": False, "error": "Playwright tracing 已在运行"}
+            
+            await self._context.tracing.start(screenshots=screenshots, snapshots=snapshots, sources=False)
+            self._tracing_active = True
+            
+            return {
+                "success": True,
+                "message": "已开启 Playwright tracing",
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def stop_tracing(self, filename: Optional[str] = None) -> Dict[str, Any]:
+        """
+        停止 Playwright tracing 并保存为 zip（可用 `playwright show-trace` 查看）
+        
+        Args:
+            filename: 文件名（可选，默认自动生成；相对于 ~/.browser_use_mcp/traces，不能超出该目录）
+        
+        Returns:
+            保存结果
+        """
+        try:
+            if not self._tracing_active or not self._context:
+                return {"success": False, "error": "Playwright tracing 未开启"}
+            
+            if not filename:
+                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"playwright_trace_{timestamp}.zip"
+            
+            filepath = _confined_path(self.session_dir.parent / "traces", filename)
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            
+            await self._context.tracing.stop(path=str(filepath))
+            self._tracing_active = False
+            
+            return {
+                "success": True,
+                "filepath": str(filepath),
+                "message": f"Playwright trace 已保存: {filepath}",
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
     def get_status(self) -> Dict[str, Any]:
         """获取当前状态"""
         return {
@@ -1201,9 +4059,185 @@ class PlaywrightBrowserManager:
 BrowserUseManager = PlaywrightBrowserManager
 
 
+class BrowserSessionRegistry:
+    """多会话注册表
+    
+    每个会话 ID 对应一个独立的 PlaywrightBrowserManager（独立的上下文、页面和元素映射），
+    所有会话共享同一个 Playwright 进程和浏览器（有头/无头各一个）。
+    - 每个会话一把锁，同一会话上的调用按顺序执行，不同会话可以并行
+    - 活动会话数（即浏览器上下文数）不超过 max_sessions
+    """
+    
+    def __init__(self, session_dir: Optional[str] = None, max_sessions: Optional[int] = None):
+        """
+        初始化会话注册表
+        
+        Args:
+            session_dir: 会话数据存储目录，默认为 ~/.browser_use_mcp/sessions
+            max_sessions: 最大并发会话数，默认读取环境变量 BROWSER_USE_MCP_MAX_SESSIONS（默认 4）
+        """
+        self.session_dir = session_dir
+        self.max_sessions = max_sessions or max_sessions_from_env()
+        
+        self._managers: Dict[str, PlaywrightBrowserManager] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._default_session_id: Optional[str] = None
+        
+        # 未指定会话且没有活动会话时使用的管理器（列出会话、删除会话等不需要浏览器的操作）
+        self._idle_manager = PlaywrightBrowserManager(session_dir)
+        
+        self._playwright = None
+        self._browsers: Dict[bool, Any] = {}
+        self._browser_lock = asyncio.Lock()
+        
+        # 预热后尚未被会话使用的浏览器（有头/无头），以及预热耗时
+        self._prewarmed: Dict[bool, bool] = {}
+        self._prewarm_seconds: Dict[bool, float] = {}
+    
+    async def _launch_browser(self, headless: bool):
+        """启动浏览器（调用方需持有 _browser_lock）"""
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+        
+        browser = await self._playwright.chromium.launch(headless=headless, args=_CHROMIUM_ARGS)
+        self._browsers[headless] = browser
+        return browser
+    
+    async def _get_browser(self, headless: bool) -> Tuple[Any, str]:
+        """
+        获取共享的浏览器（按需启动，断开后自动重新启动）
+        
+        Returns:
+            (浏览器, 来源)，来源为 cold（本次启动）、prewarmed（预热后首次使用）或 pooled（复用）
+        """
+        async with self._browser_lock:
+            browser = self._browsers.get(headless)
+            if browser and browser.is_connected():
+                startup = "prewarmed" if self._prewarmed.pop(headless, False) else "pooled"
+                return browser, startup
+            
+            self._prewarmed.pop(headless, None)
+            return await self._launch_browser(headless), "cold"
+    
+    async def prewarm(self, headless: bool = False) -> Dict[str, Any]:
+        """
+        预热：提前导入 Playwright 并启动共享浏览器，首个会话只需创建上下文
+        
+        Args:
+            headless: 预热无头还是有头浏览器（应与创建会话时的 headless 一致）
+            
+        Returns:
+            预热结果
+        """
+        started = time.perf_counter()
+        try:
+            async with self._browser_lock:
+                browser = self._browsers.get(headless)
+                if browser and browser.is_connected():
+                    return {"success": True, "headless": headless, "already_running": True}
+                await self._launch_browser(headless)
+                self._prewarmed[headless] = True
+            
+            elapsed = time.perf_counter() - started
+            self._prewarm_seconds[headless] = elapsed
+            logger.info(f"浏览器预热完成（{'无头' if headless else '有头'}），耗时 {elapsed:.2f}s")
+            return {"success": True, "headless": headless, "elapsed_ms": round(elapsed * 1000, 1)}
+        except Exception as e:
+            logger.error(f"浏览器预热失败: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def resolve(self, session_id: Optional[str] = None) -> Tuple[Optional[str], PlaywrightBrowserManager]:
+        """
+        解析调用所属的会话
+        
+        未指定 session_id 时使用最近创建的会话（兼容单会话用法）。
+        
+        Returns:
+            (会话 ID, 管理器)，会话不存在时返回 (session_id, 空闲管理器)
+        """
+        session_id = session_id or self._default_session_id
+        if session_id and session_id in self._managers:
+            return session_id, self._managers[session_id]
+        return session_id, self._idle_manager
+    
+    def lock(self, session_id: Optional[str]) -> asyncio.Lock:
+        """获取会话锁"""
+        key = session_id or ""
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        return self._locks[key]
+    
+    def acquire(self, session_id: str) -> Optional[PlaywrightBrowserManager]:
+        """
+        为创建会话分配管理器
+        
+        Returns:
+            管理器；活动会话数已达上限时返回 None
+        """
+        if session_id not in self._managers:
+            if len(self._managers) >= self.max_sessions:
+                return None
+            self._managers[session_id] = PlaywrightBrowserManager(
+                self.session_dir,
+                browser_provider=self._get_browser,
+            )
+        self._default_session_id = session_id
+        return self._managers[session_id]
+    
+    def release(self, session_id: Optional[str]):
+        """会话关闭后释放其占用的名额"""
+        if not session_id:
+            return
+        manager = self._managers.get(session_id)
+        if manager and not manager.is_active:
+            del self._managers[session_id]
+            self._locks.pop(session_id, None)
+            if self._default_session_id == session_id:
+                self._default_session_id = next(reversed(self._managers), None)
+    
+    def status(self) -> Dict[str, Any]:
+        """注册表状态"""
+        return {
+            "active_sessions": list(self._managers.keys()),
+            "default_session": self._default_session_id,
+            "max_sessions": self.max_sessions,
+            "shared_browsers": [("无头" if headless else "有头") for headless, browser in self._browsers.items() if browser.is_connected()],
+            "prewarmed": {
+                ("无头" if headless else "有头"): {
+                    "elapsed_ms": round(seconds * 1000, 1),
+                    "unused": self._prewarmed.get(headless, False),
+                }
+                for headless, seconds in self._prewarm_seconds.items()
+            },
+        }
+    
+    async def cleanup(self):
+        """关闭所有会话和共享的浏览器"""
+        for session_id, manager in list(self._managers.items()):
+            async with self.lock(session_id):
+                await manager.cleanup()
+        self._managers = {}
+        self._default_session_id = None
+        
+        for browser in self._browsers.values():
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.error(f"关闭浏览器时出错: {e}")
+        self._browsers = {}
+        
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+
 # 全局浏览器管理器实例
 _browser_manager: Optional[PlaywrightBrowserManager] = None
 
+# 全局会话注册表实例
+_session_registry: Optional[BrowserSessionRegistry] = None
+
 
 def get_browser_manager() -> PlaywrightBrowserManager:
     """获取全局浏览器管理器实例"""
@@ -1219,3 +4253,19 @@ async def cleanup_browser_manager():
     if _browser_manager:
         await _browser_manager.cleanup()
         _browser_manager = None
+
+
+def get_session_registry() -> BrowserSessionRegistry:
+    """获取全局会话注册表实例"""
+    global _session_registry
+    if _session_registry is None:
+        _session_registry = BrowserSessionRegistry()
+    return _session_registry
+
+
+async def cleanup_session_registry():
+    """清理全局会话注册表"""
+    global _session_registry
+    if _session_registry:
+        await _session_registry.cleanup()
+        _session_registry = None
@@ -13,7 +13,9 @@
 6. WSL 兼容 - 完全在 WSL 中运行
 """
 
+import argparse
 import asyncio
+import datetime
 import json
 import sys
 import signal
@@ -34,28 +36,81 @@ from mcp.types import (
     EmbeddedResource,
 )
 
-from browser_use_mcp.browser_tools import get_browser_manager, cleanup_browser_manager, BrowserUseManager, list_credential_keys
+from browser_use_mcp.browser_tools import (
+    BrowserSessionRegistry,
+    BrowserUseManager,
+    get_session_registry,
+    list_credential_keys,
+    max_sessions_from_env,
+)
 
 
 # 创建 MCP 服务器实例
 app = Server("browser-use-mcp-server")
 
-# 全局浏览器管理器
-browser_manager: Optional[BrowserUseManager] = None
+# 全局会话注册表（每个会话独立的上下文、页面和元素映射）
+session_registry: Optional[BrowserSessionRegistry] = None
+
+# 不绑定浏览器会话的工具（不注入 session_id 参数）
+SESSIONLESS_TOOLS = {
+    "browser_create_session",
+    "browser_list_sessions",
+    "browser_delete_session",
+    "browser_list_credentials",
+    "browser_list_scripts",
+}
+
+
+# 创建会话时浏览器来源的显示名称
+STARTUP_LABELS = {
+    "cold": "冷启动",
+    "prewarmed": "预热",
+    "pooled": "复用共享浏览器",
+}
+
+
+def get_registry() -> BrowserSessionRegistry:
+    """获取会话注册表实例"""
+    global session_registry
+    if session_registry is None:
+        session_registry = get_session_registry()
+    return session_registry
 
 
-def get_manager() -> BrowserUseManager:
-    """获取浏览器管理器实例"""
-    global browser_manager
-    if browser_manager is None:
-        browser_manager = get_browser_manager()
-    return browser_manager
+def get_manager(session_id: Optional[str] = None) -> BrowserUseManager:
+    """获取会话对应的浏览器管理器实例"""
+    return get_registry().resolve(session_id)[1]
+
+
+def _add_session_argument(tools: list[Tool]) -> list[Tool]:
+    """为绑定会话的工具添加可选的 session_id 参数"""
+    for tool in tools:
+        if tool.name in SESSIONLESS_TOOLS:
+            continue
+        tool.inputSchema.setdefault("properties", {})["session_id"] = {
+            "type": "string",
+            "description": "目标会话 ID（可选）。多个 AI 共用服务器时必须指定；不指定则使用最近创建的会话",
+        }
+    return tools
+
+
+def _format_download(download: dict) -> str:
+    """格式化一条下载记录"""
+    status_icons = {"in_progress": "⏳", "completed": "✅", "duplicate": "♻️", "failed": "❌"}
+    text = f"  {status_icons.get(download['status'], '•')} [{download['id']}] {download['suggested_filename']}"
+    if download["status"] == "completed":
+        text += f" ({download['bytes']} 字节, {download['elapsed_ms']}ms) -> {download['path']}"
+    elif download["status"] == "duplicate":
+        text += f" 与已有文件相同: {download['duplicate_of']}"
+    elif download["status"] == "failed":
+        text += f" 失败: {download['error']}"
+    return text
 
 
 @app.list_tools()
 async def handle_list_tools() -> list[Tool]:
     """列出所有可用的工具"""
-    return [
+    return _add_session_argument([
         # ===== 会话管理工具 =====
         Tool(
             name="browser_create_session",
@@ -64,7 +119,10 @@ async def handle_list_tools() -> list[Tool]:
 如果指定的 session_id 已存在保存的状态，将自动恢复该会话（包括 cookies、localStorage 等）。
 这使得登录状态可以在多次对话间保持。
 
-⚠️ 每次新对话开始时，需要先调用此工具来创建/恢复会话。""",
+⚠️ 每次新对话开始时，需要先调用此工具来创建/恢复会话。
+
+多个 AI 可以同时使用不同的 session_id，每个会话拥有独立的上下文、页面和元素索引，
+之后的工具调用通过 session_id 参数指定目标会话。""",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -83,10 +141,15 @@ async def handle_list_tools() -> list[Tool]:
         ),
         Tool(
             name="browser_save_session",
-            description="保存当前浏览器会话状态（cookies、localStorage 等）",
+            description="保存当前浏览器会话状态（cookies、localStorage 等），状态无变化时跳过写入",
             inputSchema={
                 "type": "object",
-                "properties": {},
+                "properties": {
+                    "compress": {
+                        "type": "boolean",
+                        "description": "是否使用 gzip 压缩保存（可选，默认使用服务器设置）",
+                    },
+                },
                 "required": [],
             },
         ),
@@ -128,6 +191,30 @@ async def handle_list_tools() -> list[Tool]:
                 "required": ["session_id"],
             },
         ),
+        Tool(
+            name="browser_checkpoint",
+            description="""保存或恢复内存中的上下文检查点（cookies、localStorage 和所有标签页的 URL）
+
+适合反复回到已知状态（如已登录的起始页面）：save 保存当前状态，restore 在运行中的浏览器里
+新建上下文并重新打开当时的标签页，不需要关闭会话和重启浏览器，通常不到一秒。
+检查点只保存在内存中，服务器重启后失效。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "action": {
+                        "type": "string",
+                        "description": "save 保存，restore 恢复，list 列出，delete 删除",
+                        "enum": ["save", "restore", "list", "delete"],
+                        "default": "save",
+                    },
+                    "name": {
+                        "type": "string",
+                        "description": "检查点名称（list 时不需要）",
+                    },
+                },
+                "required": [],
+            },
+        ),
         Tool(
             name="browser_get_status",
             description="获取浏览器当前状态信息",
@@ -152,7 +239,14 @@ async def handle_list_tools() -> list[Tool]:
 - tabs: 标签页列表
 - elements: 可交互元素列表（带索引、标签、文本、属性等）
 - dom_text: DOM 的文本表示（用于理解页面结构）
-- screenshot_base64: 页面截图（可选）
+- screenshot_base64: 页面截图（可选；页面自上次截图后未变化时只返回 screenshot_unchanged，沿用上一次的截图）
+
+mode="accessibility" 时改为返回基于无障碍树的紧凑大纲（角色、名称、状态），
+去掉无语义的包装节点并合并重复节点，体积远小于 DOM 元素列表；
+大纲中 [n] 标注的元素索引同样可用于 browser_click / browser_input。
+
+dom 模式会扫描 iframe 和开放的 shadow root 中的元素（受 max_elements / max_frames 预算限制），
+这些元素同样可以直接通过索引操作，无需坐标点击。
 
 使用流程：
 1. 调用 browser_get_state 获取页面状态
@@ -166,6 +260,34 @@ async def handle_list_tools() -> list[Tool]:
                         "description": "是否包含页面截图，默认为 true",
                         "default": True,
                     },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["dom", "accessibility"],
+                        "description": "快照模式：dom（DOM 元素列表，默认）或 accessibility（无障碍树紧凑大纲）",
+                        "default": "dom",
+                    },
+                    "max_chars": {
+                        "type": "integer",
+                        "description": "accessibility 模式下大纲的最大字符数，默认 8000",
+                        "default": 8000,
+                    },
+                    "max_elements": {
+                        "type": "integer",
+                        "description": "dom 模式下扫描的元素总数上限，默认 2000（设置后对后续扫描生效）",
+                    },
+                    "max_frames": {
+                        "type": "integer",
+                        "description": "dom 模式下扫描的框架数上限（含主框架），默认 10",
+                    },
+                    "shadow_dom": {
+                        "type": "boolean",
+                        "description": "dom 模式下是否扫描开放的 shadow root，默认 true",
+                    },
+                    "force_screenshot": {
+                        "type": "boolean",
+                        "description": "强制重新截图。默认页面未变化（DOM、滚动位置、视口均相同）时复用上次的截图",
+                        "default": False,
+                    },
                 },
                 "required": [],
             },
@@ -202,7 +324,10 @@ async def handle_list_tools() -> list[Tool]:
         ),
         Tool(
             name="browser_search",
-            description="使用搜索引擎搜索",
+            description="""使用搜索引擎搜索，直接返回排序后的结果（标题、URL、摘要）
+
+第一页在当前标签页打开，pages > 1 时其余页在临时标签页中并行获取。
+同一查询的结果会缓存 10 分钟，重复搜索直接返回缓存的结果（当前标签页仍会打开第一页），无需再获取页面状态解析结果页。""",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -216,6 +341,21 @@ async def handle_list_tools() -> list[Tool]:
                         "enum": ["google", "bing", "duckduckgo"],
                         "default": "google",
                     },
+                    "pages": {
+                        "type": "integer",
+                        "description": "获取的结果页数（最多 5 页），默认 1",
+                        "default": 1,
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": "返回的最大结果数，默认 20",
+                        "default": 20,
+                    },
+                    "use_cache": {
+                        "type": "boolean",
+                        "description": "是否使用缓存的结果，默认 true",
+                        "default": True,
+                    },
                 },
                 "required": ["query"],
             },
@@ -300,6 +440,39 @@ GITHUB_PASSWORD=your_password
                 "required": ["index", "credential_key"],
             },
         ),
+        Tool(
+            name="browser_fill_form",
+            description="""一次填写多个表单字段
+
+每个字段用 index（元素索引）或 selector（选择器）定位，填入 value 或 credential_key 对应的凭证（凭证值不会暴露给 AI）。
+普通 CSS 选择器定位的字段在一次页面调用中全部填写，其余字段逐个填写；返回每个字段的结果。
+复选框/单选框的 value 表示是否选中，下拉框的 value 为选项值或选项文本。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "fields": {
+                        "type": "array",
+                        "description": "字段列表",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "index": {"type": "integer", "description": "元素索引"},
+                                "selector": {"type": "string", "description": "选择器（代替 index）"},
+                                "value": {"type": "string", "description": "要填入的值"},
+                                "credential_key": {"type": "string", "description": "凭证键名（代替 value）"},
+                                "clear_first": {"type": "boolean", "description": "覆盖全局 clear_first"},
+                            },
+                        },
+                    },
+                    "clear_first": {
+                        "type": "boolean",
+                        "description": "填写前是否先清空输入框，默认为 true（false 时追加到现有内容之后）",
+                        "default": True,
+                    },
+                },
+                "required": ["fields"],
+            },
+        ),
         Tool(
             name="browser_list_credentials",
             description="""列出所有可用的凭证键名（不显示值）
@@ -347,7 +520,7 @@ GITHUB_PASSWORD=your_password
         ),
         Tool(
             name="browser_scroll_to_text",
-            description="滚动到包含指定文本的位置",
+            description="滚动到包含指定文本的位置，并返回该处最近的可交互元素索引",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -355,13 +528,57 @@ GITHUB_PASSWORD=your_password
                         "type": "string",
                         "description": "要滚动到的文本",
                     },
+                    "mode": {
+                        "type": "string",
+                        "description": "匹配模式：exact 精确，ignore_case 忽略大小写，fuzzy 模糊（容忍少量错字）",
+                        "enum": ["exact", "ignore_case", "fuzzy"],
+                        "default": "exact",
+                    },
+                    "occurrence": {
+                        "type": "integer",
+                        "description": "滚动到第几个匹配（从 0 开始），默认为 0",
+                        "default": 0,
+                    },
+                },
+                "required": ["text"],
+            },
+        ),
+        Tool(
+            name="browser_find_text",
+            description="""在页面中查找文本的所有匹配
+
+返回每个匹配的位置、是否在视口内，以及最近的可交互元素索引，
+找到按钮/链接文字后可以直接 browser_click(index)，无需再调用 browser_get_state。
+页面端维护文本索引，DOM 变化后才会重建，重复查找开销很小。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "text": {
+                        "type": "string",
+                        "description": "要查找的文本",
+                    },
+                    "mode": {
+                        "type": "string",
+                        "description": "匹配模式：exact 精确，ignore_case 忽略大小写，fuzzy 模糊（容忍少量错字）",
+                        "enum": ["exact", "ignore_case", "fuzzy"],
+                        "default": "exact",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "最多返回的匹配数，默认为 20",
+                        "default": 20,
+                    },
                 },
                 "required": ["text"],
             },
         ),
         Tool(
             name="browser_click_coordinate",
-            description="点击指定坐标位置（用于画布、地图等特殊场景）",
+            description="""点击指定坐标位置（用于画布、地图等特殊场景）
+
+verify=true 时在同一次调用中验证点击效果：点击前后各截取坐标周围的小块区域并比较，
+报告画面是否变化、变化比例和区域，以及坐标处的元素（elementFromPoint，含元素索引）、
+URL 是否变化和新打开的标签页数，不需要再获取完整截图确认。""",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -373,6 +590,26 @@ GITHUB_PASSWORD=your_password
                         "type": "integer",
                         "description": "Y 坐标",
                     },
+                    "verify": {
+                        "type": "boolean",
+                        "description": "是否验证点击效果（比较点击前后的区域截图并报告坐标处的元素）",
+                        "default": False,
+                    },
+                    "radius": {
+                        "type": "integer",
+                        "description": "验证时截取区域的半径（CSS 像素，4-100）",
+                        "default": 40,
+                    },
+                    "settle": {
+                        "type": "number",
+                        "description": "点击后等待页面响应的秒数",
+                        "default": 0.3,
+                    },
+                    "include_clip": {
+                        "type": "boolean",
+                        "description": "是否返回点击后的区域截图",
+                        "default": False,
+                    },
                 },
                 "required": ["x", "y"],
             },
@@ -407,6 +644,37 @@ GITHUB_PASSWORD=your_password
                 "required": [],
             },
         ),
+        Tool(
+            name="browser_tabs_summary",
+            description="""查看标签页汇总：每个标签页的空闲时长和内存占用（JS 堆、DOM 节点数）
+
+后台标签页会按策略自动关闭：超过 max_tabs 时关闭最久未使用的，空闲超过 idle_timeout 秒的也会关闭，
+当前标签页不会被自动关闭。可通过参数调整策略或立即清理。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "include_metrics": {
+                        "type": "boolean",
+                        "description": "是否读取每个标签页的内存指标，默认 true",
+                        "default": True,
+                    },
+                    "max_tabs": {
+                        "type": "integer",
+                        "description": "设置最大标签页数（默认 8，最小 2）",
+                    },
+                    "idle_timeout": {
+                        "type": "number",
+                        "description": "设置后台标签页的空闲超时秒数（默认 600，0 表示不按空闲时间关闭）",
+                    },
+                    "cleanup": {
+                        "type": "boolean",
+                        "description": "是否立即按策略关闭多余和空闲的标签页",
+                        "default": False,
+                    },
+                },
+                "required": [],
+            },
+        ),
         
         # ===== 内容提取工具 =====
         Tool(
@@ -417,15 +685,465 @@ GITHUB_PASSWORD=your_password
                 "properties": {
                     "filename": {
                         "type": "string",
-                        "description": "截图文件名（可选，默认自动生成）",
+                        "description": "截图文件名（可选，默认自动生成）",
+                    },
+                },
+                "required": [],
+            },
+        ),
+        Tool(
+            name="browser_screencast",
+            description="""开启或停止当前标签页的实时画面流
+
+开启后浏览器在页面变化时推送 JPEG 帧，内存中只保留最新一帧，
+之后用 browser_screencast_frame 直接读取，无需每次截图。适合反复观察页面变化。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "action": {
+                        "type": "string",
+                        "description": "start 开启画面流，stop 停止",
+                        "enum": ["start", "stop"],
+                        "default": "start",
+                    },
+                    "quality": {
+                        "type": "integer",
+                        "description": "JPEG 质量（1-100），默认 60",
+                        "default": 60,
+                    },
+                    "max_width": {
+                        "type": "integer",
+                        "description": "帧的最大宽度，默认 1280",
+                        "default": 1280,
+                    },
+                    "max_height": {
+                        "type": "integer",
+                        "description": "帧的最大高度，默认 720",
+                        "default": 720,
+                    },
+                    "max_fps": {
+                        "type": "number",
+                        "description": "最大帧率，默认 5",
+                        "default": 5,
+                    },
+                },
+                "required": [],
+            },
+        ),
+        Tool(
+            name="browser_screencast_frame",
+            description="""读取画面流的最新帧（需先用 browser_screencast 开启）
+
+立即返回内存中的最新帧，不触发截图。传入上次得到的帧序号 since 时，
+只有画面变化后才返回新帧，否则返回"画面没有变化"（可用 wait 等待新帧）。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "since": {
+                        "type": "integer",
+                        "description": "上次读取的帧序号，只返回更新的帧（可选）",
+                    },
+                    "wait": {
+                        "type": "number",
+                        "description": "没有新帧时最多等待的秒数（最多 30 秒），默认 0",
+                        "default": 0,
+                    },
+                },
+                "required": [],
+            },
+        ),
+        Tool(
+            name="browser_extract_content",
+            description="提取当前页面的文本内容（DOM 文本表示）",
+            inputSchema={
+                "type": "object",
+                "properties": {},
+                "required": [],
+            },
+        ),
+        Tool(
+            name="browser_extract_markdown",
+            description="""提取当前页面内容为 Markdown 格式
+
+长页面可使用分块模式：指定 cursor 或 chunk_size 后，每次只返回一块内容，
+并给出 next_cursor，用它再次调用即可继续向后翻页，直到没有 next_cursor。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "extract_links": {
+                        "type": "boolean",
+                        "description": "是否保留链接，默认为 true",
+                        "default": True,
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "分块游标（可选，首次分块提取传空字符串，之后传上次返回的 next_cursor；页面内容变化后游标失效，需传空字符串重新开始）",
+                    },
+                    "chunk_size": {
+                        "type": "integer",
+                        "description": "分块模式下每块的最大字符数（500 - 50000），默认为 5000",
+                        "default": 5000,
+                    },
+                },
+                "required": [],
+            },
+        ),
+        
+        Tool(
+            name="browser_crawl",
+            description="""并行抓取多个 URL 并提取 Markdown 内容
+
+在当前浏览器上下文中用有限大小的页面池并发打开页面（共享 cookies 和登录状态），
+结果分批返回：首次调用传入 urls 启动任务并返回第一批结果，
+之后传入返回的 crawl_id 继续获取下一批，直到提示抓取完成。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "urls": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "要抓取的 URL 列表（启动新任务时必填）",
+                    },
+                    "crawl_id": {
+                        "type": "string",
+                        "description": "抓取任务 ID（获取后续批次时使用）",
+                    },
+                    "batch_size": {
+                        "type": "integer",
+                        "description": "每批返回的结果数，默认为 10",
+                        "default": 10,
+                    },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "description": "最大并发页面数（1 - 10），默认为 4",
+                        "default": 4,
+                    },
+                    "timeout": {
+                        "type": "integer",
+                        "description": "单个 URL 的超时时间（秒），默认为 30",
+                        "default": 30,
+                    },
+                    "max_depth": {
+                        "type": "integer",
+                        "description": "链接跟随深度，0 表示只抓取给定的 URL，默认为 0",
+                        "default": 0,
+                    },
+                    "same_origin": {
+                        "type": "boolean",
+                        "description": "跟随链接时是否只抓取同源页面，默认为 true",
+                        "default": True,
+                    },
+                    "max_pages": {
+                        "type": "integer",
+                        "description": "最多抓取的页面总数，默认为 50",
+                        "default": 50,
+                    },
+                    "max_chars": {
+                        "type": "integer",
+                        "description": "每个页面返回的最大 Markdown 字符数，默认为 3000",
+                        "default": 3000,
+                    },
+                },
+                "required": [],
+            },
+        ),
+        Tool(
+            name="browser_export_pages",
+            description="""批量将多个 URL 渲染为 PDF 和/或 Markdown 文件（归档知识库页面）
+
+在当前浏览器上下文中用有限大小的页面池并发渲染（共享 cookies 和登录状态），
+文件写入输出目录，并生成 manifest.json 清单（URL、标题、文件路径、字节数、耗时、错误）。
+PDF 需要无头模式（headless=true）的会话。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "urls": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "要导出的 URL 列表",
+                    },
+                    "formats": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": ["pdf", "markdown"]},
+                        "description": "输出格式，默认为 [\"markdown\"]",
+                    },
+                    "output_dir": {
+                        "type": "string",
+                        "description": "输出目录（可选，相对于 ~/.browser_use_mcp/exports，不能是绝对路径或包含 ..），默认为 export_<时间戳>",
+                    },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "description": "最大并发页面数（1 - 10），默认为 4",
+                        "default": 4,
+                    },
+                    "timeout": {
+                        "type": "integer",
+                        "description": "单个 URL 的超时时间（秒），默认为 60",
+                        "default": 60,
+                    },
+                },
+                "required": ["urls"],
+            },
+        ),
+        
+        # ===== 网络响应捕获 =====
+        Tool(
+            name="browser_network_capture",
+            description="""开启或停止网络响应记录
+
+开启后会按 URL 模式和内容类型记录页面发出请求的响应（默认只保存 JSON 响应体），
+之后可用 browser_list_responses 查看、browser_get_response_body 直接读取接口数据，
+比从渲染后的 DOM 中提取数据更快更准确。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "action": {
+                        "type": "string",
+                        "description": "start 开启记录，stop 停止并清空记录",
+                        "enum": ["start", "stop"],
+                        "default": "start",
+                    },
+                    "url_pattern": {
+                        "type": "string",
+                        "description": "只记录匹配该模式的 URL，支持通配符（如 '*/api/*'）或子串（可选）",
+                    },
+                    "content_types": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "保存响应体的内容类型片段，如 ['json', 'text/plain']，默认为 ['json']",
+                    },
+                },
+                "required": [],
+            },
+        ),
+        Tool(
+            name="browser_list_responses",
+            description="列出已记录的网络响应（最新的在前），包含 ID、URL、状态码、内容类型和大小",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "url_pattern": {
+                        "type": "string",
+                        "description": "URL 过滤模式（可选）",
+                    },
+                    "content_type": {
+                        "type": "string",
+                        "description": "内容类型过滤，如 'json'（可选）",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "最多返回的条数，默认为 50",
+                        "default": 50,
+                    },
+                },
+                "required": [],
+            },
+        ),
+        Tool(
+            name="browser_get_response_body",
+            description="获取已记录响应的响应体（JSON 会被格式化）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "response_id": {
+                        "type": "integer",
+                        "description": "响应 ID（从 browser_list_responses 获取）",
+                    },
+                    "max_chars": {
+                        "type": "integer",
+                        "description": "返回的最大字符数，默认为 20000",
+                        "default": 20000,
+                    },
+                },
+                "required": ["response_id"],
+            },
+        ),
+        
+        # ===== 下载工具 =====
+        Tool(
+            name="browser_list_downloads",
+            description="""列出当前会话的下载（状态、字节数、保存路径）
+
+会话创建后自动接收下载，文件保存在会话独立的下载目录中。
+内容与已有文件相同（SHA-256 一致）的下载不会重复保存，状态为 duplicate。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "status": {
+                        "type": "string",
+                        "enum": ["in_progress", "completed", "duplicate", "failed"],
+                        "description": "按状态筛选（可选）",
+                    },
+                },
+                "required": [],
+            },
+        ),
+        Tool(
+            name="browser_wait_for_downloads",
+            description="""等待 N 个下载结束
+
+批量导出文档时，先连续点击多个下载按钮（下载在后台并行进行），
+再调用此工具一次性等待全部完成。每个结束的下载只会被返回一次。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "count": {
+                        "type": "integer",
+                        "description": "需要等待结束的下载数，默认为 1",
+                        "default": 1,
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": "超时时间（秒），默认为 60",
+                        "default": 60,
+                    },
+                },
+                "required": [],
+            },
+        ),
+        
+        # ===== 表单和文件工具 =====
+        Tool(
+            name="browser_get_dropdown_options",
+            description="获取下拉框的选项列表",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "index": {
+                        "type": "integer",
+                        "description": "下拉框元素索引",
+                    },
+                },
+                "required": ["index"],
+            },
+        ),
+        Tool(
+            name="browser_upload_file",
+            description="上传文件到文件输入框",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "index": {
+                        "type": "integer",
+                        "description": "文件输入框元素索引",
+                    },
+                    "file_path": {
+                        "type": "string",
+                        "description": "要上传的文件路径",
+                    },
+                },
+                "required": ["index", "file_path"],
+            },
+        ),
+        
+        # ===== Cookie 管理 =====
+        Tool(
+            name="browser_get_cookies",
+            description="""获取上下文中的 cookies，可按域名、名称、过期时间筛选并分页
+
+单点登录网站的 cookies 可能有几百个，建议按 domain / name 筛选，只取需要的条目。
+返回结果包含 total（符合条件的总数）和 next_offset（下一页的 offset）。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "domain": {
+                        "type": "string",
+                        "description": "域名（包含子域名，如 example.com 匹配 .example.com 和 a.example.com）",
+                    },
+                    "name": {
+                        "type": "string",
+                        "description": "cookie 名称，或通配符模式（如 session_*）",
+                    },
+                    "session": {
+                        "type": "boolean",
+                        "description": "true 只匹配会话 cookies，false 只匹配持久 cookies",
+                    },
+                    "expires_within": {
+                        "type": "number",
+                        "description": "只匹配在该秒数内过期的持久 cookies",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "分页起始位置",
+                        "default": 0,
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "每页条数（最多 200）",
+                        "default": 50,
+                    },
+                    "max_value_length": {
+                        "type": "integer",
+                        "description": "值的最大显示长度，超出部分截断",
+                        "default": 80,
+                    },
+                },
+                "required": [],
+            },
+        ),
+        Tool(
+            name="browser_set_cookies",
+            description="批量设置 cookies（未指定 url 和 domain 时使用当前页面 URL）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "cookies": {
+                        "type": "array",
+                        "description": "cookie 列表",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string"},
+                                "value": {"type": "string"},
+                                "url": {"type": "string"},
+                                "domain": {"type": "string"},
+                                "path": {"type": "string"},
+                                "expires": {"type": "number", "description": "过期时间（Unix 时间戳）"},
+                                "expires_in": {"type": "number", "description": "多少秒后过期"},
+                                "http_only": {"type": "boolean"},
+                                "secure": {"type": "boolean"},
+                                "same_site": {"type": "string", "enum": ["Strict", "Lax", "None"]},
+                            },
+                            "required": ["name", "value"],
+                        },
+                    },
+                },
+                "required": ["cookies"],
+            },
+        ),
+        Tool(
+            name="browser_delete_cookies",
+            description="按条件批量删除 cookies（至少指定一个条件；清除全部请使用 browser_clear_cookies）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "domain": {
+                        "type": "string",
+                        "description": "域名（包含子域名，如 example.com 匹配 .example.com 和 a.example.com）",
+                    },
+                    "name": {
+                        "type": "string",
+                        "description": "cookie 名称，或通配符模式（如 session_*）",
+                    },
+                    "session": {
+                        "type": "boolean",
+                        "description": "true 只匹配会话 cookies，false 只匹配持久 cookies",
+                    },
+                    "expires_within": {
+                        "type": "number",
+                        "description": "只匹配在该秒数内过期的持久 cookies",
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": "cookie 路径（精确匹配）",
                     },
                 },
                 "required": [],
             },
         ),
         Tool(
-            name="browser_extract_content",
-            description="提取当前页面的文本内容（DOM 文本表示）",
+            name="browser_clear_cookies",
+            description="清除所有 cookies",
             inputSchema={
                 "type": "object",
                 "properties": {},
@@ -433,74 +1151,173 @@ GITHUB_PASSWORD=your_password
             },
         ),
         Tool(
-            name="browser_extract_markdown",
-            description="提取当前页面内容为 Markdown 格式",
+            name="browser_storage",
+            description="""查看或修改当前页面源的 localStorage / sessionStorage
+
+get 按键名（支持 * 和 ? 通配符）筛选并分页，值过长时截断；set 批量写入；
+delete 按键名或通配符删除；clear 清空。存储按源隔离，操作的是当前标签页所在的源。""",
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "extract_links": {
-                        "type": "boolean",
-                        "description": "是否保留链接，默认为 true",
-                        "default": True,
+                    "action": {
+                        "type": "string",
+                        "description": "get 查看，set 批量设置，delete 删除，clear 清空",
+                        "enum": ["get", "set", "delete", "clear"],
+                        "default": "get",
+                    },
+                    "area": {
+                        "type": "string",
+                        "description": "local 为 localStorage，session 为 sessionStorage",
+                        "enum": ["local", "session"],
+                        "default": "local",
+                    },
+                    "key": {
+                        "type": "string",
+                        "description": "键名或通配符模式（get / delete）",
+                    },
+                    "items": {
+                        "type": "object",
+                        "description": "set 时要写入的键值（非字符串的值按 JSON 序列化）",
+                    },
+                    "keys": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "delete 时要删除的键名列表",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "get 的分页起始位置",
+                        "default": 0,
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "get 的每页条数（最多 200）",
+                        "default": 50,
+                    },
+                    "max_value_length": {
+                        "type": "integer",
+                        "description": "get 时值的最大长度，超出部分截断",
+                        "default": 500,
                     },
                 },
                 "required": [],
             },
         ),
         
-        # ===== 表单和文件工具 =====
+        # ===== 性能指标 =====
         Tool(
-            name="browser_get_dropdown_options",
-            description="获取下拉框的选项列表",
+            name="browser_get_metrics",
+            description="""获取浏览器操作的性能指标
+
+按操作类型统计最近调用的 p50/p95 耗时、返回字符数，以及导航、元素扫描、固定等待、
+截图编码等内部步骤的耗时和元素映射重建次数，用于分析某个 browser_* 调用为什么慢。""",
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "index": {
-                        "type": "integer",
-                        "description": "下拉框元素索引",
+                    "action": {
+                        "type": "string",
+                        "description": "只查看指定操作及其子步骤，如 'get_state'（可选）",
+                    },
+                    "export_trace": {
+                        "type": "boolean",
+                        "description": "是否同时导出 Chrome Trace Event 格式的 span 文件，默认为 false",
+                        "default": False,
+                    },
+                    "reset": {
+                        "type": "boolean",
+                        "description": "返回后是否清空统计，默认为 false",
+                        "default": False,
                     },
                 },
-                "required": ["index"],
+                "required": [],
             },
         ),
         Tool(
-            name="browser_upload_file",
-            description="上传文件到文件输入框",
+            name="browser_tracing",
+            description="开启或停止 Playwright tracing，停止时保存 trace zip 用于离线分析（playwright show-trace）",
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "index": {
-                        "type": "integer",
-                        "description": "文件输入框元素索引",
+                    "action": {
+                        "type": "string",
+                        "description": "start 开启，stop 停止并保存",
+                        "enum": ["start", "stop"],
                     },
-                    "file_path": {
+                    "filename": {
                         "type": "string",
-                        "description": "要上传的文件路径",
+                        "description": "停止时保存的文件名（可选，默认自动生成；保存在 ~/.browser_use_mcp/traces 下，不能是绝对路径或包含 ..）",
                     },
                 },
-                "required": ["index", "file_path"],
+                "required": ["action"],
             },
         ),
         
-        # ===== Cookie 管理 =====
+        # ===== 录制与回放 =====
         Tool(
-            name="browser_get_cookies",
-            description="获取当前页面的 cookies",
+            name="browser_record",
+            description="""录制操作脚本（开始/停止）
+
+录制期间每个成功的导航、点击、输入、按键、滚动、上传等操作都会记录为一步，
+元素以稳定定位器（id、name、placeholder、文本等）记录，而不是元素索引。
+敏感数据只记录 credential_key，不会记录凭证值。
+停止后脚本保存为 ~/.browser_use_mcp/scripts/{name}.json，之后用 browser_replay 回放。""",
             inputSchema={
                 "type": "object",
-                "properties": {},
-                "required": [],
+                "properties": {
+                    "action": {
+                        "type": "string",
+                        "enum": ["start", "stop"],
+                        "description": "start 开始录制，stop 停止并保存",
+                    },
+                    "name": {
+                        "type": "string",
+                        "description": "脚本名称（开始录制时必填）",
+                    },
+                    "save": {
+                        "type": "boolean",
+                        "description": "停止时是否保存脚本，默认为 true",
+                        "default": True,
+                    },
+                },
+                "required": ["action"],
             },
         ),
         Tool(
-            name="browser_clear_cookies",
-            description="清除所有 cookies",
+            name="browser_list_scripts",
+            description="列出已保存的操作脚本",
             inputSchema={
                 "type": "object",
                 "properties": {},
                 "required": [],
             },
         ),
+        Tool(
+            name="browser_replay",
+            description="""回放已保存的操作脚本
+
+每步等待元素就绪后直接执行，无需逐步调用 browser_get_state 分析页面，
+重复性的日常流程可在几秒内完成。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "脚本名称",
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": "每步等待元素的超时时间（秒），默认为 10",
+                        "default": 10,
+                    },
+                    "stop_on_error": {
+                        "type": "boolean",
+                        "description": "某步失败时是否停止回放，默认为 true",
+                        "default": True,
+                    },
+                },
+                "required": ["name"],
+            },
+        ),
         
         # ===== 其他工具 =====
         Tool(
@@ -518,14 +1335,89 @@ GITHUB_PASSWORD=your_password
                 "required": [],
             },
         ),
-    ]
+        Tool(
+            name="browser_wait_for",
+            description="""等待条件成立后立即返回（代替固定秒数的 browser_wait）
+
+条件：
+- visible / hidden: 元素可见 / 隐藏（value 为选择器，或用 index 指定元素）
+- text: 页面中出现文本 value
+- url: URL 匹配 value（含 * 时按通配符，否则按子串）
+- network_idle: 网络空闲
+- count: 匹配 CSS 选择器 value 的元素数至少为 count
+- predicate: 页面端具名谓词 value（ready: 文档加载完成，not_busy: 没有 aria-busy 的元素）
+
+text / count / predicate 在页面端 DOM 变化、文档加载状态变化时检查，另以 500ms 低频轮询兜底（如只改变 CSS 的可见性）。返回实际耗时。""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "condition": {
+                        "type": "string",
+                        "description": "条件类型",
+                        "enum": ["visible", "hidden", "text", "url", "network_idle", "count", "predicate"],
+                    },
+                    "value": {
+                        "type": "string",
+                        "description": "条件参数：选择器、文本、URL 模式或谓词名称",
+                    },
+                    "index": {
+                        "type": "integer",
+                        "description": "元素索引（visible / hidden 时代替选择器）",
+                    },
+                    "count": {
+                        "type": "integer",
+                        "description": "count 条件的最少元素数，默认 1",
+                        "default": 1,
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": "超时时间（秒，最大 60 秒），默认 10",
+                        "default": 10,
+                    },
+                },
+                "required": ["condition"],
+            },
+        ),
+    ])
 
 
 @app.call_tool()
 async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | ImageContent | EmbeddedResource]:
-    """处理工具调用"""
-    manager = get_manager()
+    """处理工具调用
+    
+    按 session_id 找到对应会话的管理器，并持有该会话的锁执行，
+    同一会话上的调用不会交错，不同会话之间可以并行。
+    """
+    registry = get_registry()
     
+    if name == "browser_create_session":
+        session_id = arguments.get("session_id")
+        manager = registry.acquire(session_id)
+        if manager is None:
+            status = registry.status()
+            return [TextContent(
+                type="text",
+                text=f"❌ 创建会话失败: 活动会话数已达上限 {status['max_sessions']}，请先关闭其他会话\n当前活动会话: {', '.join(status['active_sessions'])}"
+            )]
+    else:
+        session_id, manager = registry.resolve(arguments.get("session_id"))
+    
+    session_lock = registry.lock(session_id)
+    async with session_lock:
+        try:
+            return await _dispatch_tool(name, arguments, manager, session_lock)
+        finally:
+            if name in ("browser_create_session", "browser_close_session"):
+                registry.release(session_id)
+
+
+async def _dispatch_tool(
+    name: str,
+    arguments: dict,
+    manager: BrowserUseManager,
+    session_lock: Optional[asyncio.Lock] = None,
+) -> list[TextContent | ImageContent | EmbeddedResource]:
+    """执行工具调用（session_lock 为调用方持有的会话锁，长时间等待结果时可临时释放）"""
     try:
         # ===== 会话管理 =====
         if name == "browser_create_session":
@@ -544,6 +1436,7 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
   - 会话 ID: {result['session_id']}
   - 状态恢复: {'是' if result.get('restored') else '否'}
   - 无头模式: {'是' if result.get('headless') else '否'}
+  - 浏览器来源: {STARTUP_LABELS.get(result.get('startup'), result.get('startup'))}，页面可用耗时 {result.get('time_to_page_ms')}ms
 
 💡 下一步: 使用 browser_navigate 导航到目标网站，或使用 browser_get_state 获取当前页面状态"""
                 )]
@@ -551,10 +1444,13 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
                 return [TextContent(type="text", text=f"❌ 创建会话失败: {result.get('error')}")]
         
         elif name == "browser_save_session":
-            result = await manager.save_session()
+            result = await manager.save_session(compress=arguments.get("compress"))
             
             if result.get("success"):
-                return [TextContent(type="text", text=f"✅ 会话 '{result['session_id']}' 已保存")]
+                if not result.get("written"):
+                    return [TextContent(type="text", text=f"✅ 会话 '{result['session_id']}' 无变化，无需重新写入")]
+                changed = "、".join(result.get("changed") or []) or "格式"
+                return [TextContent(type="text", text=f"✅ 会话 '{result['session_id']}' 已保存（变化: {changed}，{result['size_bytes']} 字节）")]
             else:
                 return [TextContent(type="text", text=f"❌ 保存失败: {result.get('error')}")]
         
@@ -573,11 +1469,13 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
             
             sessions_text = "📋 已保存的会话列表:\n\n"
             for session in result["sessions"]:
-                import datetime
                 modified = datetime.datetime.fromtimestamp(session["modified_at"]).strftime("%Y-%m-%d %H:%M:%S")
                 current = " (当前)" if session["session_id"] == result.get("current_session") else ""
                 sessions_text += f"  • {session['session_id']}{current}\n"
-                sessions_text += f"    最后修改: {modified}\n\n"
+                sessions_text += f"    最后修改: {modified}\n"
+                if session.get("cookies_count") is not None:
+                    sessions_text += f"    Cookies: {session['cookies_count']} 个，存储源: {session['origins_count']} 个\n"
+                sessions_text += f"    大小: {session['size_bytes']} 字节{'（已压缩）' if session.get('compressed') else ''}\n\n"
             
             return [TextContent(type="text", text=sessions_text)]
         
@@ -590,10 +1488,54 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
             else:
                 return [TextContent(type="text", text=f"❌ 删除失败: {result.get('error')}")]
         
+        elif name == "browser_checkpoint":
+            action = arguments.get("action", "save")
+            checkpoint_name = arguments.get("name")
+            
+            if action == "list":
+                result = manager.list_checkpoints()
+                if not result["checkpoints"]:
+                    return [TextContent(type="text", text="📭 没有检查点")]
+                checkpoints_text = f"📌 检查点（{result['count']} 个）:\n"
+                for checkpoint in result["checkpoints"]:
+                    checkpoints_text += (
+                        f"\n  • {checkpoint['name']}: {len(checkpoint['tabs'])} 个标签页，"
+                        f"{checkpoint['cookies']} 个 cookie，{checkpoint['origins']} 个源的 localStorage"
+                        f"\n    创建于 {checkpoint['created_at']}"
+                    )
+                return [TextContent(type="text", text=checkpoints_text)]
+            
+            if not checkpoint_name:
+                return [TextContent(type="text", text="❌ 请提供检查点名称 name")]
+            
+            if action == "restore":
+                result = await manager.restore_checkpoint(checkpoint_name)
+            elif action == "delete":
+                result = manager.delete_checkpoint(checkpoint_name)
+            else:
+                result = await manager.create_checkpoint(checkpoint_name)
+            
+            if result.get("success"):
+                checkpoint_text = f"✅ {result['message']}"
+                for error in result.get("load_errors", []):
+                    checkpoint_text += f"\n⚠️ 标签页加载失败: {error}"
+                return [TextContent(type="text", text=checkpoint_text)]
+            else:
+                error_msg = f"❌ 操作失败: {result.get('error')}"
+                if result.get("available"):
+                    error_msg += f"\n可用的检查点: {', '.join(result['available'])}"
+                return [TextContent(type="text", text=error_msg)]
+        
         elif name == "browser_get_status":
             status = manager.get_status()
+            registry_status = get_registry().status()
             
             sensitive_keys = ", ".join(status['sensitive_data_keys']) if status['sensitive_data_keys'] else "无"
+            active_sessions = ", ".join(registry_status['active_sessions']) or "无"
+            prewarm_text = ", ".join(
+                f"{kind} {info['elapsed_ms']}ms{'（未使用）' if info['unused'] else ''}"
+                for kind, info in registry_status['prewarmed'].items()
+            ) or "未启用"
             
             return [TextContent(
                 type="text",
@@ -602,18 +1544,34 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
   - 浏览器运行中: {'是' if status['browser_active'] else '否'}
   - 页面活动: {'是' if status['page_active'] else '否'}
   - 当前会话: {status['current_session'] or '无'}
+  - 活动会话: {active_sessions}（上限 {registry_status['max_sessions']}）
+  - 默认会话: {registry_status['default_session'] or '无'}
+  - 浏览器预热: {prewarm_text}
   - 已配置的敏感数据: {sensitive_keys}"""
             )]
         
         # ===== 核心：获取页面状态 =====
         elif name == "browser_get_state":
             include_screenshot = arguments.get("include_screenshot", True)
-            result = await manager.get_state(include_screenshot)
+            mode = arguments.get("mode", "dom")
+            max_chars = arguments.get("max_chars", 8000)
+            force_screenshot = arguments.get("force_screenshot", False)
+            result = await manager.get_state(
+                include_screenshot,
+                mode=mode,
+                max_chars=max_chars,
+                force_screenshot=force_screenshot,
+                max_elements=arguments.get("max_elements"),
+                max_frames=arguments.get("max_frames"),
+                shadow_dom=arguments.get("shadow_dom"),
+            )
             
             if result.get("success"):
                 # 构建元素列表文本
                 elements_text = ""
-                if result.get("elements"):
+                if result.get("mode") == "accessibility":
+                    elements_text = f"\n\n🌳 无障碍树大纲:\n{result.get('accessibility_outline') or '(空)'}\n"
+                elif result.get("elements"):
                     elements_text = "\n\n📋 可交互元素列表:\n"
                     for el in result["elements"][:50]:  # 限制显示数量
                         el_text = f"  [{el['index']}] <{el['tag']}>"
@@ -625,11 +1583,27 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
                             el_text += f" [type={el['type']}]"
                         if el.get('href'):
                             el_text += f" -> {el['href'][:50]}..."
+                        if el.get('frame'):
+                            el_text += f" (iframe: {el['frame'][:50]})"
+                        elif el.get('in_shadow_dom'):
+                            el_text += " (shadow DOM)"
                         elements_text += el_text + "\n"
                     
                     if len(result["elements"]) > 50:
                         elements_text += f"\n  ... 还有 {len(result['elements']) - 50} 个元素\n"
                 
+                # 扫描开销（含子框架时按框架列出）
+                scan = result.get("scan")
+                if scan and (len(scan["frames"]) > 1 or scan["budget_exhausted"]):
+                    elements_text += "\n🔎 扫描开销:\n"
+                    for frame in scan["frames"]:
+                        if frame.get("error"):
+                            elements_text += f"  - {frame['frame'][:60]}: 失败 ({frame['error'][:60]})\n"
+                        else:
+                            elements_text += f"  - {frame['frame'][:60]}: {frame['elements']} 个元素, {frame['shadow_roots']} 个 shadow root, {frame['ms']}ms\n"
+                    if scan["budget_exhausted"]:
+                        elements_text += f"  ⚠️ 已达扫描预算（最多 {scan['max_elements']} 个元素 / {scan['max_frames']} 个框架），可通过 max_elements / max_frames 调整\n"
+                
                 # 标签页信息
                 tabs_text = ""
                 if result.get("tabs"):
@@ -638,11 +1612,16 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
                         active = " (当前)" if i == result.get("active_tab_index") else ""
                         tabs_text += f"  [{i}] {tab['title'][:30]}{active}\n"
                 
+                # 截图状态
+                screenshot_text = ""
+                if result.get("screenshot_unchanged"):
+                    screenshot_text = f"\n📸 截图: 页面未变化，沿用上一次的截图（已跳过 {result['screenshots_skipped']} 次截图）"
+                
                 response_text = f"""📄 页面状态
 
 🌐 URL: {result['url']}
 📑 标题: {result['title']}
-📊 可交互元素数: {result['elements_count']}
+📊 可交互元素数: {result['elements_count']}{screenshot_text}
 {tabs_text}{elements_text}
 
 💡 使用 browser_click(index) 点击元素，browser_input(index, text) 输入文本"""
@@ -675,10 +1654,23 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
             query = arguments.get("query")
             engine = arguments.get("engine", "google")
             
-            result = await manager.search(query, engine)
+            result = await manager.search(
+                query,
+                engine,
+                pages=arguments.get("pages", 1),
+                max_results=arguments.get("max_results", 20),
+                use_cache=arguments.get("use_cache", True),
+            )
             
             if result.get("success"):
-                return [TextContent(type="text", text=f"✅ {result['message']}")]
+                search_text = f"✅ {result['message']}\n"
+                if not result["results"]:
+                    search_text += "\n📭 未提取到结果（可能是验证页面），可用 browser_get_state 查看页面"
+                for item in result["results"]:
+                    search_text += f"\n{item['rank']}. {item['title']}\n   🔗 {item['url']}\n"
+                    if item["snippet"]:
+                        search_text += f"   {item['snippet']}\n"
+                return [TextContent(type="text", text=search_text)]
             else:
                 return [TextContent(type="text", text=f"❌ 搜索失败: {result.get('error')}")]
         
@@ -719,6 +1711,24 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
                     error_msg += f"\n可用的键: {', '.join(result['available_keys'])}"
                 return [TextContent(type="text", text=error_msg)]
         
+        elif name == "browser_fill_form":
+            result = await manager.fill_form(
+                arguments.get("fields") or [],
+                clear_first=arguments.get("clear_first", True),
+            )
+            
+            if not result.get("fields"):
+                return [TextContent(type="text", text=f"❌ 填写失败: {result.get('error')}")]
+            
+            form_text = f"{'✅' if result['success'] else '⚠️'} {result['message']}\n"
+            for field in result["fields"]:
+                label = field["target"] + (f"（{field['credential_key']}）" if field.get("credential_key") else "")
+                if field["success"]:
+                    form_text += f"\n  ✅ {label}"
+                else:
+                    form_text += f"\n  ❌ {label}: {field['error']}"
+            return [TextContent(type="text", text=form_text)]
+        
         elif name == "browser_list_credentials":
             keys = list_credential_keys()
             
@@ -767,22 +1777,97 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
         
         elif name == "browser_scroll_to_text":
             text = arguments.get("text")
-            result = await manager.scroll_to_text(text)
+            mode = arguments.get("mode", "exact")
+            occurrence = arguments.get("occurrence", 0)
+            result = await manager.scroll_to_text(text, mode, occurrence)
             
             if result.get("success"):
-                return [TextContent(type="text", text=f"✅ {result['message']}")]
+                element_index = result["match"].get("elementIndex")
+                element_hint = f"\n最近的可交互元素: [{element_index}]" if element_index is not None else ""
+                return [TextContent(type="text", text=f"✅ {result['message']}（共 {result['count']} 处匹配）{element_hint}")]
             else:
                 return [TextContent(type="text", text=f"❌ 滚动失败: {result.get('error')}")]
         
+        elif name == "browser_find_text":
+            text = arguments.get("text")
+            mode = arguments.get("mode", "exact")
+            limit = arguments.get("limit", 20)
+            result = await manager.find_text(text, mode, limit)
+            
+            if result.get("success"):
+                matches = result.get("matches", [])
+                if not matches:
+                    return [TextContent(type="text", text=f"📭 未找到文本: {text}")]
+                
+                matches_text = f"🔎 找到 {result['count']} 处匹配（显示 {len(matches)} 处）:\n\n"
+                for match in matches:
+                    rect = match["rect"]
+                    element = f"元素 [{match['elementIndex']}]" if match.get("elementIndex") is not None else "无关联元素"
+                    visible = "可见" if match.get("visible") else "视口外"
+                    distance = f" 编辑距离 {match['distance']}" if mode == "fuzzy" else ""
+                    matches_text += f"  #{match['match']} \"{match['text'][:60]}\" <{match['tag']}> ({int(rect['x'])}, {int(rect['y'])}) {visible} → {element}{distance}\n"
+                matches_text += "\n💡 使用 browser_click(index) 点击关联元素，或 browser_scroll_to_text(text, occurrence=#) 滚动到匹配处"
+                return [TextContent(type="text", text=matches_text)]
+            else:
+                return [TextContent(type="text", text=f"❌ 查找失败: {result.get('error')}")]
+        
         elif name == "browser_click_coordinate":
             x = arguments.get("x")
             y = arguments.get("y")
-            result = await manager.click_coordinate(x, y)
+            result = await manager.click_coordinate(
+                x,
+                y,
+                verify=arguments.get("verify", False),
+                radius=arguments.get("radius", 40),
+                settle=arguments.get("settle", 0.3),
+                include_clip=arguments.get("include_clip", False),
+            )
             
-            if result.get("success"):
+            if not result.get("success"):
+                return [TextContent(type="text", text=f"❌ 点击失败: {result.get('error')}")]
+            
+            verification = result.get("verification")
+            if not verification:
                 return [TextContent(type="text", text=f"✅ {result['message']}")]
+            
+            def describe_point_element(element: dict) -> str:
+                label = element.get("aria_label") or element.get("text") or element.get("href") or ""
+                text = f"<{element['tag']}>"
+                if element.get("index") is not None:
+                    text = f"[{element['index']}] " + text
+                if label:
+                    text += f" {label[:60]}"
+                if element.get("interactive"):
+                    text += f"（可交互: {element['interactive']}）"
+                elif element.get("cursor") == "pointer":
+                    text += "（cursor: pointer）"
+                return text
+            
+            click_text = f"✅ {result['message']}"
+            if verification.get("element"):
+                click_text += f"\n🎯 坐标处元素: {describe_point_element(verification['element'])}"
             else:
-                return [TextContent(type="text", text=f"❌ 点击失败: {result.get('error')}")]
+                click_text += "\n🎯 坐标处没有元素"
+            if verification["changed"]:
+                ratio = verification.get("changed_ratio")
+                bbox = verification.get("changed_bbox")
+                click_text += "\n🖼️ 区域画面变化" + (f" {ratio:.1%}" if ratio is not None else "")
+                if bbox:
+                    click_text += f"（变化范围 x={bbox['x']} y={bbox['y']} {bbox['width']}x{bbox['height']}）"
+            else:
+                click_text += f"\n🖼️ 区域画面无变化（{verification['clip']['width']}x{verification['clip']['height']}）"
+            if verification.get("element_after"):
+                click_text += f"\n🔄 点击后坐标处元素: {describe_point_element(verification['element_after'])}"
+            if verification["url_changed"]:
+                click_text += f"\n🔗 URL 已变化: {verification['url']}"
+            if verification["new_tabs"]:
+                click_text += f"\n🗂️ 打开了 {verification['new_tabs']} 个新标签页"
+            click_text += f"\n⏱️ {verification['elapsed_ms']} ms"
+            
+            contents = [TextContent(type="text", text=click_text)]
+            if result.get("clip_base64"):
+                contents.append(ImageContent(type="image", data=result["clip_base64"], mimeType="image/png"))
+            return contents
         
         # ===== 标签页管理 =====
         elif name == "browser_switch_tab":
@@ -803,6 +1888,39 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
             else:
                 return [TextContent(type="text", text=f"❌ 关闭失败: {result.get('error')}")]
         
+        elif name == "browser_tabs_summary":
+            result = await manager.tab_summary(
+                include_metrics=arguments.get("include_metrics", True),
+                max_tabs=arguments.get("max_tabs"),
+                idle_timeout=arguments.get("idle_timeout"),
+                cleanup=arguments.get("cleanup", False),
+            )
+            
+            if not result.get("success"):
+                return [TextContent(type="text", text=f"❌ 获取标签页汇总失败: {result.get('error')}")]
+            
+            idle_policy = f"空闲 {result['idle_timeout']:g} 秒自动关闭" if result["idle_timeout"] else "不按空闲时间关闭"
+            tabs_text = f"📑 标签页 {result['count']}/{result['max_tabs']}（{idle_policy}）\n"
+            for tab in result["tabs"]:
+                active = " (当前)" if tab["active"] else ""
+                if tab.get("internal"):
+                    active += " (后台任务，不计入上限)"
+                tabs_text += f"\n[{tab['index']}] {tab['title'][:40]}{active}\n    🔗 {tab['url'][:100]}\n    ⏱️ 空闲 {tab['idle_seconds']} 秒，已打开 {tab['age_seconds']} 秒"
+                metrics = tab.get("metrics")
+                if metrics:
+                    tabs_text += f"\n    💾 JS 堆 {metrics.get('js_heap_used', 0) / 1024 / 1024:.1f} MB，DOM 节点 {metrics.get('dom_nodes', 0)}"
+                tabs_text += "\n"
+            if result.get("js_heap_used_total"):
+                tabs_text += f"\n💾 JS 堆合计: {result['js_heap_used_total'] / 1024 / 1024:.1f} MB"
+            if result["closed_now"]:
+                tabs_text += f"\n🧹 本次关闭 {len(result['closed_now'])} 个标签页"
+            if result["recently_closed"]:
+                tabs_text += "\n🗂️ 最近自动关闭:"
+                for closed in result["recently_closed"]:
+                    reason = "空闲超时" if closed["reason"] == "idle" else "超出数量上限"
+                    tabs_text += f"\n  • {closed['url'][:80]}（{reason}）"
+            return [TextContent(type="text", text=tabs_text)]
+        
         # ===== 内容提取 =====
         elif name == "browser_screenshot":
             filename = arguments.get("filename")
@@ -813,6 +1931,45 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
             else:
                 return [TextContent(type="text", text=f"❌ 截图失败: {result.get('error')}")]
         
+        elif name == "browser_screencast":
+            action = arguments.get("action", "start")
+            
+            if action == "stop":
+                result = await manager.stop_screencast()
+            else:
+                result = await manager.start_screencast(
+                    quality=arguments.get("quality", 60),
+                    max_width=arguments.get("max_width", 1280),
+                    max_height=arguments.get("max_height", 720),
+                    max_fps=arguments.get("max_fps", 5),
+                )
+            
+            if result.get("success"):
+                return [TextContent(type="text", text=f"✅ {result['message']}")]
+            else:
+                return [TextContent(type="text", text=f"❌ 操作失败: {result.get('error')}")]
+        
+        elif name == "browser_screencast_frame":
+            result = await manager.get_screencast_frame(
+                since=arguments.get("since"),
+                wait=arguments.get("wait", 0),
+            )
+            
+            if not result.get("success"):
+                return [TextContent(type="text", text=f"❌ 读取画面失败: {result.get('error')}")]
+            if not result.get("changed"):
+                return [TextContent(type="text", text=f"⏸️ {result['message']}")]
+            
+            frame_text = (
+                f"🎞️ 帧 #{result['seq']}（{result['width']}×{result['height']}，"
+                f"{result['age_ms']} ms 前，滚动位置 {result['scroll_y']}）\n"
+                f"💡 下次传入 since={result['seq']} 只在画面变化时返回新帧"
+            )
+            return [
+                TextContent(type="text", text=frame_text),
+                ImageContent(type="image", data=result["data"], mimeType="image/jpeg"),
+            ]
+        
         elif name == "browser_extract_content":
             result = await manager.extract_content()
             
@@ -826,6 +1983,26 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
         
         elif name == "browser_extract_markdown":
             extract_links = arguments.get("extract_links", True)
+            
+            if "cursor" in arguments or "chunk_size" in arguments:
+                result = await manager.extract_markdown_chunk(
+                    cursor=arguments.get("cursor"),
+                    chunk_size=arguments.get("chunk_size", 5000),
+                    extract_links=extract_links,
+                )
+                
+                if result.get("success"):
+                    if result.get("next_cursor"):
+                        footer = f"\n\n➡️ 还有更多内容，使用 cursor=\"{result['next_cursor']}\" 继续提取"
+                    else:
+                        footer = "\n\n✅ 已到达页面末尾"
+                    return [TextContent(
+                        type="text",
+                        text=f"📄 Markdown 内容（游标 {result['cursor']}，{result['length']} 字符）:\n\n{result['markdown']}{footer}"
+                    )]
+                else:
+                    return [TextContent(type="text", text=f"❌ 提取失败: {result.get('error')}")]
+            
             result = await manager.extract_markdown(extract_links)
             
             if result.get("success"):
@@ -836,6 +2013,151 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
             else:
                 return [TextContent(type="text", text=f"❌ 提取失败: {result.get('error')}")]
         
+        elif name == "browser_crawl":
+            crawl_id = arguments.get("crawl_id")
+            batch_size = arguments.get("batch_size", 10)
+            
+            if not crawl_id:
+                start_result = await manager.start_crawl(
+                    urls=arguments.get("urls") or [],
+                    max_concurrency=arguments.get("max_concurrency", 4),
+                    timeout=arguments.get("timeout", 30),
+                    max_depth=arguments.get("max_depth", 0),
+                    same_origin=arguments.get("same_origin", True),
+                    max_pages=arguments.get("max_pages", 50),
+                    max_chars=arguments.get("max_chars", 3000),
+                )
+                if not start_result.get("success"):
+                    return [TextContent(type="text", text=f"❌ 抓取失败: {start_result.get('error')}")]
+                crawl_id = start_result["crawl_id"]
+            
+            result = await manager.next_crawl_batch(crawl_id, batch_size, session_lock=session_lock)
+            
+            if result.get("success"):
+                crawl_text = f"🕸️ 抓取任务 {crawl_id}: 已返回 {result['delivered']}/{result['queued']} 个页面\n"
+                for item in result["results"]:
+                    if item.get("success"):
+                        truncated = "（已截断）" if item.get("truncated") else ""
+                        crawl_text += f"\n### ✅ {item['url']}\n📑 {item.get('title', '')} | {item['length']} 字符{truncated} | {item['elapsed']}s\n\n{item['markdown']}\n"
+                    else:
+                        crawl_text += f"\n### ❌ {item['url']}\n{item.get('error')}\n"
+                
+                if result.get("done"):
+                    crawl_text += "\n✅ 抓取完成"
+                else:
+                    crawl_text += f"\n💡 使用 browser_crawl(crawl_id=\"{crawl_id}\") 获取下一批结果"
+                return [TextContent(type="text", text=crawl_text)]
+            else:
+                return [TextContent(type="text", text=f"❌ 抓取失败: {result.get('error')}")]
+        
+        elif name == "browser_export_pages":
+            result = await manager.export_pages(
+                urls=arguments.get("urls") or [],
+                formats=arguments.get("formats"),
+                output_dir=arguments.get("output_dir"),
+                max_concurrency=arguments.get("max_concurrency", 4),
+                timeout=arguments.get("timeout", 60),
+            )
+            
+            if result.get("success"):
+                export_text = f"📦 导出完成: {result['succeeded']}/{result['total']} 个页面成功，耗时 {result['elapsed']}s\n📁 {result['output_dir']}\n📋 清单: {result['manifest_file']}\n"
+                for page in result["pages"]:
+                    if page.get("success"):
+                        files = ", ".join(Path(f).name for f in page["files"].values())
+                        export_text += f"\n  ✅ {page['url']} -> {files}"
+                    else:
+                        export_text += f"\n  ❌ {page['url']}: {page.get('error')}"
+                return [TextContent(type="text", text=export_text)]
+            else:
+                return [TextContent(type="text", text=f"❌ 导出失败: {result.get('error')}")]
+        
+        # ===== 网络响应捕获 =====
+        elif name == "browser_network_capture":
+            action = arguments.get("action", "start")
+            
+            if action == "stop":
+                result = await manager.stop_network_capture()
+            else:
+                result = await manager.start_network_capture(
+                    url_pattern=arguments.get("url_pattern"),
+                    content_types=arguments.get("content_types"),
+                )
+            
+            if result.get("success"):
+                return [TextContent(type="text", text=f"✅ {result['message']}")]
+            else:
+                return [TextContent(type="text", text=f"❌ 操作失败: {result.get('error')}")]
+        
+        elif name == "browser_list_responses":
+            result = await manager.list_network_responses(
+                url_pattern=arguments.get("url_pattern"),
+                content_type=arguments.get("content_type"),
+                limit=arguments.get("limit", 50),
+            )
+            
+            if result.get("success"):
+                responses = result.get("responses", [])
+                if not responses:
+                    return [TextContent(type="text", text="📭 没有匹配的网络响应")]
+                
+                responses_text = f"🌐 网络响应（{result['count']} 条）:\n\n"
+                for resp in responses:
+                    stored = "📦" if resp["body_stored"] else "  "
+                    size = f"{resp['size']}B" if resp.get("size") is not None else "?"
+                    responses_text += f"  {stored} [{resp['id']}] {resp['method']} {resp['status']} {resp['content_type'][:30]} {size}\n      {resp['url'][:120]}\n"
+                responses_text += "\n💡 📦 表示响应体已保存，使用 browser_get_response_body(response_id) 读取"
+                return [TextContent(type="text", text=responses_text)]
+            else:
+                return [TextContent(type="text", text=f"❌ 获取失败: {result.get('error')}")]
+        
+        elif name == "browser_get_response_body":
+            response_id = arguments.get("response_id")
+            max_chars = arguments.get("max_chars", 20000)
+            result = await manager.get_network_response_body(response_id, max_chars)
+            
+            if result.get("success"):
+                resp = result["response"]
+                body = result["body"]
+                if result.get("truncated"):
+                    body += f"\n\n... (内容已截断，共 {result['length']} 字符)"
+                return [TextContent(
+                    type="text",
+                    text=f"🌐 {resp['method']} {resp['url']}\n状态码: {resp['status']} | 内容类型: {resp['content_type']}\n\n{body}"
+                )]
+            else:
+                return [TextContent(type="text", text=f"❌ 获取失败: {result.get('error')}")]
+        
+        # ===== 下载 =====
+        elif name == "browser_list_downloads":
+            result = manager.list_downloads(arguments.get("status"))
+            
+            if result.get("success"):
+                stats = result["stats"]
+                lines = [_format_download(d) for d in result["downloads"]]
+                return [TextContent(
+                    type="text",
+                    text=f"""📥 下载列表（{stats['download_dir']}）
+进行中 {stats['in_progress']} | 已完成 {stats['completed']} | 重复 {stats['duplicate']} | 失败 {stats['failed']} | 已保存 {stats['saved_bytes']} 字节
+
+""" + ("\n".join(lines) if lines else "(无下载)")
+                )]
+            else:
+                return [TextContent(type="text", text=f"❌ 获取下载列表失败: {result.get('error')}")]
+        
+        elif name == "browser_wait_for_downloads":
+            count = arguments.get("count", 1)
+            timeout = arguments.get("timeout", 60)
+            result = await manager.wait_for_downloads(count, timeout)
+            
+            lines = "\n".join(_format_download(d) for d in result.get("downloads", []))
+            if result.get("success"):
+                return [TextContent(type="text", text=f"✅ {result['count']} 个下载已结束\n\n{lines}")]
+            else:
+                text = f"❌ {result.get('error')}"
+                if lines:
+                    text += f"\n\n{lines}"
+                return [TextContent(type="text", text=text)]
+        
         # ===== 表单和文件 =====
         elif name == "browser_get_dropdown_options":
             index = arguments.get("index")
@@ -860,20 +2182,64 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
         
         # ===== Cookie 管理 =====
         elif name == "browser_get_cookies":
-            result = await manager.get_cookies()
+            result = await manager.get_cookies(
+                domain=arguments.get("domain"),
+                name=arguments.get("name"),
+                session=arguments.get("session"),
+                expires_within=arguments.get("expires_within"),
+                offset=arguments.get("offset", 0),
+                limit=arguments.get("limit", 50),
+                max_value_length=arguments.get("max_value_length", 80),
+            )
             
             if result.get("success"):
                 cookies = result.get("cookies", [])
                 if cookies:
-                    cookies_text = "\n".join([f"  - {c['name']}: {c['value'][:20]}..." for c in cookies[:20]])
-                    if len(cookies) > 20:
-                        cookies_text += f"\n  ... 还有 {len(cookies) - 20} 个 cookies"
+                    lines = []
+                    for c in cookies:
+                        value = c["value"] + ("..." if c.get("value_truncated") else "")
+                        flags = [flag for flag, on in (("HttpOnly", c["http_only"]), ("Secure", c["secure"])) if on]
+                        if c["expires"] is None:
+                            flags.append("会话")
+                        else:
+                            flags.append("过期 " + datetime.datetime.fromtimestamp(c["expires"]).strftime("%Y-%m-%d %H:%M"))
+                        lines.append(f"  - {c['name']}={value}\n    {c['domain']}{c['path']}  [{', '.join(flags)}]")
+                    cookies_text = "\n".join(lines)
                 else:
-                    cookies_text = "  (无 cookies)"
-                return [TextContent(type="text", text=f"🍪 Cookies ({result['count']} 个):\n{cookies_text}")]
+                    cookies_text = "  (无符合条件的 cookies)"
+                shown = f"第 {result['offset'] + 1}-{result['offset'] + result['count']} 个，" if cookies else ""
+                header = f"🍪 Cookies（{shown}共 {result['total']} 个符合条件，cookie 总数 {result['jar_size']}）"
+                if result.get("next_offset") is not None:
+                    cookies_text += f"\n\n下一页: offset={result['next_offset']}"
+                return [TextContent(type="text", text=f"{header}:\n{cookies_text}")]
             else:
                 return [TextContent(type="text", text=f"❌ 获取失败: {result.get('error')}")]
         
+        elif name == "browser_set_cookies":
+            result = await manager.set_cookies(arguments.get("cookies", []))
+            
+            if result.get("success"):
+                return [TextContent(type="text", text=f"✅ {result['message']}: {', '.join(result['set'])}")]
+            else:
+                return [TextContent(type="text", text=f"❌ 设置失败: {result.get('error')}")]
+        
+        elif name == "browser_delete_cookies":
+            result = await manager.delete_cookies(
+                domain=arguments.get("domain"),
+                name=arguments.get("name"),
+                path=arguments.get("path"),
+                session=arguments.get("session"),
+                expires_within=arguments.get("expires_within"),
+            )
+            
+            if result.get("success"):
+                deleted_text = "\n".join(f"  - {c['name']} ({c['domain']}{c['path']})" for c in result["deleted"][:30])
+                if result["count"] > 30:
+                    deleted_text += f"\n  ... 还有 {result['count'] - 30} 个"
+                return [TextContent(type="text", text=f"✅ {result['message']}，剩余 {result['remaining']} 个\n{deleted_text}".rstrip())]
+            else:
+                return [TextContent(type="text", text=f"❌ 删除失败: {result.get('error')}")]
+        
         elif name == "browser_clear_cookies":
             result = await manager.clear_cookies()
             
@@ -882,6 +2248,134 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
             else:
                 return [TextContent(type="text", text=f"❌ 清除失败: {result.get('error')}")]
         
+        elif name == "browser_storage":
+            action = arguments.get("action", "get")
+            result = await manager.web_storage(
+                action=action,
+                area=arguments.get("area", "local"),
+                key=arguments.get("key"),
+                items=arguments.get("items"),
+                keys=arguments.get("keys"),
+                offset=arguments.get("offset", 0),
+                limit=arguments.get("limit", 50),
+                max_value_length=arguments.get("max_value_length", 500),
+            )
+            
+            if not result.get("success"):
+                return [TextContent(type="text", text=f"❌ 存储操作失败: {result.get('error')}")]
+            
+            storage_name = "sessionStorage" if result["area"] == "session" else "localStorage"
+            if action == "get":
+                entries = result["entries"]
+                storage_text = f"🗄️ {storage_name}（{result['origin']}，共 {result['size']} 项，{result['total']} 项符合条件）:\n"
+                if entries:
+                    for entry in entries:
+                        suffix = f"...（共 {entry['length']} 字符）" if entry.get("truncated") else ""
+                        storage_text += f"\n  - {entry['key']}: {entry['value']}{suffix}"
+                else:
+                    storage_text += "\n  (无符合条件的条目)"
+                if result.get("next_offset") is not None:
+                    storage_text += f"\n\n下一页: offset={result['next_offset']}"
+                return [TextContent(type="text", text=storage_text)]
+            if action == "set":
+                return [TextContent(type="text", text=f"✅ 已写入 {storage_name}（{result['origin']}）: {', '.join(result['set'])}")]
+            return [TextContent(type="text", text=f"✅ 已从 {storage_name}（{result['origin']}）删除 {len(result['deleted'])} 项")]
+        
+        # ===== 性能指标 =====
+        elif name == "browser_get_metrics":
+            export_trace = arguments.get("export_trace", False)
+            trace_result = manager.export_metrics_trace() if export_trace else None
+            result = manager.get_metrics(arguments.get("action"), arguments.get("reset", False))
+            
+            metrics_text = "📈 浏览器操作指标（最近 {} 次调用的滚动窗口）:\n\n".format(result["window"])
+            if result["actions"]:
+                for action_name, stats in result["actions"].items():
+                    indent = "      " if "." in action_name else "  "
+                    metrics_text += f"{indent}{action_name}: {stats['calls']} 次, p50 {stats['p50_ms']}ms, p95 {stats['p95_ms']}ms, max {stats['max_ms']}ms"
+                    if stats["errors"]:
+                        metrics_text += f", 失败 {stats['errors']} 次"
+                    if stats["chars_returned"]:
+                        metrics_text += f", 返回 {stats['chars_returned']} 字符"
+                    metrics_text += "\n"
+            else:
+                metrics_text += "  (暂无数据)\n"
+            
+            if result["counters"]:
+                metrics_text += "\n🔢 计数器:\n"
+                for counter, value in result["counters"].items():
+                    metrics_text += f"  {counter}: {value}\n"
+            
+            if result.get("tracing_active"):
+                metrics_text += "\n🎬 Playwright tracing 运行中"
+            if trace_result:
+                if trace_result.get("success"):
+                    metrics_text += f"\n📁 span 已导出: {trace_result['filepath']}"
+                else:
+                    metrics_text += f"\n❌ 导出失败: {trace_result.get('error')}"
+            
+            return [TextContent(type="text", text=metrics_text)]
+        
+        elif name == "browser_tracing":
+            action = arguments.get("action")
+            
+            if action == "start":
+                result = await manager.start_tracing()
+            else:
+                result = await manager.stop_tracing(arguments.get("filename"))
+            
+            if result.get("success"):
+                return [TextContent(type="text", text=f"✅ {result['message']}")]
+            else:
+                return [TextContent(type="text", text=f"❌ 操作失败: {result.get('error')}")]
+        
+        # ===== 录制与回放 =====
+        elif name == "browser_record":
+            action = arguments.get("action")
+            
+            if action == "start":
+                result = manager.start_recording(arguments.get("name"))
+                if result.get("success"):
+                    return [TextContent(type="text", text=f"⏺️ {result['message']}")]
+            else:
+                result = manager.stop_recording(arguments.get("save", True))
+                if result.get("success"):
+                    saved = f"\n📁 {result['file']}" if result.get("file") else "（未保存）"
+                    return [TextContent(type="text", text=f"⏹️ 录制已停止: '{result['name']}' 共 {result['steps_count']} 步{saved}")]
+            return [TextContent(type="text", text=f"❌ 录制操作失败: {result.get('error')}")]
+        
+        elif name == "browser_list_scripts":
+            result = manager.list_scripts()
+            
+            scripts = result.get("scripts", [])
+            if scripts:
+                scripts_text = "\n".join([f"  - {s['name']}（{s['steps_count']} 步，{s.get('created_at', '未知')}）" for s in scripts])
+                return [TextContent(type="text", text=f"📜 已保存的脚本:\n{scripts_text}")]
+            else:
+                return [TextContent(type="text", text="📜 没有已保存的脚本")]
+        
+        elif name == "browser_replay":
+            result = await manager.replay_script(
+                arguments.get("name"),
+                timeout=arguments.get("timeout", 10),
+                stop_on_error=arguments.get("stop_on_error", True),
+            )
+            
+            if "results" not in result:
+                return [TextContent(type="text", text=f"❌ 回放失败: {result.get('error')}")]
+            
+            steps_text = ""
+            for step in result["results"]:
+                icon = "✅" if step["success"] else "❌"
+                element = f" {step['element']}" if step.get("element") else ""
+                error = f" - {step['error']}" if not step["success"] else ""
+                steps_text += f"\n  {icon} [{step['step']}] {step['action']}{element} ({step['elapsed']}s){error}"
+            
+            header = "✅ 回放完成" if result["success"] else "❌ 回放未完成"
+            return [TextContent(
+                type="text",
+                text=f"{header}: {result['name']} {result['steps_run']}/{result['steps_total']} 步，耗时 {result['elapsed']}s\n🌐 当前页面: {result['url']}{steps_text}"
+            )]
+        
         # ===== 其他 =====
         elif name == "browser_wait":
             seconds = arguments.get("seconds", 3)
@@ -889,6 +2383,22 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
             
             return [TextContent(type="text", text=f"✅ {result['message']}")]
         
+        elif name == "browser_wait_for":
+            result = await manager.wait_for(
+                condition=arguments.get("condition"),
+                value=arguments.get("value"),
+                index=arguments.get("index"),
+                count=arguments.get("count", 1),
+                timeout=arguments.get("timeout", 10),
+            )
+            
+            if result.get("success"):
+                return [TextContent(type="text", text=f"✅ {result['message']}")]
+            elif result.get("timed_out"):
+                return [TextContent(type="text", text=f"⏱️ {result['error']}（已等待 {result['elapsed_ms']} ms）")]
+            else:
+                return [TextContent(type="text", text=f"❌ 等待失败: {result.get('error')}")]
+        
         else:
             return [TextContent(type="text", text=f"❌ 未知的工具: {name}")]
     
@@ -901,18 +2411,41 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
 
 
 async def cleanup():
-    """清理资源"""
-    global browser_manager
-    if browser_manager:
-        try:
-            await browser_manager.save_session()
-        except:
-            pass
-        await browser_manager.cleanup()
+    """清理资源（关闭会话时会自动保存会话状态）"""
+    global session_registry
+    if session_registry:
+        await session_registry.cleanup()
+        session_registry = None
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    prewarm_choices = ["headed", "headless", "off"]
+    parser = argparse.ArgumentParser(description="Browser Use MCP Server")
+    parser.add_argument(
+        "--prewarm",
+        nargs="?",
+        const="headed",
+        choices=prewarm_choices,
+        default=os.environ.get("BROWSER_USE_MCP_PREWARM", "off"),
+        help="启动时在后台预热浏览器（headed/headless，应与创建会话的 headless 一致），"
+             "默认读取环境变量 BROWSER_USE_MCP_PREWARM",
+    )
+    args = parser.parse_args(argv)
+    # argparse 不校验默认值，来自环境变量的值需要单独检查
+    if args.prewarm not in prewarm_choices:
+        parser.error(f"环境变量 BROWSER_USE_MCP_PREWARM 的值无效: {args.prewarm!r}（可选 {', '.join(prewarm_choices)}）")
+    try:
+        max_sessions_from_env()
+    except ValueError as e:
+        parser.error(str(e))
+    return args
 
 
 async def main():
     """主函数"""
+    args = parse_args()
+    
     # 注册清理函数
     def signal_handler(sig, frame):
         asyncio.create_task(cleanup())
@@ -923,18 +2456,28 @@ async def main():
     
     # 使用 stdio 传输运行服务器
     async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="browser-use-mcp-server",
-                server_version="2.0.0",
-                capabilities=app.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+        # 后台预热浏览器，不阻塞 MCP 初始化和 list_tools
+        prewarm_task = None
+        if args.prewarm != "off":
+            prewarm_task = asyncio.create_task(get_registry().prewarm(headless=args.prewarm == "headless"))
+        
+        try:
+            await app.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="browser-use-mcp-server",
+                    server_version="2.0.0",
+                    capabilities=app.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+        finally:
+            # 服务器退出时预热可能仍在进行
+            if prewarm_task and not prewarm_task.done():
+                prewarm_task.cancel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Cookie 筛选模块 - 按域名、名称和过期时间筛选 cookies 并分页
+
+单点登录较多的网站上，上下文中的 cookies 可能有几百个，一次全部返回既浪费
+上下文也难以找到需要的条目。这里提供与浏览器无关的筛选逻辑，
+获取、批量删除 cookies 时共用：
+- 域名：匹配该域名及其子域名（'example.com' 匹配 '.example.com' 和 'a.example.com'）
+- 名称：支持通配符模式（如 'session_*'），否则按名称精确匹配
+- 过期时间：只保留会话 cookies / 持久 cookies，或在指定秒数内过期的 cookies
+"""
+
+import fnmatch
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# 单页最多返回的 cookies / 存储条目数
+MAX_PAGE_SIZE = 200
+
+
+def match_domain(cookie_domain: str, domain: Optional[str]) -> bool:
+    """cookie 的域名是否属于 domain（含子域名）"""
+    if not domain:
+        return True
+    cookie_domain = cookie_domain.lstrip(".").lower()
+    domain = domain.lstrip(".").lower()
+    return cookie_domain == domain or cookie_domain.endswith("." + domain)
+
+
+def match_name(name: str, pattern: Optional[str]) -> bool:
+    """名称匹配：支持通配符模式，否则精确匹配"""
+    if not pattern:
+        return True
+    if any(ch in pattern for ch in "*?["):
+        return fnmatch.fnmatchcase(name, pattern)
+    return name == pattern
+
+
+def filter_cookies(
+    cookies: List[Dict[str, Any]],
+    domain: Optional[str] = None,
+    name: Optional[str] = None,
+    path: Optional[str] = None,
+    session: Optional[bool] = None,
+    expires_within: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    筛选 cookies（各条件同时满足）
+    
+    Args:
+        cookies: context.cookies() 返回的 cookies
+        domain: 域名（含子域名）
+        name: 名称或通配符模式
+        path: 路径（精确匹配）
+        session: True 只保留会话 cookies，False 只保留持久 cookies
+        expires_within: 只保留在该秒数内过期的持久 cookies
+    
+    Returns:
+        符合条件的 cookies（保持原顺序）
+    """
+    now = time.time()
+    matched = []
+    for cookie in cookies:
+        expires = cookie.get("expires", -1)
+        is_session = expires is None or expires < 0
+        if not match_domain(cookie.get("domain", ""), domain):
+            continue
+        if not match_name(cookie.get("name", ""), name):
+            continue
+        if path and cookie.get("path") != path:
+            continue
+        if session is not None and is_session != session:
+            continue
+        if expires_within is not None and (is_session or expires - now > expires_within):
+            continue
+        matched.append(cookie)
+    return matched
+
+
+def paginate(items: List[Any], offset: int = 0, limit: int = 50) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    分页
+    
+    Returns:
+        (当前页的条目, 分页信息：total、offset、limit、next_offset)
+    """
+    offset = max(int(offset), 0)
+    limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+    page = items[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(items) else None
+    return page, {"total": len(items), "offset": offset, "limit": limit, "next_offset": next_offset}
+
+
+def describe_cookie(cookie: Dict[str, Any], max_value_length: Optional[int] = None) -> Dict[str, Any]:
+    """返回给调用方的 cookie 信息，max_value_length 为值的最大长度（超出部分截断）"""
+    value = cookie.get("value", "")
+    expires = cookie.get("expires", -1)
+    described = {
+        "name": cookie.get("name"),
+        "value": value,
+        "domain": cookie.get("domain"),
+        "path": cookie.get("path"),
+        "expires": expires if expires is not None and expires >= 0 else None,
+        "http_only": cookie.get("httpOnly", False),
+        "secure": cookie.get("secure", False),
+        "same_site": cookie.get("sameSite"),
+    }
+    if max_value_length is not None and len(value) > max_value_length:
+        described["value"] = value[:max_value_length]
+        described["value_truncated"] = len(value)
+    return described
+
+
+def normalize_cookie(cookie: Dict[str, Any], default_url: Optional[str]) -> Dict[str, Any]:
+    """
+    转换为 context.add_cookies 接受的格式
+    
+    未指定 url 和 domain 时使用 default_url（当前页面）；
+    同时接受 http_only / same_site / expires_in（秒）等写法。
+    """
+    if not cookie.get("name"):
+        raise ValueError("cookie 缺少 name")
+    normalized: Dict[str, Any] = {"name": str(cookie["name"]), "value": str(cookie.get("value", ""))}
+    
+    if cookie.get("url"):
+        normalized["url"] = cookie["url"]
+    elif cookie.get("domain"):
+        normalized["domain"] = cookie["domain"]
+        normalized["path"] = cookie.get("path") or "/"
+    elif default_url and default_url.startswith(("http://", "https://")):
+        normalized["url"] = default_url
+    else:
+        raise ValueError(f"cookie '{cookie['name']}' 缺少 url 或 domain，且当前页面没有可用的 URL")
+    
+    if cookie.get("expires_in") is not None:
+        normalized["expires"] = time.time() + float(cookie["expires_in"])
+    elif cookie.get("expires") is not None:
+        normalized["expires"] = float(cookie["expires"])
+    for source, target in (("http_only", "httpOnly"), ("httpOnly", "httpOnly"), ("secure", "secure")):
+        if cookie.get(source) is not None:
+            normalized[target] = bool(cookie[source])
+    same_site = cookie.get("same_site") or cookie.get("sameSite")
+    if same_site:
+        normalized["sameSite"] = same_site.capitalize()
+    return normalized
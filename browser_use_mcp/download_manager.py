@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""下载管理模块 - 基于 Playwright download 事件的批量下载
+
+每个会话有独立的下载目录。DownloadManager 监听上下文中所有页面的 download 事件，
+每个下载在独立的后台任务中等待完成并保存，多个下载可以同时进行：
+- 状态与字节数：进行中 / 已完成 / 重复 / 失败，完成后记录文件大小
+- 去重：先按文件大小筛选候选文件，再比较 SHA-256，内容相同的下载不会重复保存
+- 等待：wait() 等待 N 个下载结束，批量导出文档时无需逐个确认
+"""
+
+import asyncio
+import datetime
+import hashlib
+import itertools
+import logging
+import re
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 下载的最终状态
+FINISHED_STATUSES = ("completed", "duplicate", "failed")
+
+
+def _sha256(path: Path) -> str:
+    """计算文件的 SHA-256（在线程中执行，避免阻塞事件循环）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _safe_filename(name: str) -> str:
+    """去掉文件名中的路径分隔符和控制字符"""
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]', '_', name).strip(' .')
+    return name or "download"
+
+
+class DownloadManager:
+    """会话下载管理器"""
+    
+    def __init__(self, download_dir: Path):
+        """
+        初始化下载管理器
+        
+        Args:
+            download_dir: 本会话的下载目录
+        """
+        self.download_dir = Path(download_dir)
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._pending: set = set()
+        self._context = None
+        self._changed = asyncio.Condition()
+        self._reported: set = set()
+        
+        # 去重索引：文件大小 -> 路径列表，摘要 -> 路径（摘要按需计算）
+        self._by_size: Optional[Dict[int, List[Path]]] = None
+        self._digests: Dict[Path, str] = {}
+        self._dedup_lock = asyncio.Lock()
+    
+    def attach(self, context):
+        """监听上下文中现有和新打开页面的下载事件"""
+        self._context = context
+        for page in context.pages:
+            page.on("download", self._on_download)
+        context.on("page", self._on_page)
+    
+    def detach(self):
+        """停止监听并取消未完成的保存任务"""
+        if self._context is not None:
+            try:
+                self._context.remove_listener("page", self._on_page)
+                for page in self._context.pages:
+                    page.remove_listener("download", self._on_download)
+            except Exception as e:
+                logger.debug(f"移除下载监听器失败: {e}")
+            self._context = None
+        for task in self._pending:
+            task.cancel()
+        self._pending.clear()
+    
+    def _on_page(self, page):
+        page.on("download", self._on_download)
+    
+    def _on_download(self, download):
+        """download 事件回调（同步），在后台任务中等待下载完成"""
+        entry_id = next(self._ids)
+        self._entries[entry_id] = {
+            "id": entry_id,
+            "url": download.url,
+            "suggested_filename": download.suggested_filename,
+            "status": "in_progress",
+            "bytes": None,
+            "path": None,
+            "sha256": None,
+            "duplicate_of": None,
+            "error": None,
+            "started_at": datetime.datetime.now().isoformat(),
+            "_started": time.perf_counter(),
+            "elapsed_ms": None,
+        }
+        task = asyncio.ensure_future(self._save(entry_id, download))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    async def _save(self, entry_id: int, download):
+        """等待下载完成，去重后保存到下载目录"""
+        entry = self._entries[entry_id]
+        try:
+            failure = await download.failure()
+            if failure:
+                raise RuntimeError(failure)
+            
+            temp_path = Path(await download.path())
+            size = temp_path.stat().st_size
+            entry["bytes"] = size
+            
+            digest = await asyncio.to_thread(_sha256, temp_path)
+            entry["sha256"] = digest
+            
+            # 查重和保存需要串行，避免内容相同的并发下载都被保存
+            async with self._dedup_lock:
+                existing = await self._find_duplicate(size, digest)
+                if existing:
+                    entry["status"] = "duplicate"
+                    entry["duplicate_of"] = str(existing)
+                    entry["path"] = str(existing)
+                    await download.delete()
+                else:
+                    target = self._unique_path(_safe_filename(download.suggested_filename))
+                    await download.save_as(str(target))
+                    self._by_size[size].append(target)
+                    self._digests[target] = digest
+                    entry["status"] = "completed"
+                    entry["path"] = str(target)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+            logger.debug(f"下载失败 {entry['url']}: {e}")
+        
+        entry["elapsed_ms"] = round((time.perf_counter() - entry["_started"]) * 1000, 1)
+        async with self._changed:
+            self._changed.notify_all()
+    
+    async def _find_duplicate(self, size: int, digest: str) -> Optional[Path]:
+        """在下载目录中查找内容相同的文件（只对大小相同的文件计算摘要）"""
+        if self._by_size is None:
+            self._by_size = defaultdict(list)
+            for path in self.download_dir.iterdir():
+                if path.is_file():
+                    self._by_size[path.stat().st_size].append(path)
+        
+        for path in self._by_size.get(size, []):
+            if not path.exists():
+                continue
+            if path not in self._digests:
+                self._digests[path] = await asyncio.to_thread(_sha256, path)
+            if self._digests[path] == digest:
+                return path
+        return None
+    
+    def _unique_path(self, filename: str) -> Path:
+        """文件名已存在时追加序号"""
+        target = self.download_dir / filename
+        stem, suffix = target.stem, target.suffix
+        counter = 1
+        while target.exists():
+            target = self.download_dir / f"{stem} ({counter}){suffix}"
+            counter += 1
+        return target
+    
+    @staticmethod
+    def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in entry.items() if not k.startswith("_")}
+    
+    def list_entries(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """列出下载记录，可按状态筛选"""
+        return [
+            self._public(entry)
+            for entry in self._entries.values()
+            if status is None or entry["status"] == status
+        ]
+    
+    def stats(self) -> Dict[str, Any]:
+        """下载统计"""
+        counts = defaultdict(int)
+        saved_bytes = 0
+        duplicate_bytes = 0
+        for entry in self._entries.values():
+            counts[entry["status"]] += 1
+            if entry["status"] == "completed":
+                saved_bytes += entry["bytes"] or 0
+            elif entry["status"] == "duplicate":
+                duplicate_bytes += entry["bytes"] or 0
+        return {
+            "total": len(self._entries),
+            "in_progress": counts["in_progress"],
+            "completed": counts["completed"],
+            "duplicate": counts["duplicate"],
+            "failed": counts["failed"],
+            "saved_bytes": saved_bytes,
+            "duplicate_bytes": duplicate_bytes,
+            "download_dir": str(self.download_dir),
+        }
+    
+    async def wait(self, count: int = 1, timeout: float = 60) -> Dict[str, Any]:
+        """
+        等待 count 个下载结束（完成、重复或失败）
+        
+        每个下载只会被一次 wait 调用返回，连续批量下载时每批分别等待即可。
+        
+        Args:
+            count: 需要等待结束的下载数
+            timeout: 超时时间（秒）
+        
+        Returns:
+            本次结束的下载列表，以及是否超时
+        """
+        def unreported() -> List[int]:
+            return [
+                entry_id for entry_id, entry in self._entries.items()
+                if entry["status"] in FINISHED_STATUSES and entry_id not in self._reported
+            ]
+        
+        timed_out = False
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: len(unreported()) >= count),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                timed_out = True
+        
+        finished = unreported()
+        self._reported.update(finished)
+        return {
+            "downloads": [self._public(self._entries[entry_id]) for entry_id in finished],
+            "timed_out": timed_out,
+        }
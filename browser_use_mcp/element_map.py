@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""元素映射模块 - 紧凑的可交互元素记录
+
+页面上可能有数千个可交互元素，每次扫描都会整体替换元素映射。
+为减少内存占用和 GC 开销：
+- 扫描脚本按固定字段顺序返回数组（行），不重复传输字段名
+- 每个元素存为 __slots__ 记录，只保留交互和录制需要的字段，
+  标签名、类型、角色等重复字符串做驻留（intern）
+- 元素映射按索引存放在列表中
+- 映射中常驻的是紧凑记录，详细描述（字典）只在返回给调用方时生成
+"""
+
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 扫描脚本返回的行中各字段的顺序（与 _ELEMENT_SCAN_JS 保持一致）
+ROW_FIELDS = (
+    "tag", "text", "type", "name", "placeholder", "href",
+    "role", "aria_label", "id", "selector", "in_shadow",
+)
+
+# 兼容字典形式的字段名
+_ALIASES = {
+    "ariaLabel": "aria_label",
+    "inShadow": "in_shadow",
+    "in_shadow_dom": "in_shadow",
+}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else None
+
+
+class ElementRecord:
+    """可交互元素记录
+    
+    支持 record['tag'] / record.get('ariaLabel') 形式的访问，与原先的字典用法兼容。
+    """
+    
+    __slots__ = ("index", "frame") + ROW_FIELDS
+    
+    def __init__(
+        self,
+        index: int,
+        tag: str,
+        text: str = "",
+        type: Optional[str] = None,
+        name: Optional[str] = None,
+        placeholder: Optional[str] = None,
+        href: Optional[str] = None,
+        role: Optional[str] = None,
+        aria_label: Optional[str] = None,
+        id: Optional[str] = None,
+        selector: str = "",
+        in_shadow: bool = False,
+        frame: Optional[Tuple[str, ...]] = None,
+    ):
+        self.index = index
+        self.tag = _intern(tag)
+        self.text = text
+        self.type = _intern(type)
+        self.name = name
+        self.placeholder = placeholder
+        self.href = href
+        self.role = _intern(role)
+        self.aria_label = aria_label
+        self.id = id
+        self.selector = selector
+        self.in_shadow = bool(in_shadow)
+        self.frame = frame
+    
+    @classmethod
+    def from_row(cls, index: int, row: Sequence[Any], frame: Optional[Tuple[str, ...]] = None) -> "ElementRecord":
+        """从扫描脚本返回的行创建记录"""
+        return cls(index, *row, frame=frame)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, _ALIASES.get(key, key), None)
+        return default if value is None else value
+    
+    def __getitem__(self, key: str) -> Any:
+        key = _ALIASES.get(key, key)
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def describe(self) -> Dict[str, Any]:
+        """详细描述（按需生成，用于渲染和 JSON 输出）"""
+        return {
+            "index": self.index,
+            "tag": self.tag,
+            "text": self.text,
+            "type": self.type,
+            "name": self.name,
+            "placeholder": self.placeholder,
+            "href": self.href,
+            "role": self.role,
+            "aria_label": self.aria_label,
+            "frame": " > ".join(self.frame) if self.frame else None,
+            "in_shadow_dom": self.in_shadow,
+        }
+    
+    def payload_size(self) -> int:
+        """字符串字段的总字符数（用于指标统计返回大小）"""
+        return sum(len(getattr(self, field) or "") for field in ("tag", "text", "type", "name", "placeholder", "href", "role", "aria_label"))
+    
+    def __repr__(self) -> str:
+        return f"ElementRecord({self.index}, <{self.tag}> {self.text[:30]!r})"
+
+
+class ElementMap:
+    """按索引存放元素记录的列表（支持 in / [] / get / len，与原先的字典用法兼容）"""
+    
+    __slots__ = ("_records",)
+    
+    def __init__(self, records: Optional[List[ElementRecord]] = None):
+        self._records: List[ElementRecord] = records or []
+    
+    def __contains__(self, index: Any) -> bool:
+        return isinstance(index, int) and 0 <= index < len(self._records)
+    
+    def __getitem__(self, index: int) -> ElementRecord:
+        if index not in self:
+            raise KeyError(index)
+        return self._records[index]
+    
+    def get(self, index: int, default: Any = None) -> Any:
+        return self._records[index] if index in self else default
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def __iter__(self) -> Iterator[ElementRecord]:
+        return iter(self._records)
+    
+    def records(self) -> List[ElementRecord]:
+        """所有记录（浅拷贝）"""
+        return list(self._records)
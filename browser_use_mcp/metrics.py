@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""浏览器操作指标模块 - 记录每次调用的耗时分段
+
+每个 browser_* 操作都会记录一个 span，内部的关键步骤（导航、元素扫描、
+固定等待、截图编码等）记录为子 span。
+- 滚动窗口统计：每种操作保留最近的若干次耗时，计算 p50/p95
+- 计数器：返回的字符数、元素映射重建次数等
+- 导出：Chrome Trace Event 格式（可在 chrome://tracing 或 Perfetto 中打开）
+"""
+
+import asyncio
+import functools
+import json
+import math
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """计算百分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100.0 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def _payload_size(value: Any) -> int:
+    """估算返回结果中的字符数（只统计字符串，避免为了计数再序列化一遍）"""
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_payload_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_payload_size(v) for v in value)
+    if hasattr(value, "payload_size"):
+        return value.payload_size()
+    return 0
+
+
+def _thread_id() -> int:
+    """用当前 asyncio 任务区分并发的调用（如并行抓取）"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return id(task) % 100000 if task else 0
+
+
+class MetricsRecorder:
+    """操作耗时与计数记录器"""
+    
+    def __init__(self, window: int = 200, max_events: int = 5000):
+        """
+        初始化指标记录器
+        
+        Args:
+            window: 每种操作保留的最近耗时样本数
+            max_events: 保留的 trace 事件数上限
+        """
+        self.window = window
+        self._durations: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._calls: Dict[str, int] = defaultdict(int)
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._chars: Dict[str, int] = defaultdict(int)
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._origin = time.perf_counter()
+    
+    @contextmanager
+    def span(self, name: str, **args):
+        """记录一个 span，可嵌套使用；args 会写入 trace 事件"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, start, **args)
+    
+    def record_span(self, name: str, start: float, **args) -> float:
+        """记录从 start（time.perf_counter() 的值）到现在的 span，返回耗时（秒）"""
+        elapsed = time.perf_counter() - start
+        self._durations[name].append(elapsed)
+        self._calls[name] += 1
+        event = {
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": round((start - self._origin) * 1e6),
+            "dur": round(elapsed * 1e6),
+            "pid": 1,
+            "tid": _thread_id(),
+        }
+        if args:
+            event["args"] = args
+        self._events.append(event)
+        return elapsed
+    
+    def record_result(self, name: str, result: Any):
+        """记录一次调用的返回结果（成功/失败、返回字符数）"""
+        if isinstance(result, dict) and result.get("success") is False:
+            self._errors[name] += 1
+        self._chars[name] += _payload_size(result)
+    
+    def increment(self, counter: str, amount: int = 1):
+        """增加计数器"""
+        self._counters[counter] += amount
+    
+    def summary(self, action: Optional[str] = None) -> Dict[str, Any]:
+        """滚动统计摘要（耗时单位为毫秒）"""
+        actions = {}
+        for name, durations in sorted(self._durations.items()):
+            if action and not (name == action or name.startswith(action + ".")):
+                continue
+            samples = list(durations)
+            actions[name] = {
+                "calls": self._calls[name],
+                "errors": self._errors.get(name, 0),
+                "p50_ms": round(_percentile(samples, 50) * 1000, 1),
+                "p95_ms": round(_percentile(samples, 95) * 1000, 1),
+                "max_ms": round(max(samples) * 1000, 1),
+                "chars_returned": self._chars.get(name, 0),
+            }
+        return {
+            "actions": actions,
+            "counters": dict(self._counters),
+            "window": self.window,
+        }
+    
+    def export_trace(self, path: Path) -> int:
+        """导出 Chrome Trace Event 格式的 JSON 文件，返回事件数"""
+        events = list(self._events)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return len(events)
+    
+    def reset(self):
+        """清空所有统计"""
+        self._durations.clear()
+        self._calls.clear()
+        self._errors.clear()
+        self._chars.clear()
+        self._counters.clear()
+        self._events.clear()
+
+
+def traced(action: str):
+    """为管理器的异步方法记录 span 和返回结果（要求实例有 _metrics 属性）"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            metrics: MetricsRecorder = self._metrics
+            start = time.perf_counter()
+            result = None
+            try:
+                result = await func(self, *args, **kwargs)
+                return result
+            finally:
+                metrics.record_span(action, start)
+                metrics.record_result(action, result if result is not None else {"success": False})
+        return wrapper
+    return decorator
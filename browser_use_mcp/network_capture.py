@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""网络响应捕获模块 - 为浏览器会话记录类似 HAR 的响应索引
+
+页面通过 XHR/fetch 获取的 JSON 数据往往比渲染后的 DOM 更干净。
+NetworkRecorder 监听浏览器上下文的 response 事件，按 URL 模式和内容类型
+建立响应索引，并把响应体保存在按字节数限制大小的 LRU 存储中，
+AI 可以直接读取接口数据，而不必进行昂贵的 DOM 提取。
+"""
+
+import asyncio
+import datetime
+import fnmatch
+import itertools
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _match_url(url: str, pattern: Optional[str]) -> bool:
+    """URL 匹配：支持通配符模式（如 '*/api/*'），否则按子串匹配"""
+    if not pattern:
+        return True
+    if any(ch in pattern for ch in "*?["):
+        return fnmatch.fnmatch(url, pattern)
+    return pattern in url
+
+
+def _match_content_type(content_type: str, content_types: Optional[List[str]]) -> bool:
+    """内容类型匹配：content_types 中任一片段出现在 content-type 中即匹配"""
+    if not content_types:
+        return True
+    content_type = content_type.lower()
+    return any(ct.lower() in content_type for ct in content_types)
+
+
+class NetworkRecorder:
+    """网络响应记录器
+    
+    - 索引：最多保留 max_entries 条响应元数据，超出后丢弃最早的记录
+    - 响应体：LRU 存储，总字节数不超过 max_total_body_bytes，
+      单个响应体超过 max_body_bytes 时只记录元数据
+    """
+    
+    def __init__(
+        self,
+        url_pattern: Optional[str] = None,
+        content_types: Optional[List[str]] = None,
+        max_entries: int = 500,
+        max_body_bytes: int = 2 * 1024 * 1024,
+        max_total_body_bytes: int = 20 * 1024 * 1024,
+    ):
+        """
+        初始化网络记录器
+        
+        Args:
+            url_pattern: 只记录匹配该模式的 URL（通配符或子串，可选）
+            content_types: 只保存这些内容类型的响应体，如 ['json', 'text/plain']
+            max_entries: 索引保留的最大响应数
+            max_body_bytes: 单个响应体的最大字节数
+            max_total_body_bytes: 响应体存储的总字节数上限
+        """
+        self.url_pattern = url_pattern
+        self.content_types = content_types if content_types is not None else ["json"]
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+        self.max_total_body_bytes = max_total_body_bytes
+        
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._bodies: "OrderedDict[int, bytes]" = OrderedDict()
+        self._body_bytes = 0
+        self._ids = itertools.count(1)
+        self._pending: set = set()
+        self._context = None
+        self.dropped_entries = 0
+        self.evicted_bodies = 0
+    
+    def attach(self, context):
+        """开始监听浏览器上下文的响应事件"""
+        self._context = context
+        context.on("response", self._on_response)
+    
+    def detach(self):
+        """停止监听"""
+        if self._context is not None:
+            try:
+                self._context.remove_listener("response", self._on_response)
+            except Exception as e:
+                logger.debug(f"移除响应监听器失败: {e}")
+            self._context = None
+        for task in self._pending:
+            task.cancel()
+        self._pending.clear()
+    
+    def _on_response(self, response):
+        """response 事件回调（同步），响应体在后台任务中读取"""
+        if not _match_url(response.url, self.url_pattern):
+            return
+        task = asyncio.ensure_future(self._record(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    async def _record(self, response):
+        """记录一条响应及其响应体"""
+        headers = response.headers
+        content_type = headers.get("content-type", "")
+        request = response.request
+        
+        entry_id = next(self._ids)
+        entry = {
+            "id": entry_id,
+            "url": response.url,
+            "method": request.method,
+            "resource_type": request.resource_type,
+            "status": response.status,
+            "content_type": content_type,
+            "size": int(headers["content-length"]) if headers.get("content-length", "").isdigit() else None,
+            "body_stored": False,
+            "captured_at": datetime.datetime.now().isoformat(),
+        }
+        self._entries[entry_id] = entry
+        while len(self._entries) > self.max_entries:
+            old_id, _ = self._entries.popitem(last=False)
+            self._drop_body(old_id)
+            self.dropped_entries += 1
+        
+        if not _match_content_type(content_type, self.content_types):
+            return
+        if entry["size"] is not None and entry["size"] > self.max_body_bytes:
+            return
+        
+        try:
+            body = await response.body()
+        except Exception as e:
+            # 重定向、页面已关闭等情况下无法读取响应体
+            logger.debug(f"读取响应体失败 {response.url}: {e}")
+            return
+        
+        entry["size"] = len(body)
+        if len(body) > self.max_body_bytes or entry_id not in self._entries:
+            return
+        
+        self._bodies[entry_id] = body
+        self._body_bytes += len(body)
+        entry["body_stored"] = True
+        while self._body_bytes > self.max_total_body_bytes and self._bodies:
+            old_id, _ = next(iter(self._bodies.items()))
+            self._drop_body(old_id)
+            self.evicted_bodies += 1
+    
+    def _drop_body(self, entry_id: int):
+        """从 LRU 存储中移除响应体"""
+        body = self._bodies.pop(entry_id, None)
+        if body is not None:
+            self._body_bytes -= len(body)
+            entry = self._entries.get(entry_id)
+            if entry:
+                entry["body_stored"] = False
+    
+    def list_entries(
+        self,
+        url_pattern: Optional[str] = None,
+        content_type: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """按 URL 模式和内容类型筛选响应，最新的在前"""
+        content_types = [content_type] if content_type else None
+        matched = []
+        for entry in reversed(self._entries.values()):
+            if _match_url(entry["url"], url_pattern) and _match_content_type(entry["content_type"], content_types):
+                matched.append(dict(entry))
+                if len(matched) >= limit:
+                    break
+        return matched
+    
+    def get_body(self, entry_id: int) -> Optional[bytes]:
+        """获取响应体（命中后移到 LRU 末尾）"""
+        body = self._bodies.get(entry_id)
+        if body is not None:
+            self._bodies.move_to_end(entry_id)
+        return body
+    
+    def get_entry(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """获取响应元数据"""
+        entry = self._entries.get(entry_id)
+        return dict(entry) if entry else None
+    
+    def stats(self) -> Dict[str, Any]:
+        """记录器统计信息"""
+        return {
+            "entries": len(self._entries),
+            "bodies": len(self._bodies),
+            "body_bytes": self._body_bytes,
+            "dropped_entries": self.dropped_entries,
+            "evicted_bodies": self.evicted_bodies,
+            "url_pattern": self.url_pattern,
+            "content_types": self.content_types,
+        }
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""实时画面模块 - 基于 CDP Page.startScreencast 的帧流
+
+反复调用截图时，每次都要完整截图并编码 PNG。开启画面流后，Chromium 在页面
+内容变化时主动推送 JPEG 帧，这里只在内存中保留最新一帧：
+- 流量控制：每帧处理完后才发送 Page.screencastFrameAck，浏览器收到确认才推送下一帧；
+  按 max_fps 延迟确认，限制帧率
+- 取帧：直接返回内存中的最新帧，或等待序号大于 since 的新帧（画面有变化）
+- 仅支持 Chromium（依赖 CDP 会话）
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Screencast:
+    """页面画面流（只保留最新帧）"""
+    
+    def __init__(
+        self,
+        quality: int = 60,
+        max_width: int = 1280,
+        max_height: int = 720,
+        max_fps: float = 5,
+    ):
+        """
+        初始化画面流
+        
+        Args:
+            quality: JPEG 质量（1-100）
+            max_width: 帧的最大宽度
+            max_height: 帧的最大高度
+            max_fps: 最大帧率（通过延迟确认实现）
+        """
+        self.quality = min(max(int(quality), 1), 100)
+        self.max_width = max_width
+        self.max_height = max_height
+        self.max_fps = max(float(max_fps), 0.1)
+        
+        self.page = None
+        self._cdp = None
+        self._frame: Optional[Dict[str, Any]] = None
+        self._seq = 0
+        self._frames_received = 0
+        self._started_at: Optional[str] = None
+        self._last_ack = 0.0
+        self._pending: set = set()
+        self._changed = asyncio.Condition()
+    
+    @property
+    def active(self) -> bool:
+        return self._cdp is not None
+    
+    async def start(self, page):
+        """在页面上开启画面流（已开启时先停止）"""
+        if self._cdp is not None:
+            await self.stop()
+        # 之前的帧可能来自其他标签页
+        self._frame = None
+        
+        self._cdp = await page.context.new_cdp_session(page)
+        self._cdp.on("Page.screencastFrame", self._on_frame)
+        await self._cdp.send("Page.startScreencast", {
+            "format": "jpeg",
+            "quality": self.quality,
+            "maxWidth": self.max_width,
+            "maxHeight": self.max_height,
+        })
+        self.page = page
+        self._started_at = datetime.datetime.now().isoformat()
+    
+    async def stop(self):
+        """停止画面流并断开 CDP 会话（保留最后一帧）"""
+        for task in self._pending:
+            task.cancel()
+        self._pending.clear()
+        
+        cdp, self._cdp, self.page = self._cdp, None, None
+        if cdp is None:
+            return
+        try:
+            await cdp.send("Page.stopScreencast")
+            await cdp.detach()
+        except Exception as e:
+            # 页面或上下文已关闭
+            logger.debug(f"停止画面流失败: {e}")
+    
+    def _on_frame(self, params: Dict[str, Any]):
+        """Page.screencastFrame 事件回调（同步）：替换最新帧并安排确认"""
+        self._seq += 1
+        self._frames_received += 1
+        metadata = params.get("metadata") or {}
+        self._frame = {
+            "seq": self._seq,
+            "data": params["data"],
+            "width": metadata.get("deviceWidth"),
+            "height": metadata.get("deviceHeight"),
+            "scroll_x": metadata.get("scrollOffsetX"),
+            "scroll_y": metadata.get("scrollOffsetY"),
+            "received_at": time.time(),
+        }
+        
+        task = asyncio.ensure_future(self._ack(params["sessionId"]))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    async def _ack(self, frame_session_id: int):
+        """确认帧（距上次确认不足 1/max_fps 秒时延迟），并通知等待新帧的调用方"""
+        async with self._changed:
+            self._changed.notify_all()
+        
+        delay = self._last_ack + 1 / self.max_fps - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._last_ack = time.monotonic()
+        
+        cdp = self._cdp
+        if cdp is None:
+            return
+        try:
+            await cdp.send("Page.screencastFrameAck", {"sessionId": frame_session_id})
+        except Exception as e:
+            logger.debug(f"确认画面帧失败: {e}")
+    
+    async def latest(self, since: Optional[int] = None, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        获取最新帧
+        
+        Args:
+            since: 只返回序号大于 since 的帧（画面有变化）；为 None 时返回当前最新帧
+            wait: 没有符合条件的帧时最多等待的秒数
+        
+        Returns:
+            帧信息（data 为 base64 JPEG，age_ms 为帧的存在时长），没有符合条件的帧时返回 None
+        """
+        def ready() -> bool:
+            return self._frame is not None and (since is None or self._frame["seq"] > since)
+        
+        if not ready() and wait > 0:
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(self._changed.wait_for(ready), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        
+        if not ready():
+            return None
+        frame = dict(self._frame)
+        frame["age_ms"] = round((time.time() - frame.pop("received_at")) * 1000)
+        return frame
+    
+    def stats(self) -> Dict[str, Any]:
+        """画面流统计"""
+        return {
+            "active": self.active,
+            "started_at": self._started_at,
+            "frames_received": self._frames_received,
+            "latest_seq": self._frame["seq"] if self._frame else None,
+            "quality": self.quality,
+            "max_fps": self.max_fps,
+        }
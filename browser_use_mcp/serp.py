@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""搜索结果提取模块 - 从搜索引擎结果页 DOM 中直接提取排序后的结果
+
+search 以前只负责打开结果页，AI 还要再获取页面状态或 Markdown 并自行解析。
+这里为每个搜索引擎配置结果页 URL（含翻页参数）和结果容器 / 标题 / 链接 / 摘要的选择器，
+页面端辅助库按配置提取结果，返回排序后的 (标题, URL, 摘要)：
+- 跳转链接（Google 的 /url?q=、Bing 的 /ck/a?u=、DuckDuckGo 的 /l/?uddg=）还原为目标 URL
+- 按查询缓存结果（TTL + 条目数上限），同一任务中的重复搜索直接返回
+"""
+
+import base64
+import binascii
+import time
+import urllib.parse
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# 每个搜索引擎的结果页 URL 和结果选择器（选择器可用逗号列出多个备选）
+SEARCH_ENGINES: Dict[str, Dict[str, Any]] = {
+    "google": {
+        "url": "https://www.google.com/search?q={query}&udm=14",
+        "page_param": "&start={offset}",
+        "page_size": 10,
+        "selectors": {
+            "result": "#search .g, #search [data-hveid]",
+            "link": "a[href]:has(h3)",
+            "title": "h3",
+            "snippet": ".VwiC3b, [data-sncf], [style*='-webkit-line-clamp']",
+        },
+    },
+    "bing": {
+        "url": "https://www.bing.com/search?q={query}",
+        "page_param": "&first={offset_1}",
+        "page_size": 10,
+        "selectors": {
+            "result": "#b_results > li.b_algo",
+            "link": "h2 a[href]",
+            "title": "h2",
+            "snippet": ".b_caption p, p[class^='b_lineclamp'], .b_algoSlug",
+        },
+    },
+    "duckduckgo": {
+        # 无脚本版本的结果页加载快，并支持按偏移量翻页
+        "url": "https://html.duckduckgo.com/html/?q={query}",
+        "page_param": "&s={offset}&dc={offset_1}",
+        "page_size": 30,
+        "selectors": {
+            "result": "article[data-testid='result'], .result:not(.result--ad)",
+            "link": "a[data-testid='result-title-a'], a.result__a",
+            "title": "",
+            "snippet": "[data-result='snippet'], .result__snippet",
+        },
+    },
+}
+
+
+def search_url(engine: str, query: str, page: int = 0) -> str:
+    """第 page 页（从 0 开始）结果页的 URL"""
+    config = SEARCH_ENGINES[engine]
+    url = config["url"].format(query=urllib.parse.quote_plus(query))
+    if page > 0:
+        offset = page * config["page_size"]
+        url += config["page_param"].format(offset=offset, offset_1=offset + 1)
+    return url
+
+
+def unwrap_result_url(url: str) -> str:
+    """还原搜索引擎的跳转链接，无法识别时原样返回"""
+    parts = urllib.parse.urlsplit(url)
+    params = urllib.parse.parse_qs(parts.query)
+    
+    # Google: https://www.google.com/url?q=<目标>&...
+    if parts.netloc.endswith("google.com") and parts.path == "/url":
+        target = (params.get("q") or params.get("url") or [None])[0]
+        return target or url
+    
+    # Bing: https://www.bing.com/ck/a?...&u=a1<base64url(目标)>
+    if parts.netloc.endswith("bing.com") and parts.path == "/ck/a":
+        encoded = (params.get("u") or [""])[0]
+        if encoded.startswith("a1"):
+            encoded = encoded[2:]
+            try:
+                return base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode("utf-8")
+            except (binascii.Error, UnicodeDecodeError):
+                return url
+    
+    # DuckDuckGo 无脚本版本: //duckduckgo.com/l/?uddg=<目标>
+    if parts.netloc.endswith("duckduckgo.com") and parts.path == "/l/":
+        target = (params.get("uddg") or [None])[0]
+        return target or url
+    
+    return url
+
+
+def rank_results(pages: List[List[Dict[str, Any]]], max_results: int) -> List[Dict[str, Any]]:
+    """合并各页结果：还原跳转链接，按 URL 去重，按页序编号"""
+    ranked: List[Dict[str, Any]] = []
+    seen = set()
+    for page_index, results in enumerate(pages):
+        for result in results:
+            url = unwrap_result_url(result["url"])
+            if url in seen or not url.startswith(("http://", "https://")):
+                continue
+            seen.add(url)
+            ranked.append({
+                "rank": len(ranked) + 1,
+                "title": result["title"],
+                "url": url,
+                "snippet": result.get("snippet") or "",
+                "page": page_index + 1,
+            })
+            if len(ranked) >= max_results:
+                return ranked
+    return ranked
+
+
+class SerpCache:
+    """搜索结果缓存（按引擎、查询和页数），条目在 ttl 秒后过期"""
+    
+    def __init__(self, ttl: float = 600, max_entries: int = 100):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _key(engine: str, query: str, pages: int) -> Tuple[str, str, int]:
+        return engine, " ".join(query.lower().split()), pages
+    
+    def get(self, engine: str, query: str, pages: int) -> Optional[Dict[str, Any]]:
+        """命中且未过期时返回缓存的结果（附带缓存时长）"""
+        key = self._key(engine, query, pages)
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {**entry[1], "cache_age": round(time.monotonic() - entry[0], 1)}
+        if entry:
+            del self._entries[key]
+        self.misses += 1
+        return None
+    
+    def put(self, engine: str, query: str, pages: int, value: Dict[str, Any]):
+        self._entries[self._key(engine, query, pages)] = (time.monotonic(), value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        self._entries.clear()
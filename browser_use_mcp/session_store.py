@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""会话存储模块 - storage_state 的增量持久化
+
+storage_state 包含所有 cookies 和 localStorage，体积可能很大。
+SessionStore 为每个会话记录 cookies / origins 的摘要，只有内容发生变化时
+才会写盘；写入采用临时文件 + 原子替换，可选 gzip 压缩。
+所有会话的元数据保存在一个小的索引文件中，列出会话时无需逐个读取会话文件。
+多个会话的管理器共用同一个目录：索引文件被其他实例改写（修改时间变化）时重新读取，
+写入前在目录锁内重新读取并合并，不会用过期的索引覆盖其他会话的记录。
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "sessions_index.json"
+STATE_SUFFIX = "_storage_state.json"
+COMPRESSED_SUFFIX = STATE_SUFFIX + ".gz"
+
+# 每个会话目录一把锁（同一进程中的所有 SessionStore 实例共用）
+_dir_locks: Dict[str, threading.Lock] = {}
+_dir_locks_guard = threading.Lock()
+
+
+def _dir_lock(path: Path) -> threading.Lock:
+    key = str(path.resolve())
+    with _dir_locks_guard:
+        return _dir_locks.setdefault(key, threading.Lock())
+
+
+def _digest(value: Any) -> str:
+    """计算 JSON 值的规范化摘要"""
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def _atomic_write(path: Path, data: bytes):
+    """写入临时文件后原子替换目标文件"""
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SessionStore:
+    """storage_state 存储
+    
+    索引文件格式（sessions_index.json）：
+    {
+        "<session_id>": {
+            "file": "<文件名>",
+            "compressed": false,
+            "size_bytes": 1234,
+            "modified_at": 1700000000.0,
+            "cookies_digest": "...",
+            "origins_digest": "...",
+            "cookies_count": 10,
+            "origins_count": 2
+        }
+    }
+    """
+    
+    def __init__(self, session_dir: Path, compress: bool = False):
+        """
+        初始化会话存储
+        
+        Args:
+            session_dir: 会话数据存储目录
+            compress: 是否默认使用 gzip 压缩保存
+        """
+        self.session_dir = Path(session_dir)
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        self.compress = compress
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._index_mtime: Optional[int] = None
+        self._lock = _dir_lock(self.session_dir)
+    
+    @property
+    def index_file(self) -> Path:
+        return self.session_dir / INDEX_FILENAME
+    
+    def _state_file(self, session_id: str, compressed: bool) -> Path:
+        suffix = COMPRESSED_SUFFIX if compressed else STATE_SUFFIX
+        return self.session_dir / f"{session_id}{suffix}"
+    
+    def _index_file_mtime(self) -> Optional[int]:
+        try:
+            return self.index_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """加载索引（索引文件被其他实例改写时重新读取）；索引不存在或损坏时扫描目录重建（兼容旧版本的会话文件）"""
+        mtime = self._index_file_mtime()
+        if self._index is not None and mtime == self._index_mtime:
+            return self._index
+        
+        if mtime is not None:
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+                self._index_mtime = mtime
+                return self._index
+            except (OSError, ValueError) as e:
+                logger.warning(f"会话索引损坏，将重建: {e}")
+        
+        self._index = {}
+        for state_file in self.session_dir.glob(f"*{STATE_SUFFIX}*"):
+            name = state_file.name
+            if name.endswith(COMPRESSED_SUFFIX):
+                session_id, compressed = name[:-len(COMPRESSED_SUFFIX)], True
+            elif name.endswith(STATE_SUFFIX):
+                session_id, compressed = name[:-len(STATE_SUFFIX)], False
+            else:
+                continue
+            stat = state_file.stat()
+            self._index[session_id] = {
+                "file": name,
+                "compressed": compressed,
+                "size_bytes": stat.st_size,
+                "modified_at": stat.st_mtime,
+            }
+        if self._index:
+            self._write_index()
+        else:
+            self._index_mtime = mtime
+        return self._index
+    
+    def _write_index(self):
+        data = json.dumps(self._index, ensure_ascii=False, indent=2).encode('utf-8')
+        _atomic_write(self.index_file, data)
+        self._index_mtime = self._index_file_mtime()
+    
+    def exists(self, session_id: str) -> bool:
+        entry = self._load_index().get(session_id)
+        return bool(entry) and (self.session_dir / entry["file"]).exists()
+    
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """读取会话的 storage_state，不存在时返回 None"""
+        entry = self._load_index().get(session_id)
+        if not entry:
+            return None
+        path = self.session_dir / entry["file"]
+        if not path.exists():
+            return None
+        opener = gzip.open if entry.get("compressed") else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def save(self, session_id: str, state: Dict[str, Any], compress: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        保存会话的 storage_state（仅在 cookies 或 storage 变化时写盘）
+        
+        Args:
+            session_id: 会话标识符
+            state: Playwright storage_state() 返回的字典
+            compress: 是否压缩，None 表示使用默认设置
+        
+        Returns:
+            保存结果，written 表示是否实际写盘，changed 列出发生变化的部分
+        """
+        with self._lock:
+            compress = self.compress if compress is None else compress
+            index = self._load_index()
+            previous = index.get(session_id) or {}
+            
+            cookies = state.get("cookies", [])
+            origins = state.get("origins", [])
+            cookies_digest = _digest(sorted(cookies, key=lambda c: (c.get("domain", ""), c.get("path", ""), c.get("name", ""))))
+            origins_digest = _digest(sorted(origins, key=lambda o: o.get("origin", "")))
+            
+            changed = []
+            if previous.get("cookies_digest") != cookies_digest:
+                changed.append("cookies")
+            if previous.get("origins_digest") != origins_digest:
+                changed.append("origins")
+            
+            path = self._state_file(session_id, compress)
+            format_changed = bool(previous) and previous.get("compressed", False) != compress
+            if not changed and not format_changed and path.exists():
+                return {
+                    "written": False,
+                    "changed": [],
+                    "file": str(path),
+                    "size_bytes": previous.get("size_bytes"),
+                }
+            
+            data = json.dumps(state, ensure_ascii=False).encode('utf-8')
+            if compress:
+                data = gzip.compress(data)
+            _atomic_write(path, data)
+            
+            # 切换压缩格式后删除旧格式的文件
+            stale = self._state_file(session_id, not compress)
+            if stale.exists():
+                stale.unlink()
+            
+            index[session_id] = {
+                "file": path.name,
+                "compressed": compress,
+                "size_bytes": len(data),
+                "modified_at": time.time(),
+                "cookies_digest": cookies_digest,
+                "origins_digest": origins_digest,
+                "cookies_count": len(cookies),
+                "origins_count": len(origins),
+            }
+            self._write_index()
+            
+            return {
+                "written": True,
+                "changed": changed,
+                "file": str(path),
+                "size_bytes": len(data),
+            }
+    
+    def delete(self, session_id: str) -> List[str]:
+        """删除会话文件及索引记录，返回被删除的文件列表"""
+        with self._lock:
+            index = self._load_index()
+            deleted = []
+            for compressed in (False, True):
+                path = self._state_file(session_id, compressed)
+                if path.exists():
+                    path.unlink()
+                    deleted.append(str(path))
+            if index.pop(session_id, None) is not None:
+                self._write_index()
+            return deleted
+    
+    def list(self) -> List[Dict[str, Any]]:
+        """从索引中列出所有会话的元数据"""
+        sessions = []
+        for session_id, entry in self._load_index().items():
+            sessions.append({
+                "session_id": session_id,
+                "storage_state_file": str(self.session_dir / entry["file"]),
+                "size_bytes": entry.get("size_bytes"),
+                "modified_at": entry.get("modified_at"),
+                "compressed": entry.get("compressed", False),
+                "cookies_count": entry.get("cookies_count"),
+                "origins_count": entry.get("origins_count"),
+            })
+        sessions.sort(key=lambda s: s["modified_at"] or 0, reverse=True)
+        return sessions
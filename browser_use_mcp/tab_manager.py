@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""标签页管理模块 - 限制标签页数量并自动关闭空闲的后台标签页
+
+新标签页导航和点击打开的弹出页会一直留在上下文中，长时间使用后 Chromium
+内存持续增长，获取页面状态时也要遍历几十个标签页。TabManager 监听上下文的
+page 事件，记录每个标签页的打开时间和最近使用时间：
+- 数量上限：标签页超过 max_tabs 时，按最近最少使用（LRU）关闭后台标签页
+- 空闲超时：后台标签页超过 idle_timeout 秒未使用时自动关闭（后台任务定期检查）
+- 当前标签页永远不会被自动关闭
+- 抓取、导出、搜索翻页等后台任务通过 new_internal_page 打开的页面不计入上限，也不会被关闭
+- 内存报告：通过 CDP Performance.getMetrics 读取每个标签页的 JS 堆和 DOM 节点数
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 报告的 Performance.getMetrics 指标（CDP 名称 -> 输出名称）
+REPORTED_METRICS = {
+    "JSHeapUsedSize": "js_heap_used",
+    "JSHeapTotalSize": "js_heap_total",
+    "Nodes": "dom_nodes",
+    "Documents": "documents",
+    "JSEventListeners": "event_listeners",
+}
+
+
+class TabManager:
+    """标签页生命周期管理器"""
+    
+    def __init__(self, max_tabs: int = 8, idle_timeout: float = 600):
+        """
+        初始化标签页管理器
+        
+        Args:
+            max_tabs: 最大标签页数（至少为 2：当前标签页和刚打开的标签页）
+            idle_timeout: 后台标签页的空闲超时（秒），0 表示不按空闲时间关闭
+        """
+        self.max_tabs = max(int(max_tabs), 2)
+        self.idle_timeout = max(float(idle_timeout), 0)
+        
+        self._current_page: Callable[[], Any] = lambda: None
+        self._context = None
+        self._opened: Dict[Any, float] = {}
+        self._last_used: Dict[Any, float] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self._pending: set = set()
+        self._internal: set = set()
+        self._creating_internal = 0
+        self.closed: List[Dict[str, Any]] = []
+    
+    @property
+    def active(self):
+        return self._current_page()
+    
+    def attach(self, context, current_page: Callable[[], Any]):
+        """
+        开始跟踪上下文中的标签页，并启动空闲检查任务
+        
+        Args:
+            context: 浏览器上下文
+            current_page: 返回当前标签页的函数（当前标签页不会被自动关闭）
+        """
+        self._context = context
+        self._current_page = current_page
+        for page in context.pages:
+            self._track(page)
+        context.on("page", self._on_page)
+        self._sweeper = asyncio.ensure_future(self._sweep_loop())
+    
+    def detach(self):
+        """停止跟踪"""
+        if self._context is not None:
+            try:
+                self._context.remove_listener("page", self._on_page)
+            except Exception as e:
+                logger.debug(f"移除标签页监听器失败: {e}")
+            self._context = None
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+        for task in self._pending:
+            task.cancel()
+        self._pending.clear()
+        self._opened.clear()
+        self._last_used.clear()
+        self._internal.clear()
+        self._current_page = lambda: None
+    
+    def _track(self, page):
+        now = time.monotonic()
+        self._opened.setdefault(page, now)
+        self._last_used.setdefault(page, now)
+        page.once("close", lambda _: self._forget(page))
+    
+    def _forget(self, page):
+        self._opened.pop(page, None)
+        self._last_used.pop(page, None)
+        self._internal.discard(page)
+    
+    def _on_page(self, page):
+        """page 事件回调（同步）：新标签页计入使用时间，超出上限时在后台任务中关闭最久未用的标签页"""
+        self._track(page)
+        if self._creating_internal:
+            # page 事件先于 new_page 返回触发，此时还无法区分是否为内部页面，留给下一次检查
+            return
+        task = asyncio.ensure_future(self.enforce())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    def touch(self, page):
+        """更新标签页的使用时间"""
+        if page is None:
+            return
+        self._last_used[page] = time.monotonic()
+        self._opened.setdefault(page, self._last_used[page])
+    
+    async def new_internal_page(self):
+        """打开后台任务使用的页面（不计入数量上限，不会被自动关闭，由调用方负责关闭）"""
+        self._creating_internal += 1
+        try:
+            page = await self._context.new_page()
+        finally:
+            self._creating_internal -= 1
+        self._internal.add(page)
+        return page
+    
+    def pages(self) -> List[Any]:
+        """当前打开的标签页（与 context.pages 顺序一致）"""
+        return list(self._context.pages) if self._context else []
+    
+    def user_pages(self) -> List[Any]:
+        """不含后台任务页面的标签页"""
+        return [page for page in self.pages() if page not in self._internal]
+    
+    async def enforce(self) -> List[Dict[str, Any]]:
+        """
+        执行空闲超时和数量上限策略
+        
+        Returns:
+            本次关闭的标签页（url 和原因）
+        """
+        now = time.monotonic()
+        pages = self.user_pages()
+        background = [page for page in pages if page is not self.active]
+        # 最久未使用的在前
+        background.sort(key=lambda page: self._last_used.get(page, 0))
+        
+        to_close = []
+        if self.idle_timeout:
+            for page in background:
+                if now - self._last_used.get(page, now) > self.idle_timeout:
+                    to_close.append((page, "idle"))
+        
+        excess = len(pages) - len(to_close) - self.max_tabs
+        for page in background:
+            if excess <= 0:
+                break
+            if all(page is not closing for closing, _ in to_close):
+                to_close.append((page, "max_tabs"))
+                excess -= 1
+        
+        closed = []
+        for page, reason in to_close:
+            entry = {"url": page.url, "reason": reason, "idle_seconds": round(now - self._last_used.get(page, now))}
+            try:
+                await page.close()
+            except Exception as e:
+                logger.debug(f"关闭标签页失败 {page.url}: {e}")
+                continue
+            self._forget(page)
+            closed.append(entry)
+        
+        self.closed.extend(closed)
+        del self.closed[:-50]
+        return closed
+    
+    async def _sweep_loop(self):
+        """定期检查空闲标签页"""
+        while True:
+            interval = min(max(self.idle_timeout / 4, 5), 60) if self.idle_timeout else 60
+            await asyncio.sleep(interval)
+            try:
+                await self.enforce()
+            except Exception as e:
+                logger.debug(f"空闲标签页检查失败: {e}")
+    
+    @staticmethod
+    async def page_metrics(page) -> Dict[str, Any]:
+        """通过 CDP Performance.getMetrics 读取标签页的内存和 DOM 指标"""
+        cdp = await page.context.new_cdp_session(page)
+        try:
+            await cdp.send("Performance.enable")
+            response = await cdp.send("Performance.getMetrics")
+        finally:
+            await cdp.detach()
+        values = {item["name"]: item["value"] for item in response.get("metrics", [])}
+        return {name: int(values[key]) for key, name in REPORTED_METRICS.items() if key in values}
+    
+    async def summary(self, include_metrics: bool = True) -> Dict[str, Any]:
+        """
+        标签页汇总
+        
+        Args:
+            include_metrics: 是否读取每个标签页的内存指标
+        
+        Returns:
+            每个标签页的 URL、标题、是否当前、空闲时长、打开时长及内存指标，以及策略和最近关闭的标签页
+        """
+        now = time.monotonic()
+        pages = self.pages()
+        
+        async def describe(index: int, page) -> Dict[str, Any]:
+            tab = {
+                "index": index,
+                "url": page.url,
+                "active": page is self.active,
+                "internal": page in self._internal,
+                "idle_seconds": round(now - self._last_used.get(page, now)),
+                "age_seconds": round(now - self._opened.get(page, now)),
+            }
+            try:
+                tab["title"] = await page.title()
+            except Exception:
+                tab["title"] = ""
+            if include_metrics:
+                try:
+                    tab["metrics"] = await self.page_metrics(page)
+                except Exception as e:
+                    tab["metrics_error"] = str(e)
+            return tab
+        
+        tabs = await asyncio.gather(*(describe(i, page) for i, page in enumerate(pages)))
+        total_heap = sum(tab.get("metrics", {}).get("js_heap_used", 0) for tab in tabs)
+        return {
+            "tabs": list(tabs),
+            "count": len(tabs),
+            "max_tabs": self.max_tabs,
+            "idle_timeout": self.idle_timeout,
+            "js_heap_used_total": total_heap if include_metrics else None,
+            "recently_closed": self.closed[-10:],
+        }
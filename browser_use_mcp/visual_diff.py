@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""画面对比模块 - 比较点击前后坐标附近的小范围截图
+
+坐标点击以前是"盲点"：点击后还要获取一次带完整截图的页面状态才能确认效果。
+这里只截取点击位置周围的一小块区域（PNG），解码后逐像素比较，得到变化比例和
+变化区域，点击工具在一次调用中就能判断画面是否有响应：
+- 只依赖标准库（zlib + struct），支持 Chromium 截图使用的 8 位 RGB / RGBA 非隔行 PNG
+- 字节完全相同时直接判定无变化，不解码
+- 逐行比较，相同的行直接跳过
+"""
+
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# 颜色类型 -> 每像素字节数（8 位深度）
+_CHANNELS = {2: 3, 6: 4}
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def png_size(data: bytes) -> Tuple[int, int]:
+    """从 IHDR 读取 PNG 的宽度和高度（不解码）"""
+    if data[:8] != PNG_SIGNATURE or data[12:16] != b"IHDR":
+        raise ValueError("不是 PNG 数据")
+    return struct.unpack(">II", data[16:24])
+
+
+def decode_png(data: bytes) -> Tuple[int, int, int, List[bytes]]:
+    """
+    解码 PNG
+    
+    Returns:
+        (宽度, 高度, 每像素字节数, 像素行列表)
+    
+    Raises:
+        ValueError: 不是 PNG 或不支持的格式（非 8 位 RGB / RGBA、隔行扫描）
+    """
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("不是 PNG 数据")
+    
+    pos = 8
+    header = None
+    idat = []
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        pos += length + 12
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif chunk_type == b"IDAT":
+            idat.append(body)
+        elif chunk_type == b"IEND":
+            break
+    if header is None:
+        raise ValueError("PNG 缺少 IHDR")
+    
+    width, height, depth, color_type, _, _, interlace = header
+    if depth != 8 or color_type not in _CHANNELS or interlace:
+        raise ValueError(f"不支持的 PNG 格式（位深 {depth}，颜色类型 {color_type}，隔行 {interlace}）")
+    
+    channels = _CHANNELS[color_type]
+    stride = width * channels
+    raw = zlib.decompress(b"".join(idat))
+    rows: List[bytes] = []
+    prev = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        filter_type = raw[start]
+        line = bytearray(raw[start + 1:start + 1 + stride])
+        if filter_type == 1:
+            for i in range(channels, stride):
+                line[i] = (line[i] + line[i - channels]) & 0xFF
+        elif filter_type == 2:
+            for i in range(stride):
+                line[i] = (line[i] + prev[i]) & 0xFF
+        elif filter_type == 3:
+            for i in range(stride):
+                left = line[i - channels] if i >= channels else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xFF
+        elif filter_type == 4:
+            for i in range(stride):
+                if i >= channels:
+                    line[i] = (line[i] + _paeth(line[i - channels], prev[i], prev[i - channels])) & 0xFF
+                else:
+                    line[i] = (line[i] + prev[i]) & 0xFF
+        elif filter_type != 0:
+            raise ValueError(f"未知的 PNG 行过滤类型: {filter_type}")
+        rows.append(bytes(line))
+        prev = line
+    return width, height, channels, rows
+
+
+def compare_png(before: bytes, after: bytes, tolerance: int = 16) -> Dict[str, Any]:
+    """
+    比较两张同尺寸截图
+    
+    Args:
+        before: 点击前的 PNG
+        after: 点击后的 PNG
+        tolerance: 任一颜色通道差值超过该值的像素计为变化（忽略抗锯齿等细微差异）
+    
+    Returns:
+        changed（是否有变化）、changed_ratio（变化像素比例）、
+        bbox（变化区域，图像像素坐标，无变化时为 None）
+    """
+    if before == after:
+        return {"changed": False, "changed_ratio": 0.0, "bbox": None}
+    
+    width, height, channels, rows_before = decode_png(before)
+    width_after, height_after, channels_after, rows_after = decode_png(after)
+    if (width, height, channels) != (width_after, height_after, channels_after):
+        return {"changed": True, "changed_ratio": 1.0, "bbox": {"x": 0, "y": 0, "width": width, "height": height}}
+    
+    changed = 0
+    left, top, right, bottom = width, height, -1, -1
+    for y in range(height):
+        row_before, row_after = rows_before[y], rows_after[y]
+        if row_before == row_after:
+            continue
+        for x in range(width):
+            offset = x * channels
+            # 只比较 RGB，忽略透明度
+            if any(abs(row_before[offset + c] - row_after[offset + c]) > tolerance for c in range(3)):
+                changed += 1
+                left, right = min(left, x), max(right, x)
+                top, bottom = min(top, y), max(bottom, y)
+    
+    bbox: Optional[Dict[str, int]] = None
+    if changed:
+        bbox = {"x": left, "y": top, "width": right - left + 1, "height": bottom - top + 1}
+    return {
+        "changed": changed > 0,
+        "changed_ratio": round(changed / (width * height), 4) if width and height else 0.0,
+        "bbox": bbox,
+    }